@@ -35,6 +35,11 @@ def create_app():
     if not os.path.exists(instance_path):
         os.makedirs(instance_path)
 
+    # مجلد التخزين المؤقت داخل instance (أو CACHE_DIR من البيئة)
+    from cache import init_cache
+    app.config['CACHE_DIR'] = os.environ.get('CACHE_DIR') or os.path.join(app.instance_path, 'cache')
+    init_cache(app)
+
     # تهيئة الإضافات
     db.init_app(app)
     
@@ -56,8 +61,59 @@ def create_app():
         from views import main_blueprint
         app.register_blueprint(main_blueprint)
 
+    from config import Config
+
+    # قياس عدد الاستعلامات وزمن كل طلب
+    if Config.REQUEST_METRICS_ENABLED:
+        from request_metrics import init_request_metrics
+        init_request_metrics(app)
+
+    # سجل الاستعلامات البطيئة مع خطط التنفيذ
+    if Config.SLOW_QUERY_LOG_ENABLED:
+        from slow_query_log import init_slow_query_log
+        init_slow_query_log(app)
+
+    # بناء فهرس الباركود وIMEI لشاشة البيع وفهرس الإكمال التلقائي
+    try:
+        from barcode_index import barcode_index
+        from product_autocomplete import product_autocomplete
+        with app.app_context():
+            barcode_index.load()
+            product_autocomplete.load()
+    except Exception as e:
+        print(f"خطأ في بناء فهارس المنتجات: {e}")
+
+    # تجهيز خطوط وأنماط الفواتير الحرارية مرة واحدة
+    from thermal_invoice import warm_up
+    warm_up()
+
     return app
 
+def start_background_tasks(app):
+    """
+    تشغيل الخيوط الخلفية: منظف التخزين المؤقت، حد الإشعارات، وموزع المهام
+
+    تُستدعى من نقطة تشغيل الخادم فقط (run.py أو gunicorn.conf.py بعد fork)، لا من
+    create_app، فلا تبدأ الخيوط في عمليات تنفيذ المهام أو أوامر CLI التي تستورد app.
+
+    :param app: تطبيق Flask
+    """
+    from config import Config
+
+    if Config.CACHE_JANITOR_ENABLED:
+        from cache import cache_janitor
+        cache_janitor.start()
+
+    # حذف الإشعارات الزائدة عن NOTIFICATIONS_MAX_COUNT دوريًا
+    if Config.NOTIFICATIONS_ENABLED:
+        from notifications import notification_retention
+        notification_retention.start(app)
+
+    # موزع المهام الخلفية (التصدير وملفات PDF)
+    if Config.JOBS_WORKER_ENABLED:
+        from jobs import job_worker
+        job_worker.start()
+
 
 
 app = create_app()
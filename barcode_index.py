@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+فهرس الباركود وأرقام IMEI في الذاكرة لشاشة البيع
+
+كل عملية تحتفظ بقاموسين (الباركود ← المنتج، IMEI ← المنتج) يُبنيان باستعلام واحد.
+عند تغير اسم منتج أو سعره أو رمزه يُبطل وسم 'product_codes' في سجل الوسوم المشترك
+(انظر cache_tags_for)، فتعيد كل عملية gunicorn بناء فهرسها عند أول مسح بعد التغيير.
+فحص الإصدار stat واحد لمجلد الوسوم، فيبقى المسح دون استعلام قاعدة بيانات.
+"""
+
+import threading
+
+from database import db, Product, BARCODE_INDEX_FIELDS
+
+# وسم الإبطال المشترك بين العمليات
+BARCODE_INDEX_TAG = 'product_codes'
+
+class BarcodeIndex:
+    """فهرس الباركود وIMEI للمنتجات"""
+
+    def __init__(self, registry=None):
+        """
+        :param registry: سجل الوسوم (الافتراضي سجل cache_manager)
+        """
+        self._registry = registry
+        self._by_barcode = {}
+        self._by_imei = {}
+        self._version = None
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    @property
+    def registry(self):
+        if self._registry is None:
+            # دون حفظ: cache_manager.configure قد يغير المجلد بعد الإنشاء
+            from cache import cache_manager
+            return cache_manager.tags
+        return self._registry
+
+    def _current_version(self):
+        """إصدار الوسم الحالي (None إذا تعذرت القراءة فيُعاد البناء)"""
+        try:
+            return self.registry.snapshot([BARCODE_INDEX_TAG])[BARCODE_INDEX_TAG]
+        except OSError as e:
+            print(f"خطأ في قراءة إصدار فهرس الباركود: {e}")
+            return None
+
+    def load(self):
+        """
+        بناء الفهرس من قاعدة البيانات (يتطلب سياق التطبيق)
+
+        :return: عدد المنتجات المفهرسة
+        """
+        # قراءة الإصدار قبل الاستعلام: أي تغيير أثناء البناء يفرض إعادة بناء لاحقة
+        version = self._current_version()
+        columns = [getattr(Product, field) for field in ('id',) + BARCODE_INDEX_FIELDS]
+        rows = db.session.execute(
+            db.select(*columns).where(db.or_(Product.barcode.isnot(None), Product.imei.isnot(None)))
+        ).all()
+
+        by_barcode = {}
+        by_imei = {}
+        for row in rows:
+            product = dict(row._mapping)
+            if product['barcode']:
+                by_barcode[product['barcode']] = product
+            if product['imei']:
+                by_imei[product['imei']] = product
+
+        with self._lock:
+            self._by_barcode = by_barcode
+            self._by_imei = by_imei
+            self._version = version
+            self.rebuilds += 1
+        return len(rows)
+
+    def lookup(self, code):
+        """
+        البحث عن منتج بالباركود أو رقم IMEI
+
+        :param code: الرمز الممسوح
+        :return: قاموس المنتج أو None
+        """
+        code = (code or '').strip()
+        if not code:
+            return None
+
+        version = self._current_version()
+        if version is None or version != self._version:
+            self.load()
+
+        return self._by_barcode.get(code) or self._by_imei.get(code)
+
+    def stats(self):
+        """إحصائيات الفهرس في هذه العملية"""
+        return {
+            'barcodes': len(self._by_barcode),
+            'imeis': len(self._by_imei),
+            'rebuilds': self.rebuilds,
+            'version': self._version
+        }
+
+# فهرس العملية الحالية
+barcode_index = BarcodeIndex()
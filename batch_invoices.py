@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+إنشاء الفواتير الحرارية على دفعات (إعادة طباعة نهاية اليوم وكشوف الموردين)
+
+تُحمل المبيعات أو فواتير الشراء مع عناصرها في عدد قليل من الاستعلامات، ثم تُقسم
+إلى دفعات تُنشأ في مجموعة عمليات. الناتج ملف PDF مدمج أو ملف zip بفاتورة لكل ملف.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+from types import SimpleNamespace
+
+# إضافة المجلد الحالي إلى المسار
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from excel_export import EXPORT_SPOOL_MAX_SIZE
+
+# استيراد pypdf فقط إذا كان متوفراً (لدمج ملفات الدفعات)
+try:
+    from pypdf import PdfWriter
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+# الحد الأقصى لعدد المعاملات في استعلام IN واحد
+LOAD_BATCH_SIZE = 500
+
+def _item_snapshot(item):
+    """نسخة بسيطة من عنصر الفاتورة قابلة للنقل بين العمليات"""
+    return SimpleNamespace(
+        product=SimpleNamespace(name=item.product.name if item.product else ''),
+        quantity=item.quantity,
+        unit_price=item.unit_price,
+        total_price=item.total_price
+    )
+
+def sale_snapshot(sale):
+    """
+    نسخة من المبيعة بالحقول التي يستخدمها مولد الفواتير
+
+    :param sale: كائن Sale مع عناصره
+    """
+    return SimpleNamespace(
+        id=sale.id,
+        created_at=sale.created_at,
+        customer=SimpleNamespace(name=sale.customer.name) if sale.customer else None,
+        items=[_item_snapshot(item) for item in sale.sale_items],
+        subtotal=sale.total_amount,
+        discount_amount=sale.discount or 0,
+        tax_amount=0,
+        final_amount=sale.final_amount
+    )
+
+def purchase_snapshot(purchase):
+    """
+    نسخة من فاتورة الشراء بالحقول التي يستخدمها مولد الفواتير
+
+    :param purchase: كائن PurchaseInvoice مع عناصره
+    """
+    return SimpleNamespace(
+        id=purchase.id,
+        created_at=purchase.created_at,
+        supplier=SimpleNamespace(name=purchase.supplier.name) if purchase.supplier else None,
+        items=[_item_snapshot(item) for item in purchase.purchase_items],
+        total_amount=purchase.final_amount
+    )
+
+def store_snapshot(store_settings):
+    """نسخة من إعدادات المتجر (None إذا لم تكن موجودة)"""
+    if store_settings is None:
+        return None
+    return SimpleNamespace(
+        store_name=store_settings.store_name,
+        address=store_settings.address,
+        phone=store_settings.phone,
+        currency_symbol=store_settings.currency_symbol
+    )
+
+def load_invoices(kind, ids):
+    """
+    تحميل الفواتير مع عناصرها ومنتجاتها (استعلامان أو ثلاثة لكل 500 فاتورة)
+
+    :param kind: 'sale' أو 'purchase'
+    :param ids: المعرفات بالترتيب المطلوب
+    :return: النسخ بنفس ترتيب المعرفات (يُتجاهل غير الموجود)
+    """
+    from sqlalchemy.orm import joinedload, selectinload
+    from database import Sale, SaleItem, PurchaseInvoice, PurchaseItem
+
+    if kind == 'sale':
+        model, snapshot = Sale, sale_snapshot
+        options = (joinedload(Sale.customer),
+                   selectinload(Sale.sale_items).joinedload(SaleItem.product))
+    elif kind == 'purchase':
+        model, snapshot = PurchaseInvoice, purchase_snapshot
+        options = (joinedload(PurchaseInvoice.supplier),
+                   selectinload(PurchaseInvoice.purchase_items).joinedload(PurchaseItem.product))
+    else:
+        raise ValueError(f"نوع فاتورة غير معروف: {kind}")
+
+    ids = list(ids)
+    loaded = {}
+    for i in range(0, len(ids), LOAD_BATCH_SIZE):
+        batch = ids[i:i + LOAD_BATCH_SIZE]
+        for record in model.query.options(*options).filter(model.id.in_(batch)):
+            loaded[record.id] = snapshot(record)
+    return [loaded[record_id] for record_id in ids if record_id in loaded]
+
+def _init_worker():
+    """تجهيز الخطوط والأنماط مرة واحدة في كل عملية"""
+    from thermal_invoice import warm_up
+    warm_up()
+
+def _render_chunk(kind, records, store_settings, merged):
+    """
+    إنشاء دفعة من الفواتير داخل عملية التنفيذ
+
+    :param merged: ملف PDF واحد للدفعة أو ملف لكل فاتورة
+    :return: بايتات PDF أو قائمة (المعرف، بايتات PDF)
+    """
+    from thermal_invoice import ThermalInvoiceGenerator
+
+    generator = ThermalInvoiceGenerator()
+    if merged:
+        return generator.generate_batch_pdf(kind, records, store_settings).getvalue()
+
+    generate = generator.generate_sale_invoice if kind == 'sale' else generator.generate_purchase_invoice
+    return [(record.id, generate(record, store_settings).getvalue()) for record in records]
+
+def render_invoices(kind, records, store_settings=None, output='pdf', processes=None,
+                    chunk_size=25, progress=None):
+    """
+    إنشاء عدة فواتير في مجموعة عمليات
+
+    :param kind: 'sale' أو 'purchase'
+    :param records: نسخ الفواتير (انظر load_invoices)
+    :param store_settings: نسخة إعدادات المتجر (انظر store_snapshot)
+    :param output: 'pdf' لملف مدمج أو 'zip' لملف لكل فاتورة
+    :param processes: عدد العمليات (1 للتنفيذ في العملية الحالية)
+    :param chunk_size: عدد الفواتير في كل دفعة
+    :param progress: دالة تُستدعى بعد كل دفعة (عدد المنتهي، الإجمالي)
+    :return: ملف مؤقت مفتوح في بدايته
+    """
+    if output not in ('pdf', 'zip'):
+        raise ValueError(f"صيغة غير معروفة: {output}")
+
+    records = list(records)
+    total = len(records)
+    processes = processes or Config.JOBS_PROCESSES
+    result = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE)
+
+    # بدون pypdf لا يمكن دمج ملفات الدفعات، فيُنشأ الملف المدمج في مستند واحد
+    if output == 'pdf' and not PYPDF_AVAILABLE:
+        processes, chunk_size = 1, max(total, 1)
+
+    chunks = [records[i:i + chunk_size] for i in range(0, total, chunk_size)]
+    merged = output == 'pdf'
+    rendered = {}
+    done = 0
+
+    def finish(index, data):
+        nonlocal done
+        if merged:
+            rendered[index] = data
+        else:
+            for record_id, pdf in data:
+                archive.writestr(f"{kind}_invoice_{record_id}.pdf", pdf)
+        done += len(chunks[index])
+        if progress:
+            progress(done, total)
+
+    archive = None if merged else zipfile.ZipFile(result, 'w', zipfile.ZIP_DEFLATED)
+    try:
+        if processes <= 1 or len(chunks) <= 1:
+            for index, chunk in enumerate(chunks):
+                finish(index, _render_chunk(kind, chunk, store_settings, merged))
+        else:
+            with ProcessPoolExecutor(max_workers=processes,
+                                     mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_worker) as pool:
+                futures = {
+                    pool.submit(_render_chunk, kind, chunk, store_settings, merged): index
+                    for index, chunk in enumerate(chunks)
+                }
+                for future in as_completed(futures):
+                    finish(futures[future], future.result())
+    finally:
+        if archive is not None:
+            archive.close()
+
+    if merged:
+        if len(rendered) == 1:
+            result.write(rendered[0])
+        elif rendered:
+            writer = PdfWriter()
+            for index in range(len(chunks)):
+                writer.append(BytesIO(rendered[index]))
+            writer.write(result)
+
+    result.seek(0)
+    return result
+
+def parse_ids(value):
+    """تحويل '1,2,10-20' إلى قائمة معرفات"""
+    ids = []
+    for part in value.split(','):
+        part = part.strip()
+        if '-' in part:
+            start, end = part.split('-', 1)
+            ids.extend(range(int(start), int(end) + 1))
+        elif part:
+            ids.append(int(part))
+    return ids
+
+def main():
+    """الدالة الرئيسية"""
+    parser = argparse.ArgumentParser(description='إنشاء الفواتير الحرارية على دفعات')
+    parser.add_argument('kind', choices=['sale', 'purchase'], help='نوع الفواتير')
+    parser.add_argument('ids', type=parse_ids, help='المعرفات مثل 1,2,10-20')
+    parser.add_argument('--output', required=True, help='ملف الناتج (.pdf أو .zip)')
+    parser.add_argument('--processes', type=int, default=Config.JOBS_PROCESSES, help='عدد العمليات')
+    args = parser.parse_args()
+
+    try:
+        from app import app
+        from database import StoreSettings
+
+        with app.app_context():
+            records = load_invoices(args.kind, args.ids)
+            store_settings = store_snapshot(StoreSettings.query.first())
+
+        print(f"🧾 إنشاء {len(records)} فاتورة...")
+        output = 'zip' if args.output.endswith('.zip') else 'pdf'
+        result = render_invoices(
+            args.kind, records, store_settings, output, args.processes,
+            progress=lambda done, total: print(f"   {done}/{total}")
+        )
+        with result, open(args.output, 'wb') as f:
+            f.write(result.read())
+
+        print(f"✅ تم حفظ الفواتير في {args.output}")
+        return True
+
+    except Exception as e:
+        print(f"❌ خطأ في إنشاء الفواتير: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
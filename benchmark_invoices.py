@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس زمن إنشاء الفاتورة الحرارية الواحدة
+
+يقارن بين الوضع البارد (تسجيل الخطوط وبناء الأنماط مع كل فاتورة كما كان سابقًا)
+والوضع المجهز مسبقًا (الخطوط والأنماط مرة واحدة لكل عملية).
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+# إضافة المجلد الحالي إلى المسار
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import thermal_invoice
+from reportlab.pdfbase import pdfmetrics
+
+def sample_sale(items_count=5):
+    """بيع تجريبي بنفس الحقول التي يستخدمها مولد الفواتير"""
+    items = [
+        SimpleNamespace(
+            product=SimpleNamespace(name=f"Galaxy A{i} 128GB"),
+            quantity=1 + i % 3,
+            unit_price=25000.0,
+            total_price=25000.0 * (1 + i % 3)
+        )
+        for i in range(items_count)
+    ]
+    subtotal = sum(item.total_price for item in items)
+    return SimpleNamespace(
+        id=1024,
+        created_at=datetime.now(),
+        customer=SimpleNamespace(name='أحمد'),
+        items=items,
+        subtotal=subtotal,
+        discount_amount=500.0,
+        tax_amount=0.0,
+        final_amount=subtotal - 500.0
+    )
+
+def reset_caches():
+    """إلغاء التجهيز المسبق لمحاكاة السلوك القديم (تحليل ملفات الخطوط مع كل فاتورة)"""
+    thermal_invoice.get_invoice_styles.cache_clear()
+    thermal_invoice._arabic_font = None
+    for font_name, _ in thermal_invoice.INVOICE_FONTS:
+        pdfmetrics._fonts.pop(font_name, None)
+
+def measure(sale, count, cold):
+    """
+    قياس زمن إنشاء عدد من الفواتير
+
+    :param cold: إعادة تسجيل الخطوط وبناء الأنماط قبل كل فاتورة
+    :return: قائمة الأزمنة بالمللي ثانية
+    """
+    timings = []
+    for _ in range(count):
+        if cold:
+            reset_caches()
+        start = time.perf_counter()
+        thermal_invoice.ThermalInvoiceGenerator().generate_sale_invoice(sale)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def measure_escpos(sale, count):
+    """قياس زمن إنشاء فاتورة ESC/POS مباشرة (مع ذاكرة المقاطع النصية)"""
+    generator = thermal_invoice.ThermalInvoiceGenerator()
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        generator.generate_sale_receipt_escpos(sale)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def report(label, timings):
+    """طباعة ملخص الأزمنة"""
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) >= 20 else timings[-1]
+    print(f"{label}: متوسط {statistics.mean(timings):.2f}ms، وسيط {statistics.median(timings):.2f}ms، p95 {p95:.2f}ms")
+
+def main():
+    """الدالة الرئيسية"""
+    parser = argparse.ArgumentParser(description='قياس زمن إنشاء الفاتورة الحرارية')
+    parser.add_argument('--count', type=int, default=50, help='عدد الفواتير في كل وضع')
+    parser.add_argument('--items', type=int, default=5, help='عدد المنتجات في الفاتورة')
+    parser.add_argument('--font', default=None, help='ملف TTF بديل عن arial.ttf لجميع الخطوط')
+    args = parser.parse_args()
+
+    if args.font:
+        thermal_invoice.INVOICE_FONTS = [(font_name, args.font) for font_name, _ in thermal_invoice.INVOICE_FONTS]
+
+    sale = sample_sale(args.items)
+    print("⏱️  قياس زمن إنشاء الفاتورة الحرارية")
+    print("=" * 50)
+
+    cold = measure(sale, args.count, cold=True)
+    thermal_invoice.warm_up()
+    warm = measure(sale, args.count, cold=False)
+
+    report("قبل (تسجيل الخطوط مع كل فاتورة)", cold)
+    report("بعد (تجهيز مسبق لكل عملية)", warm)
+    report("ESC/POS مباشرة (دون PDF)", measure_escpos(sale, args.count))
+    print(f"✅ التحسن: {statistics.mean(cold) / statistics.mean(warm):.1f}x")
+    return True
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
@@ -6,61 +6,834 @@
 import time
 import hashlib
 import json
+import math
 import os
+import pickle
+import random
+import sqlite3
+import struct
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
 from config import Config
 
-class CacheManager:
-    """مدير التخزين المؤقت للبيانات"""
+# استيراد msgpack فقط إذا كان متوفراً
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+# ترويسة ثابتة لملفات التخزين المؤقت: المعرف، صيغة التسلسل، وقت انتهاء الصلاحية
+CACHE_MAGIC = b'PSC1'
+CACHE_HEADER = struct.Struct('<4sBd')
+
+SERIALIZER_PICKLE = 1
+SERIALIZER_MSGPACK = 2
+SERIALIZER_JSON = 3
+
+def encode_entry(entry, serializer='pickle'):
+    """
+    تحويل عنصر التخزين المؤقت إلى بايتات مع الترويسة
+
+    :param entry: قاموس العنصر (يجب أن يحتوي على expire)
+    :param serializer: pickle أو msgpack أو json؛ عند تعذر التسلسل يُستخدم pickle
+    :return: البايتات المراد كتابتها
+    """
+    payload = None
+    serializer_id = SERIALIZER_PICKLE
+
+    try:
+        if serializer == 'msgpack' and MSGPACK_AVAILABLE:
+            payload = msgpack.packb(entry, use_bin_type=True)
+            serializer_id = SERIALIZER_MSGPACK
+        elif serializer in ('json', 'msgpack'):
+            payload = json.dumps(entry, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            serializer_id = SERIALIZER_JSON
+    except (TypeError, ValueError):
+        payload = None
+
+    if payload is None:
+        payload = pickle.dumps(entry, protocol=5)
+        serializer_id = SERIALIZER_PICKLE
+
+    return CACHE_HEADER.pack(CACHE_MAGIC, serializer_id, entry['expire']) + payload
+
+def decode_entry(data):
+    """
+    قراءة عنصر التخزين المؤقت من البايتات
+
+    :param data: محتوى الملف كاملاً
+    :return: قاموس العنصر
+    :raises ValueError: إذا لم تكن الترويسة صالحة
+    """
+    magic, serializer_id, expire = CACHE_HEADER.unpack_from(data)
+    if magic != CACHE_MAGIC:
+        raise ValueError('ترويسة ملف التخزين المؤقت غير صالحة')
+
+    payload = memoryview(data)[CACHE_HEADER.size:]
+    if serializer_id == SERIALIZER_PICKLE:
+        entry = pickle.loads(payload)
+    elif serializer_id == SERIALIZER_MSGPACK:
+        entry = msgpack.unpackb(payload, raw=False)
+    elif serializer_id == SERIALIZER_JSON:
+        entry = json.loads(bytes(payload).decode('utf-8'))
+    else:
+        raise ValueError(f'صيغة تسلسل غير معروفة: {serializer_id}')
+
+    entry['expire'] = expire
+    return entry
+
+def read_entry_expire(path):
+    """
+    قراءة وقت انتهاء الصلاحية من ترويسة الملف فقط دون قراءة البيانات
 
-    def __init__(self, cache_dir='cache', default_timeout=300):
+    :param path: مسار ملف التخزين المؤقت
+    :return: وقت انتهاء الصلاحية (طابع زمني)
+    :raises ValueError: إذا لم تكن الترويسة صالحة
+    """
+    with open(path, 'rb') as f:
+        header = f.read(CACHE_HEADER.size)
+    if len(header) < CACHE_HEADER.size:
+        raise ValueError('ملف التخزين المؤقت ناقص')
+    magic, _, expire = CACHE_HEADER.unpack(header)
+    if magic != CACHE_MAGIC:
+        raise ValueError('ترويسة ملف التخزين المؤقت غير صالحة')
+    return expire
+
+class MemoryCache:
+    """
+    طبقة تخزين مؤقت داخل الذاكرة (LRU) محدودة بعدد العناصر وحجمها التقريبي
+
+    تُحفظ العناصر مرمزة (نفس بايتات القرص) وتُفك عند كل قراءة، فتعديل القيمة
+    المُرجعة لا يغير ما في الذاكرة.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=16 * 1024 * 1024):
         """
-        تهيئة مدير التخزين المؤقت
+        تهيئة طبقة الذاكرة
+
+        :param max_entries: الحد الأقصى لعدد العناصر (0 لتعطيل الطبقة)
+        :param max_bytes: الحد الأقصى للحجم التقريبي بالبايت
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (data, expire, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # عدادات الإحصائيات
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, allow_stale=False):
+        """
+        الحصول على عنصر من الذاكرة
+
+        :param key: مفتاح التخزين المؤقت
+        :param allow_stale: إرجاع العنصر حتى لو انتهت صلاحيته
+        :return: قاموس العنصر (value, expire, created_at, delta) أو None عند الإخفاق
+        """
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+
+            data, expire, _ = item
+            if expire < time.time():
+                self.misses += 1
+                if not allow_stale:
+                    self._remove(key)
+                    return None
+            else:
+                # نقل العنصر إلى نهاية القائمة (الأحدث استخدامًا)
+                self._entries.move_to_end(key)
+                self.hits += 1
+
+        # فك الترميز خارج القفل: نسخة مستقلة لكل مستدعٍ
+        entry = decode_entry(data)
+        entry['expire'] = expire
+        return entry
+
+    def set(self, key, data, expire):
+        """
+        حفظ عنصر في الذاكرة مع طرد الأقدم استخدامًا عند تجاوز الحدود
+
+        :param key: مفتاح التخزين المؤقت
+        :param data: بايتات العنصر كما تُحفظ على القرص
+        :param expire: وقت انتهاء الصلاحية (طابع زمني)
+        """
+        size = len(data)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            # القيم الأكبر من الطبقة كاملة تبقى على القرص فقط
+            self.delete(key)
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (data, expire, size)
+            self._bytes += size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def delete(self, key):
+        """حذف قيمة من الذاكرة"""
+        with self._lock:
+            return self._remove(key)
+
+    def clear(self):
+        """مسح جميع القيم من الذاكرة"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        """حذف عنصر وتحديث الحجم (يجب استدعاؤها مع القفل)"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[2]
+        return True
+
+    def stats(self):
+        """إحصائيات طبقة الذاكرة"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0
+            }
+
+class TagRegistry:
+    """
+    سجل إصدارات الوسوم (tags) المشترك بين عمليات gunicorn
+
+    كل وسم ملف صغير داخل مجلد الوسوم يحتوي على رمز الإصدار الحالي. إبطال وسم يعني
+    كتابة رمز جديد، فتصبح كل العناصر المحفوظة بالرمز القديم غير صالحة. كل إبطال
+    يكتب أيضًا رمز جيل فريدًا في ملف _generation، فتكفي قراءته لمعرفة ما إذا تغير
+    أي وسم في عملية أخرى (وقت تعديل المجلد لا يكفي: دقته بضعة أجزاء من الثانية).
+    """
+
+    def __init__(self, tags_dir):
+        """
+        تهيئة سجل الوسوم
+
+        :param tags_dir: مسار مجلد ملفات الوسوم
+        """
+        self.tags_dir = tags_dir
+        self._generation_path = os.path.join(tags_dir, '_generation')
+        self._versions = {}
+        self._generation = None
+        self._lock = threading.Lock()
+
+        if not os.path.exists(tags_dir):
+            os.makedirs(tags_dir)
+
+    def _tag_path(self, tag):
+        """مسار ملف الوسم"""
+        return os.path.join(self.tags_dir, hashlib.md5(tag.encode()).hexdigest() + '.tag')
+
+    def _write(self, path, content):
+        """كتابة ملف صغير بشكل ذري (ملف مؤقت ثم os.replace)"""
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+
+    def _read_generation(self):
+        """رمز الجيل الحالي ('' قبل أول إبطال)"""
+        try:
+            with open(self._generation_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return ''
+
+    def _refresh(self):
+        """إعادة تحميل الإصدارات إذا تغير الجيل منذ آخر قراءة (يجب استدعاؤها مع القفل)"""
+        # قراءة الجيل قبل الملفات: الإبطال يكتب الوسوم ثم الجيل، فلا يضيع تغيير
+        generation = self._read_generation()
+        if generation == self._generation:
+            return
+
+        versions = {}
+        for filename in os.listdir(self.tags_dir):
+            if filename.endswith('.tag'):
+                try:
+                    with open(os.path.join(self.tags_dir, filename), 'r', encoding='utf-8') as f:
+                        versions[filename[:-4]] = f.read()
+                except OSError:
+                    continue
+        self._versions = versions
+        self._generation = generation
+
+    def snapshot(self, tags):
+        """
+        الحصول على الإصدارات الحالية لمجموعة وسوم
+
+        :param tags: قائمة الوسوم
+        :return: قاموس {الوسم: الإصدار}
+        """
+        with self._lock:
+            self._refresh()
+            return {
+                tag: self._versions.get(hashlib.md5(tag.encode()).hexdigest(), '0')
+                for tag in tags
+            }
+
+    def is_valid(self, snapshot):
+        """التحقق من أن إصدارات الوسوم لم تتغير منذ حفظ العنصر"""
+        return self.snapshot(snapshot) == snapshot
+
+    def invalidate(self, tags):
+        """
+        إبطال مجموعة وسوم بكتابة إصدار جديد لكل منها
+
+        :param tags: قائمة الوسوم
+        :return: عدد الوسوم التي تم إبطالها
+        """
+        count = 0
+        version = f"{time.time_ns()}-{os.getpid()}"
+        for tag in set(tags):
+            self._write(self._tag_path(tag), version)
+            count += 1
+
+        if count:
+            # رمز جيل فريد في كل إبطال (لا قراءة ثم زيادة، فلا تتعارض العمليات)
+            self._write(self._generation_path, f"{version}-{random.getrandbits(64):016x}")
+        with self._lock:
+            # فرض إعادة التحميل في القراءة التالية
+            self._generation = None
+        return count
+
+class CacheBackend:
+    """
+    واجهة طبقة التخزين الدائم للتخزين المؤقت
+
+    تتعامل الطبقة مع بايتات مُرمّزة (encode_entry) ووقت انتهاء الصلاحية فقط،
+    أما التسلسل والوسوم وطبقة الذاكرة فمسؤولية CacheManager.
+    """
+
+    def get(self, key):
+        """الحصول على بايتات العنصر أو None"""
+        raise NotImplementedError
+
+    def get_many(self, keys):
+        """
+        الحصول على عدة عناصر دفعة واحدة
+
+        :return: قاموس {المفتاح: البايتات} للمفاتيح الموجودة فقط
+        """
+        result = {}
+        for key in keys:
+            data = self.get(key)
+            if data is not None:
+                result[key] = data
+        return result
+
+    def set(self, key, data, expire):
+        """حفظ بايتات العنصر مع وقت انتهاء الصلاحية"""
+        raise NotImplementedError
+
+    def set_many(self, items):
+        """
+        حفظ عدة عناصر دفعة واحدة
+
+        :param items: قائمة (المفتاح، البايتات، وقت انتهاء الصلاحية)
+        """
+        for key, data, expire in items:
+            self.set(key, data, expire)
+
+    def delete(self, key):
+        """حذف عنصر، True إذا كان موجودًا"""
+        raise NotImplementedError
 
+    def clear(self):
+        """حذف جميع العناصر، يعيد عدد العناصر المحذوفة"""
+        raise NotImplementedError
+
+    def cleanup(self):
+        """حذف العناصر منتهية الصلاحية، يعيد عدد العناصر المحذوفة"""
+        raise NotImplementedError
+
+    def janitor_step(self, report, max_bytes, slice_size):
+        """
+        تنفيذ دفعة تنظيف محدودة
+
+        :param report: قاموس التقرير المراد تحديثه (scanned, expired, evicted, bytes_reclaimed)
+        :param max_bytes: الحد الأقصى للحجم الكلي (0 بلا حد)
+        :param slice_size: حجم الدفعة
+        :return: (اكتملت دورة كاملة؟، الحجم الكلي التقديري بالبايت)
+        """
+        raise NotImplementedError
+
+class FileBackend(CacheBackend):
+    """تخزين كل عنصر في ملف مستقل داخل مجلدات فرعية حسب أول حرفين من التجزئة"""
+
+    SHARDS = [f"{i:02x}" for i in range(256)]
+
+    def __init__(self, cache_dir):
+        """
         :param cache_dir: مسار مجلد التخزين المؤقت
-        :param default_timeout: وقت انتهاء الصلاحية الافتراضي بالثواني
         """
         self.cache_dir = cache_dir
-        self.default_timeout = default_timeout
+        self._known_shards = set()
+
+        # حالة المنظف: موضع الدفعة التالية وحجم كل مجلد فرعي عند آخر فحص
+        self._position = 0
+        self._usage = {}
 
-        # إنشاء مجلد التخزين المؤقت إذا لم يكن موجودًا
         if not os.path.exists(cache_dir):
             os.makedirs(cache_dir)
 
     def _get_cache_path(self, key):
-        """الحصول على مسار ملف التخزين المؤقت بناءً على المفتاح"""
+        """الحصول على مسار ملف التخزين المؤقت بناءً على المفتاح (مجزأ حسب أول حرفين من التجزئة)"""
         # إنشاء تجزئة فريدة للمفتاح
         key_hash = hashlib.md5(key.encode()).hexdigest()
-        return os.path.join(self.cache_dir, f"{key_hash}.cache")
+        return os.path.join(self.cache_dir, key_hash[:2], f"{key_hash}.cache")
+
+    def _iter_cache_files(self):
+        """المرور على جميع ملفات التخزين المؤقت في المجلدات الفرعية"""
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_dir() and len(entry.name) == 2:
+                for shard_entry in os.scandir(entry.path):
+                    if shard_entry.name.endswith(('.cache', '.tmp')):
+                        yield shard_entry
+            elif entry.name.endswith('.cache'):
+                # ملفات JSON القديمة في المجلد الرئيسي
+                yield entry
+
+    def get(self, key):
+        try:
+            with open(self._get_cache_path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
 
-    def set(self, key, value, timeout=None):
+    def set(self, key, data, expire):
+        """كتابة الملف بشكل ذري عبر ملف مؤقت ثم إعادة تسمية"""
+        cache_path = self._get_cache_path(key)
+        shard_dir = os.path.dirname(cache_path)
+        if shard_dir not in self._known_shards:
+            os.makedirs(shard_dir, exist_ok=True)
+            self._known_shards.add(shard_dir)
+
+        fd, temp_path = tempfile.mkstemp(dir=shard_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, cache_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def delete(self, key):
+        try:
+            os.remove(self._get_cache_path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def clear(self):
+        count = 0
+        for entry in self._iter_cache_files():
+            os.remove(entry.path)
+            count += 1
+        self._usage.clear()
+        return count
+
+    def cleanup(self):
+        """يكفي قراءة الترويسة الثابتة لكل ملف دون فك تسلسل البيانات"""
+        count = 0
+        current_time = time.time()
+
+        for entry in self._iter_cache_files():
+            try:
+                if entry.name.endswith('.tmp'):
+                    # ملفات مؤقتة متروكة من كتابة فاشلة
+                    expired = entry.stat().st_mtime < current_time - 3600
+                else:
+                    expired = read_entry_expire(entry.path) < current_time
+            except (OSError, ValueError):
+                # في حالة وجود مشكلة في الملف، نقوم بحذفه
+                expired = True
+
+            if expired:
+                try:
+                    os.remove(entry.path)
+                    count += 1
+                except FileNotFoundError:
+                    pass
+
+        return count
+
+    def _scan_shard(self, shard, report, max_bytes):
+        """فحص مجلد فرعي واحد وحذف العناصر منتهية الصلاحية أو الزائدة عن الحد"""
+        shard_path = os.path.join(self.cache_dir, shard)
+        try:
+            entries = list(os.scandir(shard_path))
+        except FileNotFoundError:
+            self._usage.pop(shard, None)
+            return
+
+        current_time = time.time()
+        files = []
+        for entry in entries:
+            try:
+                stat = entry.stat()
+                if entry.name.endswith('.tmp'):
+                    # ملفات مؤقتة متروكة من كتابة فاشلة
+                    if stat.st_mtime < current_time - 3600:
+                        os.remove(entry.path)
+                        report['bytes_reclaimed'] += stat.st_size
+                    continue
+                if not entry.name.endswith('.cache'):
+                    continue
+
+                report['scanned'] += 1
+                try:
+                    expire = read_entry_expire(entry.path)
+                except ValueError:
+                    expire = 0
+
+                if expire < current_time:
+                    os.remove(entry.path)
+                    report['expired'] += 1
+                    report['bytes_reclaimed'] += stat.st_size
+                else:
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+            except FileNotFoundError:
+                # حذفه طلب آخر أثناء الفحص
+                continue
+
+        shard_bytes = sum(size for _, size, _ in files)
+        self._usage[shard] = shard_bytes
+
+        # التجزئة موزعة بالتساوي، فحصة كل مجلد فرعي من الحد الأقصى متساوية
+        if max_bytes and sum(self._usage.values()) > max_bytes:
+            shard_budget = max_bytes / len(self.SHARDS)
+            for _, size, path in sorted(files):
+                if shard_bytes <= shard_budget:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                shard_bytes -= size
+                report['evicted'] += 1
+                report['bytes_reclaimed'] += size
+            self._usage[shard] = shard_bytes
+
+    def janitor_step(self, report, max_bytes, slice_size):
+        completed = False
+        for _ in range(slice_size):
+            self._scan_shard(self.SHARDS[self._position], report, max_bytes)
+            self._position = (self._position + 1) % len(self.SHARDS)
+            if self._position == 0:
+                completed = True
+        return completed, sum(self._usage.values())
+
+class SQLiteBackend(CacheBackend):
+    """
+    تخزين جميع العناصر في ملف SQLite واحد (وضع WAL)
+
+    آمن للاستخدام من عدة عمليات gunicorn، ويحتوي على فهرس لوقت انتهاء الصلاحية
+    فيتم التنظيف دون المرور على جميع العناصر.
+    """
+
+    # الحد الأقصى لعدد المعاملات في استعلام IN واحد
+    BATCH_SIZE = 500
+
+    def __init__(self, db_path):
+        """
+        :param db_path: مسار ملف قاعدة البيانات
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expire REAL NOT NULL,
+                size INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_expire ON cache_entries (expire)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_updated_at ON cache_entries (updated_at)")
+
+    def _connection(self):
+        """اتصال مستقل لكل خيط ولكل عملية (لا يُشارك الاتصال بعد fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, keys):
+        keys = list(keys)
+        result = {}
+        conn = self._connection()
+        for i in range(0, len(keys), self.BATCH_SIZE):
+            batch = keys[i:i + self.BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            for key, value in conn.execute(
+                f"SELECT key, value FROM cache_entries WHERE key IN ({placeholders})", batch
+            ):
+                result[key] = value
+        return result
+
+    def set(self, key, data, expire):
+        self.set_many([(key, data, expire)])
+
+    def set_many(self, items):
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expire, size, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(key, data, expire, len(data), now) for key, data, expire in items]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, key):
+        cursor = self._connection().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+        return cursor.rowcount > 0
+
+    def clear(self):
+        return self._connection().execute("DELETE FROM cache_entries").rowcount
+
+    def cleanup(self):
+        return self._connection().execute(
+            "DELETE FROM cache_entries WHERE expire < ?", (time.time(),)
+        ).rowcount
+
+    def janitor_step(self, report, max_bytes, slice_size):
+        # كل مجلد فرعي في FileBackend يقابل هنا دفعة من 64 عنصرًا تقريبًا
+        limit = slice_size * 64
+        conn = self._connection()
+
+        rows = conn.execute(
+            "SELECT rowid, size FROM cache_entries WHERE expire < ? ORDER BY expire LIMIT ?",
+            (time.time(), limit)
+        ).fetchall()
+        if rows:
+            conn.executemany("DELETE FROM cache_entries WHERE rowid = ?", [(row[0],) for row in rows])
+            report['expired'] += len(rows)
+            report['bytes_reclaimed'] += sum(row[1] for row in rows)
+        report['scanned'] += len(rows)
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        if max_bytes and total > max_bytes:
+            excess = total - max_bytes
+            evicted = []
+            for rowid, size in conn.execute(
+                "SELECT rowid, size FROM cache_entries ORDER BY updated_at LIMIT ?", (limit,)
+            ):
+                if excess <= 0:
+                    break
+                evicted.append((rowid,))
+                excess -= size
+                report['bytes_reclaimed'] += size
+                total -= size
+            conn.executemany("DELETE FROM cache_entries WHERE rowid = ?", evicted)
+            report['evicted'] += len(evicted)
+
+        # الدورة مكتملة عندما لا يبقى ما يُحذف بعد هذه الدفعة
+        return len(rows) < limit and (not max_bytes or total <= max_bytes), total
+
+def create_backend(name, cache_dir):
+    """
+    إنشاء طبقة التخزين حسب الاسم
+
+    :param name: file أو sqlite
+    :param cache_dir: مسار مجلد التخزين المؤقت
+    """
+    if name == 'sqlite':
+        return SQLiteBackend(os.path.join(cache_dir, 'cache.sqlite3'))
+    if name == 'file':
+        return FileBackend(cache_dir)
+    raise ValueError(f'طبقة تخزين غير معروفة: {name}')
+
+class CacheManager:
+    """مدير التخزين المؤقت للبيانات"""
+
+    def __init__(self, cache_dir=None, default_timeout=300, memory_max_entries=None, memory_max_bytes=None,
+                 serializer=None, backend=None):
+        """
+        تهيئة مدير التخزين المؤقت
+
+        المجلد وطبقة التخزين وسجل الوسوم تُنشأ عند أول استخدام، فاستيراد الوحدة لا
+        يكتب أي ملف (انظر configure و init_cache).
+
+        :param cache_dir: مسار مجلد التخزين المؤقت (الافتراضي CACHE_DIR من الإعدادات)
+        :param default_timeout: وقت انتهاء الصلاحية الافتراضي بالثواني
+        :param memory_max_entries: الحد الأقصى لعناصر طبقة الذاكرة (الافتراضي من الإعدادات)
+        :param memory_max_bytes: الحد الأقصى لحجم طبقة الذاكرة بالبايت (الافتراضي من الإعدادات)
+        :param serializer: صيغة التسلسل pickle أو msgpack أو json (الافتراضي من الإعدادات)
+        :param backend: طبقة التخزين: اسم (file أو sqlite) أو كائن CacheBackend (الافتراضي من الإعدادات)
+        """
+        self._cache_dir = cache_dir
+        self.default_timeout = default_timeout
+        self.serializer = serializer or Config.CACHE_SERIALIZER
+
+        # طبقة الذاكرة أمام طبقة التخزين الدائم
+        self.memory = MemoryCache(
+            max_entries=memory_max_entries if memory_max_entries is not None else Config.CACHE_MEMORY_MAX_ENTRIES,
+            max_bytes=memory_max_bytes if memory_max_bytes is not None else Config.CACHE_MEMORY_MAX_BYTES
+        )
+        self.disk_hits = 0
+        self.disk_misses = 0
+
+        self._backend_option = backend
+        self._backend = None
+        self._tags = None
+        self._open_lock = threading.Lock()
+
+    @property
+    def cache_dir(self):
+        """مسار مجلد التخزين المؤقت"""
+        return self._cache_dir or Config.CACHE_DIR
+
+    def _open(self):
+        """إنشاء المجلد وطبقة التخزين وسجل الوسوم عند أول استخدام"""
+        with self._open_lock:
+            if self._backend is not None:
+                return
+            cache_dir = self.cache_dir
+            if not os.path.exists(cache_dir):
+                os.makedirs(cache_dir)
+
+            backend = self._backend_option
+            if backend is None or isinstance(backend, str):
+                backend = create_backend(backend or Config.CACHE_BACKEND, cache_dir)
+
+            # سجل الوسوم لإبطال العناصر عند تغير البيانات
+            self._tags = TagRegistry(os.path.join(cache_dir, '_tags'))
+            self._backend = backend
+
+    @property
+    def backend(self):
+        """طبقة التخزين الدائم"""
+        if self._backend is None:
+            self._open()
+        return self._backend
+
+    @property
+    def tags(self):
+        """سجل الوسوم المشترك بين العمليات"""
+        if self._backend is None:
+            self._open()
+        return self._tags
+
+    def configure(self, cache_dir):
+        """
+        تغيير مجلد التخزين المؤقت (قبل الاستخدام أو لإعادة التوجيه في الاختبارات)
+
+        :param cache_dir: المسار الجديد
+        """
+        with self._open_lock:
+            self._cache_dir = cache_dir
+            self._backend = None
+            self._tags = None
+        self.memory.clear()
+
+    def _build_entry(self, value, timeout, delta, tags):
+        """إنشاء عنصر التخزين المؤقت وترميزه"""
+        if tags and not isinstance(tags, dict):
+            tags = self.tags.snapshot(tags)
+
+        # تحديد وقت انتهاء الصلاحية
+        expire_time = time.time() + (timeout if timeout is not None else self.default_timeout)
+
+        # إنشاء بيانات التخزين المؤقت
+        cache_data = {
+            'value': value,
+            'expire': expire_time,
+            'created_at': time.time(),
+            'delta': delta,
+            'tags': tags or {}
+        }
+        return cache_data, encode_entry(cache_data, self.serializer)
+
+    def set(self, key, value, timeout=None, delta=0, tags=None):
         """
         حفظ قيمة في التخزين المؤقت
 
         :param key: مفتاح التخزين المؤقت
         :param value: القيمة المراد حفظها
         :param timeout: وقت انتهاء الصلاحية بالثواني (إذا لم يتم تحديده، سيتم استخدام القيمة الافتراضية)
+        :param delta: مدة حساب القيمة بالثواني (تُستخدم للتحديث الاحتمالي المبكر)
+        :param tags: قائمة وسوم العنصر، أو لقطة إصدارات أُخذت قبل حساب القيمة (tag_snapshot)
         :return: True إذا تم الحفظ بنجاح، False في حالة الخطأ
         """
         try:
-            # تحديد وقت انتهاء الصلاحية
-            expire_time = time.time() + (timeout if timeout is not None else self.default_timeout)
-
-            # إنشاء بيانات التخزين المؤقت
-            cache_data = {
-                'value': value,
-                'expire': expire_time,
-                'created_at': time.time()
-            }
+            cache_data, data = self._build_entry(value, timeout, delta, tags)
+            self.backend.set(key, data, cache_data['expire'])
 
-            # الحصول على مسار ملف التخزين المؤقت
-            cache_path = self._get_cache_path(key)
+            # تحديث طبقة الذاكرة
+            self.memory.set(key, data, cache_data['expire'])
 
-            # حفظ البيانات في ملف
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
+            return True
+        except Exception as e:
+            print(f"خطأ في حفظ التخزين المؤقت: {e}")
+            return False
 
+    def set_many(self, mapping, timeout=None, tags=None):
+        """
+        حفظ عدة قيم دفعة واحدة
+
+        :param mapping: قاموس {المفتاح: القيمة}
+        :param timeout: وقت انتهاء الصلاحية بالثواني
+        :param tags: وسوم مشتركة لجميع القيم
+        :return: True إذا تم الحفظ بنجاح، False في حالة الخطأ
+        """
+        try:
+            if tags and not isinstance(tags, dict):
+                tags = self.tags.snapshot(tags)
+
+            items = []
+            for key, value in mapping.items():
+                cache_data, data = self._build_entry(value, timeout, 0, tags)
+                items.append((key, data, cache_data['expire']))
+                self.memory.set(key, data, cache_data['expire'])
+
+            self.backend.set_many(items)
             return True
         except Exception as e:
             print(f"خطأ في حفظ التخزين المؤقت: {e}")
@@ -73,27 +846,100 @@ class CacheManager:
         :param key: مفتاح التخزين المؤقت
         :return: القيمة إذا كانت موجودة وصالحة، None إذا كانت منتهية الصلاحية أو غير موجودة
         """
+        entry = self.get_entry(key)
+        return entry['value'] if entry else None
+
+    def get_many(self, keys):
+        """
+        الحصول على عدة قيم دفعة واحدة (استعلام واحد لطبقة التخزين للمفاتيح غير الموجودة في الذاكرة)
+
+        :param keys: قائمة المفاتيح
+        :return: قاموس {المفتاح: القيمة} للقيم الموجودة والصالحة فقط
+        """
+        result = {}
+        missing = []
+        for key in keys:
+            entry = self._get_memory_entry(key, allow_stale=False)
+            if entry is not None:
+                result[key] = entry['value']
+            else:
+                missing.append(key)
+
+        if missing:
+            try:
+                stored = self.backend.get_many(missing)
+            except Exception as e:
+                print(f"خطأ في قراءة التخزين المؤقت: {e}")
+                stored = {}
+
+            for key in missing:
+                data = stored.get(key)
+                entry = self._load_entry(key, data, allow_stale=False) if data is not None else None
+                if data is None:
+                    self.disk_misses += 1
+                if entry is not None:
+                    result[key] = entry['value']
+        return result
+
+    def get_entry(self, key, allow_stale=False):
+        """
+        الحصول على عنصر التخزين المؤقت كاملاً مع بياناته الوصفية
+
+        :param key: مفتاح التخزين المؤقت
+        :param allow_stale: إرجاع العنصر منتهي الصلاحية بدلاً من حذفه
+        :return: قاموس (value, expire, created_at, delta) أو None
+        """
+        # البحث في طبقة الذاكرة أولاً
+        entry = self._get_memory_entry(key, allow_stale)
+        if entry is not None:
+            return entry
+
         try:
-            # الحصول على مسار ملف التخزين المؤقت
-            cache_path = self._get_cache_path(key)
+            data = self.backend.get(key)
+        except Exception as e:
+            print(f"خطأ في قراءة التخزين المؤقت: {e}")
+            data = None
 
-            # التحقق من وجود الملف
-            if not os.path.exists(cache_path):
-                return None
+        if data is None:
+            self.disk_misses += 1
+            return None
+        return self._load_entry(key, data, allow_stale)
 
-            # قراءة البيانات من الملف
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
+    def _get_memory_entry(self, key, allow_stale):
+        """البحث في طبقة الذاكرة مع التحقق من الوسوم"""
+        entry = self.memory.get(key, allow_stale=allow_stale)
+        if entry is not None and entry.get('tags') and not self.tags.is_valid(entry['tags']):
+            self.delete(key)
+            return None
+        return entry
+
+    def _load_entry(self, key, data, allow_stale):
+        """فك ترميز عنصر مقروء من طبقة التخزين والتحقق من صلاحيته"""
+        try:
+            cache_data = decode_entry(data)
+
+            # التحقق من إبطال الوسوم
+            if cache_data.get('tags') and not self.tags.is_valid(cache_data['tags']):
+                self.backend.delete(key)
+                self.disk_misses += 1
+                return None
 
             # التحقق من انتهاء الصلاحية
             if cache_data['expire'] < time.time():
-                # حذف الملف منتهي الصلاحية
-                os.remove(cache_path)
+                self.disk_misses += 1
+                if allow_stale:
+                    return cache_data
+                # حذف العنصر منتهي الصلاحية
+                self.backend.delete(key)
                 return None
 
-            return cache_data['value']
+            # ترقية القيمة إلى طبقة الذاكرة
+            self.disk_hits += 1
+            self.memory.set(key, data, cache_data['expire'])
+            return cache_data
         except Exception as e:
             print(f"خطأ في قراءة التخزين المؤقت: {e}")
+            self.disk_misses += 1
             return None
 
     def delete(self, key):
@@ -103,17 +949,10 @@ class CacheManager:
         :param key: مفتاح التخزين المؤقت
         :return: True إذا تم الحذف بنجاح، False في حالة الخطأ
         """
-        try:
-            # الحصول على مسار ملف التخزين المؤقت
-            cache_path = self._get_cache_path(key)
-
-            # التحقق من وجود الملف
-            if not os.path.exists(cache_path):
-                return False
+        self.memory.delete(key)
 
-            # حذف الملف
-            os.remove(cache_path)
-            return True
+        try:
+            return self.backend.delete(key)
         except Exception as e:
             print(f"خطأ في حذف التخزين المؤقت: {e}")
             return False
@@ -122,84 +961,307 @@ class CacheManager:
         """
         مسح جميع البيانات من التخزين المؤقت
 
-        :return: عدد الملفات المحذفة
+        :return: عدد العناصر المحذوفة
         """
+        self.memory.clear()
+
         try:
-            count = 0
-            for filename in os.listdir(self.cache_dir):
-                if filename.endswith('.cache'):
-                    os.remove(os.path.join(self.cache_dir, filename))
-                    count += 1
-            return count
+            return self.backend.clear()
         except Exception as e:
             print(f"خطأ في مسح التخزين المؤقت: {e}")
             return 0
 
     def cleanup(self):
         """
-        مسح جميع الملفات منتهية الصلاحية من التخزين المؤقت
+        مسح جميع العناصر منتهية الصلاحية من التخزين المؤقت
 
-        :return: عدد الملفات المحذفة
+        :return: عدد العناصر المحذوفة
         """
         try:
-            count = 0
-            current_time = time.time()
-
-            for filename in os.listdir(self.cache_dir):
-                if filename.endswith('.cache'):
-                    cache_path = os.path.join(self.cache_dir, filename)
-
-                    try:
-                        # قراءة وقت انتهاء الصلاحية
-                        with open(cache_path, 'r', encoding='utf-8') as f:
-                            cache_data = json.load(f)
-
-                        # حذف الملفات منتهية الصلاحية
-                        if cache_data['expire'] < current_time:
-                            os.remove(cache_path)
-                            count += 1
-                    except:
-                        # في حالة وجود مشكلة في الملف، نقوم بحذفه
-                        os.remove(cache_path)
-                        count += 1
-
-            return count
+            return self.backend.cleanup()
         except Exception as e:
             print(f"خطأ في تنظيف التخزين المؤقت: {e}")
             return 0
 
-def cached(timeout=None, key_prefix='cache'):
+    def tag_snapshot(self, tags):
+        """
+        أخذ لقطة لإصدارات الوسوم قبل حساب القيمة
+
+        تمريرها إلى set بدلاً من قائمة الوسوم يضمن عدم حفظ قيمة حُسبت من بيانات
+        تغيرت أثناء الحساب.
+
+        :param tags: قائمة الوسوم
+        :return: قاموس {الوسم: الإصدار}
+        """
+        return self.tags.snapshot(tags)
+
+    def invalidate_tags(self, *tags):
+        """
+        إبطال جميع العناصر المرتبطة بالوسوم المحددة في جميع العمليات
+
+        :param tags: الوسوم المراد إبطالها (مثل 'products' أو 'sales:2026-10')
+        :return: عدد الوسوم التي تم إبطالها
+        """
+        try:
+            return self.tags.invalidate(tags)
+        except Exception as e:
+            print(f"خطأ في إبطال وسوم التخزين المؤقت: {e}")
+            return 0
+
+    def stats(self):
+        """
+        إحصائيات التخزين المؤقت لكل عملية (مفيدة لضبط حجم طبقة الذاكرة لكل عامل gunicorn)
+
+        :return: قاموس يحتوي على إحصائيات طبقتي الذاكرة والقرص
+        """
+        return {
+            'pid': os.getpid(),
+            'backend': type(self.backend).__name__,
+            'memory': self.memory.stats(),
+            'disk': {
+                'hits': self.disk_hits,
+                'misses': self.disk_misses
+            }
+        }
+
+class CacheJanitor:
+    """
+    منظف التخزين المؤقت في الخلفية
+
+    يعالج طبقة التخزين على دفعات صغيرة فلا يحجز أي طلب، ويحذف العناصر منتهية
+    الصلاحية ثم يفرض حدًا أقصى للحجم بحذف الأقدم أولاً.
+    """
+
+    def __init__(self, manager, max_bytes=None, slice_size=None, interval=None):
+        """
+        تهيئة المنظف
+
+        :param manager: مدير التخزين المؤقت
+        :param max_bytes: الحد الأقصى لحجم التخزين (0 بلا حد)
+        :param slice_size: حجم الدفعة (عدد المجلدات الفرعية لطبقة الملفات)
+        :param interval: الفاصل بين الدفعات بالثواني
+        """
+        self.manager = manager
+        self.max_bytes = max_bytes if max_bytes is not None else Config.CACHE_MAX_BYTES
+        self.slice_size = slice_size or Config.CACHE_JANITOR_SLICE_SIZE
+        self.interval = interval if interval is not None else Config.CACHE_JANITOR_INTERVAL
+
+        self._bytes_total = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # إحصائيات تراكمية منذ بدء التشغيل
+        self.totals = {'scanned': 0, 'expired': 0, 'evicted': 0, 'bytes_reclaimed': 0, 'passes': 0}
+
+    def run_slice(self):
+        """
+        معالجة الدفعة التالية
+
+        :return: تقرير بما تم فحصه وحذفه في هذه الدفعة
+        """
+        started = time.time()
+        report = {'scanned': 0, 'expired': 0, 'evicted': 0, 'bytes_reclaimed': 0}
+
+        completed, self._bytes_total = self.manager.backend.janitor_step(report, self.max_bytes, self.slice_size)
+        if completed:
+            self.totals['passes'] += 1
+
+        for name in ('scanned', 'expired', 'evicted', 'bytes_reclaimed'):
+            self.totals[name] += report[name]
+
+        report['completed'] = completed
+        report['bytes_total'] = self._bytes_total
+        report['duration'] = round(time.time() - started, 4)
+        return report
+
+    def run_full(self):
+        """
+        تشغيل دورة كاملة على جميع العناصر (مناسبة لسطر الأوامر)
+
+        :return: تقرير مجمّع للدورة
+        """
+        report = {'scanned': 0, 'expired': 0, 'evicted': 0, 'bytes_reclaimed': 0, 'duration': 0}
+        # دورتان: الأولى تحسب الحجم الكلي، والثانية تفرض الحد الأقصى بناءً عليه
+        passes = 2 if self.max_bytes else 1
+        while passes:
+            slice_report = self.run_slice()
+            for name in ('scanned', 'expired', 'evicted', 'bytes_reclaimed', 'duration'):
+                report[name] += slice_report[name]
+            if slice_report['completed']:
+                passes -= 1
+        report['bytes_total'] = self._bytes_total
+        return report
+
+    def _run(self):
+        """حلقة التنظيف في الخيط الخلفي"""
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.run_slice()
+            except Exception as e:
+                print(f"خطأ في منظف التخزين المؤقت: {e}")
+
+    def start(self):
+        """تشغيل المنظف في خيط خلفي (مرة واحدة لكل عملية)"""
+        if self._thread is not None and self._thread.is_alive():
+            return False
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='cache-janitor', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """إيقاف الخيط الخلفي"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self):
+        """إحصائيات المنظف"""
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'backend': type(self.manager.backend).__name__,
+            'max_bytes': self.max_bytes,
+            'bytes_total': self._bytes_total,
+            **self.totals
+        }
+
+# أقفال إعادة الحساب لكل مفتاح (تُحذف تلقائيًا عند عدم استخدامها)
+_flight_locks = weakref.WeakValueDictionary()
+_flight_locks_guard = threading.Lock()
+
+def _get_flight_lock(key):
+    """الحصول على قفل إعادة الحساب الخاص بالمفتاح"""
+    with _flight_locks_guard:
+        lock = _flight_locks.get(key)
+        if lock is None:
+            lock = threading.Lock()
+            _flight_locks[key] = lock
+        return lock
+
+def _should_refresh_early(entry, beta):
+    """
+    تحديد ما إذا كان يجب إعادة حساب القيمة قبل انتهاء صلاحيتها (XFetch)
+
+    كلما اقترب وقت انتهاء الصلاحية وزادت مدة الحساب زاد احتمال التحديث المبكر،
+    فلا تنتهي صلاحية المفاتيح الشائعة كلها في اللحظة نفسها.
+    """
+    if not beta or not entry.get('delta'):
+        return False
+    return time.time() - entry['delta'] * beta * math.log(1.0 - random.random()) >= entry['expire']
+
+def month_tag(prefix, value=None):
+    """
+    إنشاء وسم شهري مثل 'sales:2026-10'
+
+    :param prefix: بادئة الوسم
+    :param value: التاريخ (الافتراضي هو الوقت الحالي)
+    """
+    return f"{prefix}:{(value or datetime.utcnow()).strftime('%Y-%m')}"
+
+def cached(timeout=None, key_prefix='cache', manager=None, early_refresh=False, serve_stale=True, tags=None):
     """
     منشئ الديكور لتخزين مؤقت للدوال
 
+    عند انتهاء صلاحية المفتاح يعيد حساب القيمة مستدعٍ واحد فقط داخل العملية،
+    بينما يحصل الآخرون على القيمة القديمة أو ينتظرون انتهاء الحساب.
+
     :param timeout: وقت انتهاء الصلاحية بالثواني
     :param key_prefix: بادئة مفتاح التخزين المؤقت
+    :param manager: مدير التخزين المؤقت (الافتراضي هو المثيل المشترك cache_manager)
+    :param early_refresh: تفعيل التحديث الاحتمالي المبكر (True أو قيمة beta)
+    :param serve_stale: إرجاع القيمة القديمة أثناء إعادة الحساب بدلاً من الانتظار
+    :param tags: وسوم النتيجة (قائمة أو دالة تستقبل وسائط الدالة وتعيد قائمة)
     :return: دالة الديكور
     """
+    if early_refresh is True:
+        beta = Config.CACHE_EARLY_REFRESH_BETA
+    else:
+        beta = float(early_refresh or 0)
+
+    def _tag_snapshot(active_manager, args, kwargs):
+        """أخذ لقطة الوسوم قبل تنفيذ الدالة"""
+        if not tags:
+            return None
+        entry_tags = tags(*args, **kwargs) if callable(tags) else tags
+        return active_manager.tag_snapshot(entry_tags)
+
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # إنشاء مدير التخزين المؤقت
-            cache_manager = CacheManager()
+            # استخدام مدير التخزين المؤقت المشترك
+            active_manager = manager or cache_manager
 
             # إنشاء مفتاح فريد للدالة والوسائط
             func_args = str(args) + str(sorted(kwargs.items()))
             key = f"{key_prefix}:{func.__name__}:{hashlib.md5(func_args.encode()).hexdigest()}"
 
             # محاولة الحصول على النتيجة من التخزين المؤقت
-            cached_result = cache_manager.get(key)
-            if cached_result is not None:
-                return cached_result
+            entry = active_manager.get_entry(key, allow_stale=serve_stale)
+            if entry is not None and entry['expire'] >= time.time() and not _should_refresh_early(entry, beta):
+                return entry['value']
 
-            # تنفيذ الدالة إذا لم تكن النتيجة في التخزين المؤقت
-            result = func(*args, **kwargs)
+            lock = _get_flight_lock(key)
+            if lock.acquire(blocking=False):
+                try:
+                    # ربما أعاد مستدعٍ آخر الحساب للتو
+                    latest = active_manager.get_entry(key)
+                    if latest is not None and (entry is None or latest['created_at'] > entry['created_at']):
+                        return latest['value']
+
+                    # تنفيذ الدالة وحفظ النتيجة مع مدة الحساب
+                    snapshot = _tag_snapshot(active_manager, args, kwargs)
+                    started = time.time()
+                    result = func(*args, **kwargs)
+                    active_manager.set(key, result, timeout, delta=time.time() - started, tags=snapshot)
+                    return result
+                finally:
+                    lock.release()
+
+            # مستدعٍ آخر يعيد الحساب: نرجع القيمة القديمة إن وجدت
+            if entry is not None:
+                return entry['value']
 
-            # حفظ النتيجة في التخزين المؤقت
-            cache_manager.set(key, result, timeout)
+            # وإلا ننتظر انتهاء الحساب ثم نقرأ النتيجة
+            with lock:
+                pass
+            latest = active_manager.get_entry(key)
+            if latest is not None:
+                return latest['value']
 
+            # فشل الحساب لدى المستدعي الآخر، نعيد المحاولة مباشرة
+            snapshot = _tag_snapshot(active_manager, args, kwargs)
+            result = func(*args, **kwargs)
+            active_manager.set(key, result, timeout, tags=snapshot)
             return result
         return wrapper
     return decorator
 
+
+def init_cache(app):
+    """
+    توجيه مدير التخزين المؤقت إلى مجلد التطبيق
+
+    :param app: تطبيق Flask (CACHE_DIR في إعداداته، أو instance/cache)
+    """
+    cache_manager.configure(app.config.get('CACHE_DIR') or os.path.join(app.instance_path, 'cache'))
+
 # إنشاء مثيل مدير التخزين المؤقت
 cache_manager = CacheManager()
+cache_janitor = CacheJanitor(cache_manager)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='تنظيف التخزين المؤقت وفرض الحد الأقصى للحجم')
+    parser.add_argument('--cache-dir', default=Config.CACHE_DIR, help='مسار مجلد التخزين المؤقت')
+    parser.add_argument('--backend', default=None, choices=['file', 'sqlite'], help='طبقة التخزين')
+    parser.add_argument('--max-bytes', type=int, default=None, help='الحد الأقصى لحجم التخزين بالبايت')
+    args = parser.parse_args()
+
+    manager = CacheManager(cache_dir=args.cache_dir, backend=args.backend)
+    janitor = CacheJanitor(manager, max_bytes=args.max_bytes)
+    result = janitor.run_full()
+    print(f"🧹 تم فحص {result['scanned']} عنصر")
+    print(f"   منتهية الصلاحية: {result['expired']}، محذوفة لتجاوز الحد: {result['evicted']}")
+    print(f"   المساحة المستعادة: {result['bytes_reclaimed']} بايت، الحجم الحالي: {result['bytes_total']} بايت")
@@ -2,77 +2,492 @@
 # -*- coding: utf-8 -*-
 """
 نظام حفظ تاريخ المحادثات البرمجية
+
+كل محادثة سطر JSON يُضاف إلى نهاية الملف (chat_history.jsonl)، وملف فهرس جانبي
+(.idx) يحفظ موضع كل سطر بثمانية بايتات، فإضافة محادثة كتابة سطر واحد وقراءة آخر
+N محادثة قفزة مباشرة دون تحليل الملف كاملاً. الكتابة محمية بقفل ملف فتصلح لعدة
+خيوط وعدة عمليات. الضغط (compact) يحذف ما يزيد عن CHAT_HISTORY_MAX_ENTRIES
+ويصلح الأسطر التالفة، ويُستدعى تلقائيًا عند تجاوز الحد بربع.
+
+البحث وعدادات المواضيع من فهرس مقلوب دائم (SQLite بجانب السجل): كل محادثة
+تُفهرس كلماتها (بعد توحيد الحروف العربية) مرة واحدة عند إضافتها، فيبقى البحث
+بضعة استعلامات على المفتاح الأساسي مهما كبر السجل.
 """
 
 import json
+import math
 import os
+import sqlite3
+import struct
+import sys
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
+# إضافة المجلد الحالي إلى المسار
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from product_search import search_tokens, text_tokens
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    # ويندوز
+    import msvcrt
+    FCNTL_AVAILABLE = False
+
+# موضع كل سطر في ملف الفهرس (عدد صحيح بدون إشارة، 8 بايت)
+OFFSET = struct.Struct('<Q')
+
+# ملف التنسيق القديم (مصفوفة JSON واحدة) يُحوّل مرة واحدة
+LEGACY_HISTORY_FILE = 'chat_history.json'
+
+# الكلمات البرمجية التي تُعد في رسائل المستخدم
+PROGRAMMING_KEYWORDS = (
+    'python', 'flask', 'database', 'sql', 'html', 'css', 'javascript',
+    'function', 'class', 'route', 'template', 'form', 'validation',
+    'error', 'bug', 'fix', 'optimize', 'performance'
+)
+
+# معاملات ترتيب BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+class ChatSearchIndex:
+    """فهرس مقلوب دائم (كلمة ← محادثات) وعدادات المواضيع في ملف SQLite"""
+
+    def __init__(self, path):
+        """
+        :param path: ملف قاعدة بيانات الفهرس
+        """
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        """اتصال لكل خيط"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript('''
+                CREATE TABLE IF NOT EXISTS postings (
+                    token TEXT NOT NULL,
+                    conversation_id INTEGER NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (token, conversation_id)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS topics (keyword TEXT PRIMARY KEY, count INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            ''')
+            self._local.connection = connection
+        return connection
+
+    def last_id(self):
+        """آخر محادثة مفهرسة (0 إذا كان الفهرس فارغًا)"""
+        return self.connection.execute('SELECT COALESCE(MAX(id), 0) FROM documents').fetchone()[0]
+
+    def add(self, entries):
+        """
+        فهرسة محادثات جديدة في معاملة واحدة
+
+        :param entries: قائمة (موضع السطر في السجل، المحادثة)
+        """
+        if not entries:
+            return
+        postings, documents, topics = [], [], {}
+        total_length = 0
+        for offset, conv in entries:
+            tokens = text_tokens(conv.get('user_message')) + text_tokens(conv.get('ai_response'))
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            postings.extend((token, conv['id'], tf) for token, tf in counts.items())
+            documents.append((conv['id'], offset, len(tokens)))
+            total_length += len(tokens)
+
+            message = (conv.get('user_message') or '').lower()
+            for keyword in PROGRAMMING_KEYWORDS:
+                if keyword in message:
+                    topics[keyword] = topics.get(keyword, 0) + 1
+
+        with self.connection as connection:
+            connection.executemany('INSERT OR REPLACE INTO postings VALUES (?, ?, ?)', postings)
+            connection.executemany('INSERT OR REPLACE INTO documents VALUES (?, ?, ?)', documents)
+            connection.executemany(
+                'INSERT INTO topics VALUES (?, ?) ON CONFLICT (keyword) DO UPDATE SET count = count + excluded.count',
+                topics.items()
+            )
+            connection.executemany(
+                'INSERT INTO meta VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = value + excluded.value',
+                [('documents', len(documents)), ('total_length', total_length)]
+            )
+
+    def reset(self):
+        """حذف محتوى الفهرس (قبل إعادة البناء)"""
+        with self.connection as connection:
+            for table in ('postings', 'documents', 'topics', 'meta'):
+                connection.execute(f'DELETE FROM {table}')
+
+    def search(self, query, limit=50):
+        """
+        المحادثات المطابقة مرتبة بـ BM25 (الكلمة الأخيرة تطابق بدايات الكلمات أثناء الكتابة)
+
+        :return: قائمة (المعرف، موضع السطر، الدرجة)
+        """
+        tokens = search_tokens(query)
+        if not tokens:
+            return []
+        connection = self.connection
+        meta = dict(connection.execute('SELECT key, value FROM meta'))
+        count = meta.get('documents', 0)
+        if not count:
+            return []
+        average_length = meta.get('total_length', 0) / count or 1
+
+        # نطاق كل كلمة في المفتاح الأساسي: مطابقة تامة، أو بداية الكلمة للكلمة الأخيرة
+        ranges = {(token, token + '\x00') for token in tokens[:-1]}
+        ranges.add((tokens[-1], tokens[-1] + '\U0010ffff'))
+        terms = []
+        for low, high in ranges:
+            matches = connection.execute(
+                'SELECT COUNT(DISTINCT conversation_id) FROM postings WHERE token >= ? AND token < ?', (low, high)
+            ).fetchone()[0]
+            if matches:
+                terms.append((low, high, math.log(1 + (count - matches + 0.5) / (matches + 0.5))))
+        if not terms:
+            return []
+
+        values = ', '.join(['(?, ?, ?)'] * len(terms))
+        # الترتيب داخل SQLite: الكلمات الشائعة تطابق آلاف الصفوف
+        return connection.execute(
+            f'WITH terms(low, high, idf) AS (VALUES {values}) '
+            f'SELECT p.conversation_id, d.offset, SUM(t.idf * p.tf * {BM25_K1 + 1} / '
+            f'(p.tf + {BM25_K1} * (1 - {BM25_B} + {BM25_B} * d.length / ?))) AS score '
+            'FROM terms t JOIN postings p ON p.token >= t.low AND p.token < t.high '
+            'JOIN documents d ON d.id = p.conversation_id '
+            'GROUP BY p.conversation_id ORDER BY score DESC, p.conversation_id DESC LIMIT ?',
+            [value for term in terms for value in term] + [average_length, limit]
+        ).fetchall()
+
+    def topics(self):
+        """عدادات المواضيع مرتبة تنازليًا"""
+        return self.connection.execute(
+            'SELECT keyword, count FROM topics WHERE count > 0 ORDER BY count DESC, keyword'
+        ).fetchall()
+
+    def close(self):
+        """إغلاق اتصال الخيط الحالي"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
 class ChatHistory:
-    def __init__(self, history_file='chat_history.json'):
-        self.history_file = history_file
-        self.history = self.load_history()
-    
+    def __init__(self, history_file=None, max_entries=None):
+        """
+        :param history_file: ملف السجل (JSONL)
+        :param max_entries: عدد المحادثات المحفوظة بعد الضغط (0 بلا حد)
+        """
+        self.history_file = history_file or Config.CHAT_HISTORY_FILE
+        self.index_file = self.history_file + '.idx'
+        self.lock_file = self.history_file + '.lock'
+        self.max_entries = Config.CHAT_HISTORY_MAX_ENTRIES if max_entries is None else max_entries
+        self._thread_lock = threading.RLock()
+        self.search_index = ChatSearchIndex(self.history_file + '.search.db')
+
+    @contextmanager
+    def _locked(self):
+        """قفل حصري بين الخيوط والعمليات"""
+        with self._thread_lock:
+            with open(self.lock_file, 'a+b') as lock:
+                if FCNTL_AVAILABLE:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+                else:
+                    lock.seek(0)
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+                try:
+                    yield
+                finally:
+                    if FCNTL_AVAILABLE:
+                        fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+                    else:
+                        lock.seek(0)
+                        msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _migrate_legacy(self):
+        """تحويل ملف chat_history.json القديم إلى JSONL (مرة واحدة)"""
+        legacy = os.path.join(os.path.dirname(self.history_file), LEGACY_HISTORY_FILE)
+        if os.path.exists(self.history_file) or not os.path.exists(legacy):
+            return
+        try:
+            with open(legacy, 'r', encoding='utf-8') as f:
+                conversations = json.load(f)
+        except Exception as e:
+            print(f"خطأ في قراءة تاريخ المحادثات القديم: {e}")
+            return
+        self._rewrite([{**conv, 'id': i} for i, conv in enumerate(conversations, 1)])
+
+    def _rewrite(self, conversations):
+        """كتابة السجل والفهرس من جديد (استبدال ذري) وإعادة بناء فهرس البحث"""
+        entries = []
+        temp_file = self.history_file + '.tmp'
+        with open(temp_file, 'wb') as f:
+            for conv in conversations:
+                entries.append((f.tell(), conv))
+                f.write(self._encode(conv))
+        temp_index = self.index_file + '.tmp'
+        with open(temp_index, 'wb') as f:
+            f.write(b''.join(OFFSET.pack(offset) for offset, _ in entries))
+        os.replace(temp_file, self.history_file)
+        os.replace(temp_index, self.index_file)
+
+        self.search_index.reset()
+        self.search_index.add(entries)
+
+    def _encode(self, conversation):
+        return (json.dumps(conversation, ensure_ascii=False) + '\n').encode('utf-8')
+
+    def _sync_index(self):
+        """
+        إضافة الأسطر غير المفهرسة إلى الفهرس (بعد توقف مفاجئ بين كتابة السطر والفهرس)
+
+        :return: عدد المحادثات
+        """
+        self._migrate_legacy()
+        if not os.path.exists(self.history_file):
+            return 0
+        data_size = os.path.getsize(self.history_file)
+        index_size = os.path.getsize(self.index_file) if os.path.exists(self.index_file) else 0
+        count = index_size // OFFSET.size
+
+        with open(self.history_file, 'rb') as data:
+            if count:
+                with open(self.index_file, 'rb') as index:
+                    index.seek((count - 1) * OFFSET.size)
+                    last_offset = OFFSET.unpack(index.read(OFFSET.size))[0]
+                if last_offset >= data_size:
+                    # الفهرس لا يطابق الملف: إعادة بنائه كاملاً
+                    count, last_offset = 0, 0
+                else:
+                    data.seek(last_offset)
+                    data.readline()
+                    if data.tell() == data_size and index_size % OFFSET.size == 0:
+                        return count
+            else:
+                last_offset = 0
+
+            # فهرسة الأسطر بعد آخر موضع معروف
+            data.seek(last_offset)
+            if count:
+                data.readline()
+            offsets = bytearray()
+            torn_at = None
+            while True:
+                position = data.tell()
+                line = data.readline()
+                if not line:
+                    break
+                if line.endswith(b'\n'):
+                    offsets += OFFSET.pack(position)
+                else:
+                    torn_at = position
+
+        if torn_at is not None:
+            # سطر ناقص في النهاية (توقف أثناء الكتابة): حذفه كي لا يلتصق بالسطر التالي
+            with open(self.history_file, 'r+b') as data:
+                data.truncate(torn_at)
+
+        mode = 'r+b' if count and os.path.exists(self.index_file) else 'wb'
+        with open(self.index_file, mode) as index:
+            index.seek(count * OFFSET.size)
+            index.truncate()
+            index.write(offsets)
+        return count + len(offsets) // OFFSET.size
+
+    def _read_entries(self, start, stop):
+        """
+        قراءة المحادثات من الموضع start حتى stop (بدون stop)
+
+        :return: قائمة (موضع السطر، المحادثة)
+        """
+        if stop <= start:
+            return []
+        with open(self.index_file, 'rb') as index:
+            index.seek(start * OFFSET.size)
+            offsets = [offset for (offset,) in OFFSET.iter_unpack(index.read((stop - start) * OFFSET.size))]
+
+        entries = []
+        with open(self.history_file, 'rb') as data:
+            data.seek(offsets[0])
+            for offset in offsets:
+                line = data.readline()
+                try:
+                    entries.append((offset, json.loads(line)))
+                except ValueError:
+                    continue
+        return entries
+
+    def _read_range(self, start, stop):
+        """قراءة المحادثات من الموضع start حتى stop (بدون stop)"""
+        return [conv for _, conv in self._read_entries(start, stop)]
+
+    def _read_at(self, offsets):
+        """قراءة محادثات بمواضع أسطرها"""
+        conversations = []
+        with open(self.history_file, 'rb') as data:
+            for offset in offsets:
+                data.seek(offset)
+                try:
+                    conversations.append(json.loads(data.readline()))
+                except ValueError:
+                    conversations.append(None)
+        return conversations
+
+    def _sync_search_index(self, count):
+        """
+        فهرسة المحادثات التي لم تصل إلى فهرس البحث (السجل القديم أو توقف مفاجئ)
+
+        المعرفات متتالية في السجل، فالمحادثات الناقصة هي آخر (آخر معرف - آخر معرف مفهرس).
+        """
+        if not count:
+            return
+        last = self._read_range(count - 1, count)
+        indexed = self.search_index.last_id()
+        if not last or last[0]['id'] <= indexed:
+            return
+        missing = last[0]['id'] - indexed
+        self.search_index.add([
+            (offset, conv) for offset, conv in self._read_entries(max(0, count - missing), count)
+            if conv['id'] > indexed
+        ])
+
+    def rebuild_search_index(self):
+        """
+        إعادة بناء فهرس البحث من السجل
+
+        :return: عدد المحادثات المفهرسة
+        """
+        with self._locked():
+            count = self._sync_index()
+            self.search_index.reset()
+            for start in range(0, count, 500):
+                self.search_index.add(self._read_entries(start, min(start + 500, count)))
+            return count
+
+    def __len__(self):
+        with self._locked():
+            return self._sync_index()
+
     def load_history(self):
-        """تحميل تاريخ المحادثات من الملف"""
-        if os.path.exists(self.history_file):
-            try:
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return []
-        return []
-    
+        """تحميل تاريخ المحادثات كاملاً (للتصدير؛ الاستخدام العادي لا يحتاجه)"""
+        return list(self.iter_conversations())
+
+    def iter_conversations(self, batch_size=500):
+        """المرور على المحادثات من الأقدم دون تحميلها كلها في الذاكرة"""
+        with self._locked():
+            count = self._sync_index()
+        for start in range(0, count, batch_size):
+            with self._locked():
+                batch = self._read_range(start, min(start + batch_size, count))
+            yield from batch
+
     def save_history(self):
-        """حفظ تاريخ المحادثات في الملف"""
+        """ضغط السجل (يُحفظ كل سطر فور إضافته)"""
+        self.compact()
+
+    def compact(self):
+        """
+        إعادة كتابة السجل بأحدث max_entries محادثة وحذف الأسطر التالفة
+
+        :return: عدد المحادثات بعد الضغط
+        """
         try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, ensure_ascii=False, indent=2)
+            with self._locked():
+                count = self._sync_index()
+                start = max(0, count - self.max_entries) if self.max_entries else 0
+                conversations = self._read_range(start, count)
+                self._rewrite(conversations)
+                return len(conversations)
         except Exception as e:
-            print(f"Error saving chat history: {e}")
-    
+            print(f"خطأ في ضغط تاريخ المحادثات: {e}")
+            return None
+
     def add_conversation(self, user_message, ai_response):
-        """إضافة محادثة جديدة"""
-        conversation = {
-            'timestamp': datetime.now().isoformat(),
-            'user_message': user_message,
-            'ai_response': ai_response,
-            'type': 'programming_assistance'
-        }
-        
-        self.history.append(conversation)
-        
-        # الاحتفاظ بآخر 100 محادثة فقط
-        if len(self.history) > 100:
-            self.history = self.history[-100:]
-        
-        self.save_history()
-    
+        """
+        إضافة محادثة جديدة (سطر واحد في نهاية الملف)
+
+        :return: المحادثة مع معرفها
+        """
+        try:
+            with self._locked():
+                count = self._sync_index()
+                last = self._read_range(count - 1, count) if count else []
+                conversation = {
+                    'id': (last[0].get('id', count) if last else 0) + 1,
+                    'timestamp': datetime.now().isoformat(),
+                    'user_message': user_message,
+                    'ai_response': ai_response,
+                    'type': 'programming_assistance'
+                }
+
+                with open(self.history_file, 'ab') as data:
+                    offset = data.tell()
+                    data.write(self._encode(conversation))
+                with open(self.index_file, 'ab') as index:
+                    index.write(OFFSET.pack(offset))
+                count += 1
+
+                self._sync_search_index(count - 1)
+                self.search_index.add([(offset, conversation)])
+
+            if self.max_entries and count > self.max_entries * 5 // 4:
+                self.compact()
+            return conversation
+        except Exception as e:
+            print(f"خطأ في حفظ تاريخ المحادثات: {e}")
+            return None
+
     def get_recent_conversations(self, limit=10):
-        """الحصول على المحادثات الأخيرة"""
-        return self.history[-limit:] if self.history else []
-    
-    def search_conversations(self, keyword):
-        """البحث في المحادثات"""
-        results = []
-        for conv in self.history:
-            if keyword.lower() in conv['user_message'].lower() or keyword.lower() in conv['ai_response'].lower():
-                results.append(conv)
-        return results
-    
+        """الحصول على المحادثات الأخيرة (من الأقدم إلى الأحدث)"""
+        with self._locked():
+            count = self._sync_index()
+            return self._read_range(max(0, count - limit), count)
+
+    def search_conversations(self, keyword, limit=50, _rebuilt=False):
+        """
+        البحث في المحادثات بالفهرس المقلوب
+
+        :param keyword: كلمة أو أكثر (تطابق بدايات الكلمات بعد توحيد الحروف العربية)
+        :param limit: عدد النتائج
+        :return: المحادثات مرتبة حسب الصلة مع درجة score
+        """
+        with self._locked():
+            self._sync_search_index(self._sync_index())
+            hits = self.search_index.search(keyword, limit)
+            conversations = self._read_at([offset for _, offset, _ in hits])
+
+        if not _rebuilt and any(conv is None or conv.get('id') != conversation_id
+                                for (conversation_id, _, _), conv in zip(hits, conversations)):
+            # مواضع قديمة (سجل أعيدت كتابته دون الفهرس): إعادة البناء ثم البحث مجددًا
+            self.rebuild_search_index()
+            return self.search_conversations(keyword, limit, _rebuilt=True)
+
+        return [{**conv, 'score': round(score, 3)} for (_, _, score), conv in zip(hits, conversations) if conv]
+
     def get_programming_topics(self):
-        """استخراج المواضيع البرمجية الشائعة"""
-        topics = {}
-        programming_keywords = [
-            'python', 'flask', 'database', 'sql', 'html', 'css', 'javascript',
-            'function', 'class', 'route', 'template', 'form', 'validation',
-            'error', 'bug', 'fix', 'optimize', 'performance'
-        ]
-        
-        for conv in self.history:
-            message = conv['user_message'].lower()
-            for keyword in programming_keywords:
-                if keyword in message:
-                    topics[keyword] = topics.get(keyword, 0) + 1
-        
-        return sorted(topics.items(), key=lambda x: x[1], reverse=True)
\ No newline at end of file
+        """المواضيع البرمجية الشائعة من العدادات المحدثة عند الإضافة"""
+        with self._locked():
+            self._sync_search_index(self._sync_index())
+            return self.search_index.topics()
+
+# تاريخ محادثات العملية الحالية
+chat_history = ChatHistory()
@@ -74,14 +74,65 @@ class Config:
     NOTIFICATIONS_CHECK_INTERVAL = 3600  # ساعة واحدة بالثواني
     NOTIFICATIONS_MAX_COUNT = 50  # الحد الأقصى لعدد الإشعارات المحفوظة
 
+    # البث المباشر للأحداث (Server-Sent Events) - كل اتصال مفتوح يشغل خيطًا في الخادم
+    EVENTS_MAX_SUBSCRIBERS = int(os.environ.get('EVENTS_MAX_SUBSCRIBERS', 4))  # لكل عامل (أقل من عدد الخيوط)
+    EVENTS_STREAM_TIMEOUT = 300  # مدة الاتصال بالثواني قبل أن يعيد المتصفح الاتصال
+    EVENTS_HEARTBEAT = 15  # ثوانٍ بين رسائل الإبقاء على الاتصال
+    EVENTS_RETRY_MS = 3000  # مهلة إعادة الاتصال في المتصفح
+    EVENTS_HISTORY = 200  # عدد الأحداث المحفوظة لاستعادة ما فات المتصفح
+    EVENTS_QUEUE_SIZE = 100  # حجم طابور كل متصفح
+
+    # تاريخ محادثات المساعد البرمجي (سطر JSON لكل محادثة)
+    CHAT_HISTORY_FILE = os.environ.get('CHAT_HISTORY_FILE', 'chat_history.jsonl')
+    CHAT_HISTORY_MAX_ENTRIES = 10000  # عدد المحادثات المحفوظة بعد الضغط (0 بلا حد)
+
     # إعدادات البحث المتقدم
     SEARCH_MAX_RESULTS = 200
-    SEARCH_CACHE_TIMEOUT = 300  # 5 دقائق
+    SEARCH_CACHE_TIMEOUT = 3600  # ساعة (يُبطل تلقائيًا بوسم 'products' عند تغير المنتجات)
+    AUTOCOMPLETE_MIN_SIMILARITY = 0.3  # الحد الأدنى لتشابه الكلمات في الإكمال التلقائي (0-1)
+    AUTOCOMPLETE_SYNC_OVERLAP = 60  # ثوانٍ تُعاد قراءتها عند المزامنة التدريجية (معاملات متأخرة)
 
     # إعدادات التقارير
-    REPORTS_CACHE_TIMEOUT = 600  # 10 دقائق
+    REPORTS_CACHE_TIMEOUT = 6 * 3600  # 6 ساعات (يُبطل تلقائيًا بوسوم 'sales' و'purchases')
     REPORTS_AUTO_REFRESH = True  # تحديث تلقائي للتقارير
 
+    # إعدادات التخزين المؤقت
+    CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(os.getcwd(), 'instance', 'cache'))  # create_app يستخدم instance_path
+    CACHE_MEMORY_MAX_ENTRIES = int(os.environ.get('CACHE_MEMORY_MAX_ENTRIES', 1024))  # لكل عامل
+    CACHE_MEMORY_MAX_BYTES = int(os.environ.get('CACHE_MEMORY_MAX_BYTES', 16 * 1024 * 1024))  # 16MB لكل عامل
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'file')  # file (ملف لكل عنصر) أو sqlite (ملف واحد)
+    CACHE_SERIALIZER = os.environ.get('CACHE_SERIALIZER', 'pickle')  # pickle أو msgpack أو json
+    CACHE_EARLY_REFRESH_BETA = 1.0  # معامل التحديث الاحتمالي المبكر (قيمة أكبر = تحديث أبكر)
+    CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', 256 * 1024 * 1024))  # الحد الأقصى على القرص (0 بلا حد)
+    CACHE_JANITOR_ENABLED = os.environ.get('CACHE_JANITOR_ENABLED', 'true').lower() == 'true'
+    CACHE_JANITOR_INTERVAL = 5  # ثوانٍ بين دفعات التنظيف
+    CACHE_JANITOR_SLICE_SIZE = 4  # عدد المجلدات الفرعية (من 256) في كل دفعة
+
+    # إعدادات المهام الخلفية (التصدير وملفات PDF)
+    JOBS_DIR = os.environ.get('JOBS_DIR', os.path.join(os.getcwd(), 'instance', 'jobs'))
+    JOBS_WORKER_ENABLED = os.environ.get('JOBS_WORKER_ENABLED', 'true').lower() == 'true'
+    JOBS_PROCESSES = int(os.environ.get('JOBS_PROCESSES', 2))  # عدد عمليات التنفيذ
+    JOBS_POLL_INTERVAL = 1  # ثوانٍ بين فحوصات الطابور
+    JOBS_TIMEOUT = 3600  # مهمة قيد التنفيذ أطول من هذا تُعتبر عالقة وتُعاد إلى الطابور
+    JOBS_RESULT_TTL = 24 * 3600  # مدة الاحتفاظ بالملفات الناتجة
+
+    # قياس عدد الاستعلامات وزمن الطلبات (ترويسة Server-Timing و/admin/metrics)
+    REQUEST_METRICS_ENABLED = os.environ.get('REQUEST_METRICS_ENABLED', 'false').lower() == 'true'
+    REQUEST_METRICS_WINDOW = 1000  # عدد الطلبات المحفوظة لكل مسار
+
+    # سجل الاستعلامات البطيئة (python slow_query_log.py لعرض الملخص)
+    SLOW_QUERY_LOG_ENABLED = os.environ.get('SLOW_QUERY_LOG_ENABLED', 'false').lower() == 'true'
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))
+    SLOW_QUERY_LOG_FILE = os.environ.get('SLOW_QUERY_LOG_FILE', os.path.join(os.getcwd(), 'instance', 'slow_queries.jsonl'))
+    SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024  # حجم الملف قبل التدوير
+    SLOW_QUERY_LOG_BACKUPS = 3  # عدد الملفات المدورة المحفوظة
+
+    # إعدادات الطابعة الحرارية (ESC/POS)
+    ESCPOS_PRINTER = os.environ.get('ESCPOS_PRINTER', '')  # tcp://192.168.1.50:9100 أو /dev/usb/lp0
+    ESCPOS_DOTS_WIDTH = 576  # عرض رأس الطباعة بالنقاط (80mm بدقة 203dpi)
+    ESCPOS_FONT = os.environ.get('ESCPOS_FONT', 'arial.ttf')
+    ESCPOS_BOLD_FONT = os.environ.get('ESCPOS_BOLD_FONT', 'arialbd.ttf')
+
     # إعدادات الأمان
     
 
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""
+إعدادات مشتركة للاختبارات
+
+كل commit في ORM يبطل وسوم التخزين المؤقت (انظر _invalidate_cache_tags)، لذلك
+يُوجه مدير التخزين المؤقت مرة واحدة إلى مجلد مؤقت تديره pytest (ومعه CACHE_DIR في
+البيئة لكي لا يعيده create_app إلى مجلد instance).
+"""
+
+import os
+
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def isolated_cache_dir(tmp_path_factory):
+    """مجلد تخزين مؤقت مستقل لجلسة الاختبارات"""
+    from cache import cache_manager
+
+    cache_dir = str(tmp_path_factory.mktemp('cache'))
+    os.environ['CACHE_DIR'] = cache_dir
+    cache_manager.configure(cache_dir)
+    yield
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+تصدير البيانات الخام بصيغة CSV وParquet
+
+يستخدم نفس تعريفات الأعمدة في excel_export فلا تختلف الصيغ الثلاث، لكن دون أي
+تنسيق: CSV يُكتب مباشرة من مؤشر قاعدة البيانات إلى استجابة HTTP مجزأة، وParquet
+يُكتب على دفعات (row groups) إلى ملف مؤقت.
+"""
+
+import csv
+import io
+import tempfile
+from datetime import date, datetime
+
+from excel_export import EXPORT_DATASETS, EXPORT_SPOOL_MAX_SIZE, iter_in_chunks
+
+# استيراد pyarrow فقط إذا كان متوفراً
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+def get_dataset(name, start_date=None, end_date=None):
+    """
+    الحصول على أعمدة واستعلام مجموعة بيانات
+
+    :param name: اسم المجموعة (sales, sale_items, purchases, products)
+    :return: (الأعمدة، الاستعلام)
+    """
+    if name not in EXPORT_DATASETS:
+        raise ValueError(f"مجموعة بيانات غير معروفة: {name}")
+    columns, query_factory, has_period = EXPORT_DATASETS[name]
+    query = query_factory(start_date, end_date) if has_period else query_factory()
+    return columns, query
+
+def _csv_value(value):
+    """تحويل القيمة الخام إلى نص CSV"""
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+class CSVExporter:
+    """فئة تصدير البيانات إلى CSV بشكل متدفق"""
+
+    def iter_rows(self, columns, rows, chunk_size=1000, labels=True, bom=False):
+        """
+        توليد ملف CSV على شكل أجزاء من البايتات
+
+        :param columns: تعريفات الأعمدة
+        :param rows: استعلام SQLAlchemy أو أي مولد
+        :param chunk_size: عدد الصفوف في كل جزء (وفي كل دفعة من قاعدة البيانات)
+        :param labels: استخدام العناوين العربية بدل الأسماء البرمجية
+        :param bom: إضافة BOM ليتعرف Excel على ترميز UTF-8
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        if bom:
+            buffer.write('\ufeff')
+        writer.writerow([column.header if labels else column.name for column in columns])
+
+        count = 0
+        for row in iter_in_chunks(rows, chunk_size):
+            writer.writerow([_csv_value(column.value(row)) for column in columns])
+            count += 1
+            if count % chunk_size == 0:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate(0)
+
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    def iter_dataset(self, name, start_date=None, end_date=None, chunk_size=1000, labels=True, bom=False):
+        """
+        توليد ملف CSV لمجموعة بيانات
+
+        :param name: اسم المجموعة (sales, sale_items, purchases, products)
+        """
+        columns, query = get_dataset(name, start_date, end_date)
+        return self.iter_rows(columns, query, chunk_size, labels, bom)
+
+class ParquetExporter:
+    """فئة تصدير البيانات إلى Parquet (تتطلب pyarrow)"""
+
+    def _schema(self, columns):
+        """مخطط Arrow من أنواع الأعمدة"""
+        types = {'int': pa.int64(), 'money': pa.float64(), 'date': pa.timestamp('us'), 'text': pa.string()}
+        return pa.schema([(column.name, types[column.kind]) for column in columns])
+
+    def export_rows(self, columns, rows, chunk_size=10000):
+        """
+        كتابة ملف Parquet على دفعات
+
+        :param columns: تعريفات الأعمدة
+        :param rows: استعلام SQLAlchemy أو أي مولد
+        :param chunk_size: عدد الصفوف في كل دفعة (row group)
+        :return: ملف مؤقت مفتوح في بدايته
+        """
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("تصدير Parquet يتطلب تثبيت pyarrow")
+
+        schema = self._schema(columns)
+        output = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE)
+        batch = [[] for _ in columns]
+
+        with pq.ParquetWriter(output, schema) as writer:
+            for row in iter_in_chunks(rows, chunk_size):
+                for values, column in zip(batch, columns):
+                    values.append(column.value(row))
+                if len(batch[0]) >= chunk_size:
+                    writer.write_table(pa.table(batch, schema=schema))
+                    batch = [[] for _ in columns]
+            if batch[0]:
+                writer.write_table(pa.table(batch, schema=schema))
+
+        output.seek(0)
+        return output
+
+    def export_dataset(self, name, start_date=None, end_date=None, chunk_size=10000):
+        """
+        تصدير مجموعة بيانات إلى Parquet
+
+        :param name: اسم المجموعة (sales, sale_items, purchases, products)
+        :return: ملف مؤقت مفتوح في بدايته
+        """
+        columns, query = get_dataset(name, start_date, end_date)
+        return self.export_rows(columns, query, chunk_size)
@@ -4,6 +4,8 @@
 """
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session, joinedload, raiseload, selectinload, undefer
 from datetime import datetime
 import sqlite3
 import os
@@ -74,7 +76,7 @@ class Category(db.Model):
             'name': self.name,
             'description': self.description,
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else '',
-            'products_count': len(self.products)
+            'products_count': self.products_count
         }
 
 class Brand(db.Model):
@@ -107,8 +109,10 @@ class Product(db.Model):
     description = db.Column(db.Text)  # وصف المنتج ومواصفاته
     price_buy = db.Column(db.Float, nullable=False)  # سعر الشراء
     price_sell = db.Column(db.Float, nullable=False)  # سعر البيع
-    quantity = db.Column(db.Integer, default=0)  # الكمية المتوفرة
-    min_quantity = db.Column(db.Integer, default=5)  # الحد الأدنى للكمية
+    # active_history: تحميل القيمة السابقة عند التعديل بعد انتهاء صلاحية الكائن، فيُعرف
+    # عبور الحد الأدنى في الاتجاهين (انظر notifications._track_stock_levels)
+    quantity = db.mapped_column(db.Integer, default=0, active_history=True)  # الكمية المتوفرة
+    min_quantity = db.mapped_column(db.Integer, default=5, active_history=True)  # الحد الأدنى للكمية
     barcode = db.Column(db.String(100), unique=True)  # الباركود
     imei = db.Column(db.String(100), unique=True, nullable=True, index=True) # رقم IMEI
     warranty_period = db.Column(db.Integer, default=0) # مدة الضمان بالأيام
@@ -148,6 +152,15 @@ class Product(db.Model):
             'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else ''
         }
 
+# عدد منتجات الفئة كاستعلام فرعي (مؤجل: يُحمل مع القائمة عبر ملف التحميل 'category_list')
+Category.products_count = db.column_property(
+    db.select(func.count(Product.id))
+    .where(Product.category_id == Category.id)
+    .correlate_except(Product)
+    .scalar_subquery(),
+    deferred=True
+)
+
 class Customer(db.Model):
     """جدول العملاء"""
     __tablename__ = 'customers'
@@ -204,6 +217,10 @@ class Supplier(db.Model):
 class Sale(db.Model):
     """جدول المبيعات"""
     __tablename__ = 'sales'
+    __table_args__ = (
+        db.Index('ix_sales_created_at', 'created_at'),
+        db.Index('ix_sales_customer_id', 'customer_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'))
@@ -223,6 +240,10 @@ class Sale(db.Model):
 class Return(db.Model):
     """جدول المرتجعات"""
     __tablename__ = 'returns'
+    __table_args__ = (
+        db.Index('ix_returns_sale_id', 'sale_id'),
+        db.Index('ix_returns_return_date', 'return_date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     sale_id = db.Column(db.Integer, db.ForeignKey('sales.id'), nullable=False) # المبيعة الأصلية
@@ -255,6 +276,9 @@ class Return(db.Model):
 class ReturnItem(db.Model):
     """تفاصيل المنتجات المرتجعة"""
     __tablename__ = 'return_items'
+    __table_args__ = (
+        db.Index('ix_return_items_return_id', 'return_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     return_id = db.Column(db.Integer, db.ForeignKey('returns.id'), nullable=False)
@@ -283,6 +307,11 @@ class ReturnItem(db.Model):
 class SaleItem(db.Model):
     """جدول عناصر المبيعات"""
     __tablename__ = 'sale_items'
+    __table_args__ = (
+        db.Index('ix_sale_items_sale_id', 'sale_id'),
+        # أفضل المنتجات: التجميع حسب المنتج مع الربط بالمبيعة
+        db.Index('ix_sale_items_product_id_sale_id', 'product_id', 'sale_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     sale_id = db.Column(db.Integer, db.ForeignKey('sales.id'), nullable=False)
@@ -308,6 +337,10 @@ class SaleItem(db.Model):
 class PurchaseInvoice(db.Model):
     """جدول فواتير الشراء من الموردين"""
     __tablename__ = 'purchase_invoices'
+    __table_args__ = (
+        db.Index('ix_purchase_invoices_created_at', 'created_at'),
+        db.Index('ix_purchase_invoices_supplier_id', 'supplier_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.id'), nullable=False)
@@ -344,6 +377,10 @@ class PurchaseInvoice(db.Model):
 class PurchaseItem(db.Model):
     """جدول عناصر فواتير الشراء"""
     __tablename__ = 'purchase_items'
+    __table_args__ = (
+        db.Index('ix_purchase_items_purchase_invoice_id', 'purchase_invoice_id'),
+        db.Index('ix_purchase_items_product_id', 'product_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     purchase_invoice_id = db.Column(db.Integer, db.ForeignKey('purchase_invoices.id'), nullable=False)
@@ -402,6 +439,15 @@ def create_tables(app):
 class Notification(db.Model):
     """جدول الإشعارات"""
     __tablename__ = 'notifications'
+    __table_args__ = (
+        # إشعارات المستخدم غير المقروءة مرتبة حسب الوقت
+        db.Index('ix_notifications_user_id_read_timestamp', 'user_id', 'read', 'timestamp'),
+        # جميع إشعارات المستخدم بترقيم المؤشر (الوقت، المعرف)
+        db.Index('ix_notifications_user_id_timestamp_id', 'user_id', 'timestamp', 'id'),
+        # تنبيه مفتوح واحد لكل منتج منخفض المخزون لكل مستخدم
+        db.Index('uq_notifications_low_stock_user_product', 'user_id', 'product_id', unique=True,
+                 sqlite_where=db.text("type = 'low_stock'"), postgresql_where=db.text("type = 'low_stock'")),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -435,6 +481,9 @@ class Notification(db.Model):
 class ActivityLog(db.Model):
     """جدول سجل الأنشطة"""
     __tablename__ = 'activity_logs'
+    __table_args__ = (
+        db.Index('ix_activity_logs_timestamp', 'timestamp'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -465,6 +514,10 @@ class ActivityLog(db.Model):
 class AuditLog(db.Model):
     """جدول سجل المراجعة"""
     __tablename__ = 'audit_logs'
+    __table_args__ = (
+        db.Index('ix_audit_logs_timestamp', 'timestamp'),
+        db.Index('ix_audit_logs_table_name_record_id', 'table_name', 'record_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -494,6 +547,428 @@ class AuditLog(db.Model):
             'timestamp': self.timestamp.strftime('%Y-%m-%d %H:%M:%S') if self.timestamp else ''
         }
 
+class DailySalesSummary(db.Model):
+    """ملخص المبيعات اليومي (يُحدَّث تلقائيًا مع كل بيع أو إرجاع)"""
+    __tablename__ = 'daily_sales_summary'
+
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False, unique=True)
+    sales_count = db.Column(db.Integer, nullable=False, default=0)  # عدد الفواتير
+    items_count = db.Column(db.Integer, nullable=False, default=0)  # عدد القطع المباعة
+    total_amount = db.Column(db.Float, nullable=False, default=0)  # المجموع قبل الخصم
+    discount = db.Column(db.Float, nullable=False, default=0)  # مجموع الخصومات
+    final_amount = db.Column(db.Float, nullable=False, default=0)  # المبلغ النهائي
+    cost_amount = db.Column(db.Float, nullable=False, default=0)  # تكلفة القطع المباعة
+    returns_count = db.Column(db.Integer, nullable=False, default=0)  # عدد المرتجعات
+    returns_amount = db.Column(db.Float, nullable=False, default=0)  # مبلغ المرتجعات
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<DailySalesSummary {self.date}>'
+
+    def to_dict(self):
+        return {
+            'date': self.date.strftime('%Y-%m-%d') if self.date else '',
+            'sales_count': self.sales_count,
+            'items_count': self.items_count,
+            'total_amount': self.total_amount,
+            'discount': self.discount,
+            'final_amount': self.final_amount,
+            'cost_amount': self.cost_amount,
+            'profit': self.final_amount - self.cost_amount,
+            'returns_count': self.returns_count,
+            'returns_amount': self.returns_amount,
+            'net_amount': self.final_amount - self.returns_amount
+        }
+
+class DailyProductSales(db.Model):
+    """مبيعات كل منتج يوميًا (يُحدَّث تلقائيًا مع كل بيع أو إرجاع)"""
+    __tablename__ = 'daily_product_sales'
+    __table_args__ = (
+        db.UniqueConstraint('date', 'product_id', name='uq_daily_product_sales_date_product_id'),
+        db.Index('ix_daily_product_sales_product_id_date', 'product_id', 'date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=0)  # الكمية المباعة
+    revenue = db.Column(db.Float, nullable=False, default=0)  # إيراد البيع
+    cost_amount = db.Column(db.Float, nullable=False, default=0)  # التكلفة
+    returned_quantity = db.Column(db.Integer, nullable=False, default=0)  # الكمية المرتجعة
+    returned_amount = db.Column(db.Float, nullable=False, default=0)  # مبلغ المرتجع
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # العلاقات
+    product = db.relationship('Product')
+
+    def __repr__(self):
+        return f'<DailyProductSales {self.date} - Product {self.product_id}>'
+
+    def to_dict(self):
+        return {
+            'date': self.date.strftime('%Y-%m-%d') if self.date else '',
+            'product_id': self.product_id,
+            'quantity': self.quantity,
+            'revenue': self.revenue,
+            'cost_amount': self.cost_amount,
+            'returned_quantity': self.returned_quantity,
+            'returned_amount': self.returned_amount
+        }
+
+# ملفات التحميل المسبق لقوائم الواجهة البرمجية: كل ملف يحمل العلاقات التي تستخدمها to_dict
+# في عدد ثابت من الاستعلامات بدل استعلام لكل صف (N+1)
+LOADER_PROFILES = {
+    'product_list': lambda: (
+        joinedload(Product.category).load_only(Category.id, Category.name),
+        joinedload(Product.supplier).load_only(Supplier.id, Supplier.name),
+    ),
+    'category_list': lambda: (
+        undefer(Category.products_count),
+    ),
+    'sale_list': lambda: (
+        joinedload(Sale.customer),
+        selectinload(Sale.sale_items).joinedload(SaleItem.product),
+    ),
+    'purchase_list': lambda: (
+        joinedload(PurchaseInvoice.supplier),
+        selectinload(PurchaseInvoice.purchase_items).joinedload(PurchaseItem.product),
+    ),
+    'return_list': lambda: (
+        joinedload(Return.customer),
+    ),
+    'notification_list': lambda: (
+        joinedload(Notification.product).load_only(Product.id, Product.name),
+        joinedload(Notification.user),
+    ),
+    'activity_log_list': lambda: (
+        joinedload(ActivityLog.user),
+    ),
+    'audit_log_list': lambda: (
+        joinedload(AuditLog.user),
+    ),
+}
+
+def with_profile(query, profile, strict=False):
+    """
+    تطبيق ملف تحميل مسبق على استعلام
+
+    :param query: الاستعلام
+    :param profile: اسم الملف من LOADER_PROFILES
+    :param strict: منع أي تحميل كسول إضافي (يرفع خطأ) لاكتشاف N+1 في الاختبارات
+    :return: الاستعلام مع خيارات التحميل
+    """
+    if profile not in LOADER_PROFILES:
+        raise ValueError(f"ملف تحميل غير معروف: {profile}")
+    options = LOADER_PROFILES[profile]()
+    if strict:
+        options += (raiseload('*'),)
+    return query.options(*options)
+
+# حقول المنتج المحفوظة في فهرس الباركود (انظر barcode_index.py)
+BARCODE_INDEX_FIELDS = ('name', 'model', 'price_sell', 'barcode', 'imei')
+
+# حقول المنتج المحفوظة في فهرس الإكمال التلقائي (انظر product_autocomplete.py)
+AUTOCOMPLETE_INDEX_FIELDS = ('name', 'brand', 'model', 'color', 'price_sell')
+
+# وسوم الفهارس في الذاكرة وحقولها: تُبطل فقط عند تغير أحد هذه الحقول
+PRODUCT_INDEX_TAGS = {
+    'product_codes': BARCODE_INDEX_FIELDS,
+    'product_names': AUTOCOMPLETE_INDEX_FIELDS,
+}
+
+def cache_tags_for(obj):
+    """
+    وسوم التخزين المؤقت التي تتأثر بتغيير سجل
+
+    :param obj: كائن النموذج الذي تم إنشاؤه أو تعديله أو حذفه
+    :return: مجموعة الوسوم المراد إبطالها
+    """
+    from cache import month_tag
+
+    if isinstance(obj, Product):
+        # تغير الكمية مع كل بيعة لا يستدعي تحديث الفهارس في الذاكرة
+        state = inspect(obj)
+        deleted = state.session is not None and obj in state.session.deleted
+        tags = {'products'}
+        for tag, fields in PRODUCT_INDEX_TAGS.items():
+            if deleted or any(state.attrs[field].history.has_changes() for field in fields):
+                tags.add(tag)
+        return tags
+    if isinstance(obj, (Category, Brand)):
+        return {'products'}
+    if isinstance(obj, Sale):
+        return {'sales', month_tag('sales', obj.created_at)}
+    if isinstance(obj, SaleItem):
+        sale = obj.sale
+        return {'sales', month_tag('sales', sale.created_at if sale else None)}
+    if isinstance(obj, (Return, ReturnItem)):
+        return {'returns', 'sales'}
+    if isinstance(obj, PurchaseInvoice):
+        return {'purchases', month_tag('purchases', obj.created_at)}
+    if isinstance(obj, PurchaseItem):
+        invoice = obj.purchase_invoice
+        return {'purchases', month_tag('purchases', invoice.created_at if invoice else None)}
+    if isinstance(obj, Customer):
+        return {'customers'}
+    if isinstance(obj, Supplier):
+        return {'suppliers'}
+    return set()
+
+@event.listens_for(Session, 'after_flush')
+def _collect_cache_tags(session, flush_context):
+    """جمع وسوم التخزين المؤقت للسجلات المتغيرة في هذه المعاملة"""
+    tags = session.info.setdefault('cache_tags', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tags.update(cache_tags_for(obj))
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_cache_tags(session):
+    """إبطال عناصر التخزين المؤقت المتأثرة بعد نجاح المعاملة فقط"""
+    tags = session.info.pop('cache_tags', None)
+    if tags:
+        from cache import cache_manager
+        cache_manager.invalidate_tags(*tags)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_cache_tags(session):
+    """تجاهل الوسوم المجمعة عند التراجع عن المعاملة"""
+    session.info.pop('cache_tags', None)
+
+# أعمدة التجميع في جداول الملخص اليومي
+SUMMARY_FIELDS = ('sales_count', 'items_count', 'total_amount', 'discount', 'final_amount',
+                  'cost_amount', 'returns_count', 'returns_amount')
+PRODUCT_SALES_FIELDS = ('quantity', 'revenue', 'cost_amount', 'returned_quantity', 'returned_amount')
+
+def _attribute_change(obj, attr, sign):
+    """
+    مقدار تغير حقل رقمي في هذه العملية
+
+    :param sign: 1 للسجل الجديد، -1 للسجل المحذوف، 0 للسجل المعدل
+    """
+    if sign:
+        return sign * (getattr(obj, attr) or 0)
+    history = inspect(obj).attrs[attr].history
+    if not history.has_changes():
+        return 0
+    new_value = history.added[0] if history.added else 0
+    old_value = history.deleted[0] if history.deleted else 0
+    return (new_value or 0) - (old_value or 0)
+
+def _rollup_date(value):
+    """تاريخ اليوم الذي ينتمي إليه السجل"""
+    return (value or datetime.utcnow()).date()
+
+def _upsert_rollup(connection, table, key_values, deltas):
+    """
+    إضافة الفروقات إلى صف الملخص بشكل ذري (INSERT ... ON CONFLICT DO UPDATE)
+
+    :param table: جدول الملخص
+    :param key_values: قيم المفتاح الفريد مثل {'date': ...}
+    :param deltas: الفروقات المراد إضافتها {العمود: القيمة}
+    """
+    if connection.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    now = datetime.utcnow()
+    stmt = insert(table).values(**key_values, **deltas, updated_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key_values),
+        set_={**{column: table.c[column] + stmt.excluded[column] for column in deltas}, 'updated_at': now}
+    )
+    connection.execute(stmt)
+
+@event.listens_for(Session, 'after_flush')
+def _update_sales_rollups(session, flush_context):
+    """تحديث الملخصات اليومية في نفس المعاملة التي تضيف أو تحذف مبيعة أو مرتجعًا"""
+    summary_deltas = {}
+    product_deltas = {}
+
+    def add(deltas, key, values):
+        current = deltas.setdefault(key, {})
+        for column, value in values.items():
+            if value:
+                current[column] = current.get(column, 0) + value
+
+    changes = [(obj, 1) for obj in session.new] + \
+              [(obj, -1) for obj in session.deleted] + \
+              [(obj, 0) for obj in session.dirty]
+
+    # العلاقات غير المحملة تُقرأ من خريطة الهوية أو باستعلام دون تفريغ تلقائي
+    with session.no_autoflush:
+        for obj, sign in changes:
+            if isinstance(obj, Sale):
+                add(summary_deltas, _rollup_date(obj.created_at), {
+                    'sales_count': sign,
+                    'total_amount': _attribute_change(obj, 'total_amount', sign),
+                    'discount': _attribute_change(obj, 'discount', sign),
+                    'final_amount': _attribute_change(obj, 'final_amount', sign)
+                })
+            elif isinstance(obj, SaleItem):
+                sale = obj.sale or session.get(Sale, obj.sale_id)
+                sale_date = _rollup_date(sale.created_at if sale else None)
+                quantity = _attribute_change(obj, 'quantity', sign)
+                product = obj.product or session.get(Product, obj.product_id)
+                cost = quantity * (product.price_buy or 0) if product else 0
+                add(summary_deltas, sale_date, {'items_count': quantity, 'cost_amount': cost})
+                add(product_deltas, (sale_date, obj.product_id), {
+                    'quantity': quantity,
+                    'revenue': _attribute_change(obj, 'total_price', sign),
+                    'cost_amount': cost
+                })
+            elif isinstance(obj, Return):
+                add(summary_deltas, _rollup_date(obj.return_date), {
+                    'returns_count': sign,
+                    'returns_amount': _attribute_change(obj, 'total_amount', sign)
+                })
+            elif isinstance(obj, ReturnItem):
+                # اسم العلاقة الخلفية كلمة محجوزة في بايثون
+                parent = getattr(obj, 'return') or session.get(Return, obj.return_id)
+                return_date = _rollup_date(parent.return_date if parent else None)
+                quantity = _attribute_change(obj, 'quantity', sign)
+                add(product_deltas, (return_date, obj.product_id), {
+                    'returned_quantity': quantity,
+                    'returned_amount': quantity * (obj.price or 0)
+                })
+
+    if not summary_deltas and not product_deltas:
+        return
+
+    connection = session.connection()
+    for day, deltas in summary_deltas.items():
+        if deltas:
+            _upsert_rollup(connection, DailySalesSummary.__table__, {'date': day}, deltas)
+    for (day, product_id), deltas in product_deltas.items():
+        if deltas:
+            _upsert_rollup(connection, DailyProductSales.__table__, {'date': day, 'product_id': product_id}, deltas)
+
+def rebuild_sales_rollups(start_date=None, end_date=None, connection=None):
+    """
+    إعادة بناء الملخصات اليومية من جداول المبيعات والمرتجعات (للتعبئة الأولية أو التصحيح)
+
+    :param start_date: أول يوم (date) - الافتراضي أول مبيعة
+    :param end_date: آخر يوم (date) - الافتراضي اليوم
+    :param connection: اتصال قائم (مثل اتصال الترحيل)؛ تبقى المعاملة لصاحبه دون commit
+    :return: عدد الأيام التي تمت إعادة بنائها
+    """
+    session = Session(bind=connection) if connection is not None else db.session
+    day = func.date(Sale.created_at)
+    return_day = func.date(Return.return_date)
+
+    def in_range(query, column):
+        if start_date:
+            query = query.filter(column >= start_date.strftime('%Y-%m-%d'))
+        if end_date:
+            query = query.filter(column <= end_date.strftime('%Y-%m-%d'))
+        return query
+
+    summary = {}
+    products = {}
+
+    def row(key, store, fields):
+        return store.setdefault(key, dict.fromkeys(fields, 0))
+
+    for sale_day, count, total, discount, final in in_range(session.query(
+            day, func.count(Sale.id), func.sum(Sale.total_amount),
+            func.sum(Sale.discount), func.sum(Sale.final_amount)), day).group_by(day):
+        values = row(sale_day, summary, SUMMARY_FIELDS)
+        values.update(sales_count=count, total_amount=total or 0, discount=discount or 0, final_amount=final or 0)
+
+    for sale_day, product_id, quantity, revenue, cost in in_range(session.query(
+            day, SaleItem.product_id, func.sum(SaleItem.quantity), func.sum(SaleItem.total_price),
+            func.sum(SaleItem.quantity * Product.price_buy))
+            .join(Sale, Sale.id == SaleItem.sale_id)
+            .outerjoin(Product, Product.id == SaleItem.product_id), day).group_by(day, SaleItem.product_id):
+        values = row(sale_day, summary, SUMMARY_FIELDS)
+        values['items_count'] += quantity or 0
+        values['cost_amount'] += cost or 0
+        row((sale_day, product_id), products, PRODUCT_SALES_FIELDS).update(
+            quantity=quantity or 0, revenue=revenue or 0, cost_amount=cost or 0)
+
+    for day_value, count, amount in in_range(session.query(
+            return_day, func.count(Return.id), func.sum(Return.total_amount)), return_day).group_by(return_day):
+        row(day_value, summary, SUMMARY_FIELDS).update(returns_count=count, returns_amount=amount or 0)
+
+    for day_value, product_id, quantity, amount in in_range(session.query(
+            return_day, ReturnItem.product_id, func.sum(ReturnItem.quantity),
+            func.sum(ReturnItem.quantity * ReturnItem.price))
+            .join(Return, Return.id == ReturnItem.return_id), return_day).group_by(return_day, ReturnItem.product_id):
+        row((day_value, product_id), products, PRODUCT_SALES_FIELDS).update(
+            returned_quantity=quantity or 0, returned_amount=amount or 0)
+
+    def as_date(value):
+        return datetime.strptime(value, '%Y-%m-%d').date() if isinstance(value, str) else value
+
+    # حذف الملخصات القديمة في الفترة ثم إدراج الجديدة
+    for model in (DailySalesSummary, DailyProductSales):
+        query = session.query(model)
+        if start_date:
+            query = query.filter(model.date >= start_date)
+        if end_date:
+            query = query.filter(model.date <= end_date)
+        query.delete(synchronize_session=False)
+
+    now = datetime.utcnow()
+    if summary:
+        session.execute(DailySalesSummary.__table__.insert(), [
+            {'date': as_date(key), 'updated_at': now, **values} for key, values in summary.items()
+        ])
+    if products:
+        session.execute(DailyProductSales.__table__.insert(), [
+            {'date': as_date(key[0]), 'product_id': key[1], 'updated_at': now, **values}
+            for key, values in products.items()
+        ])
+    if connection is None:
+        db.session.commit()
+    else:
+        session.flush()
+        session.close()
+    return len(summary)
+
+def get_sales_summary(start_date, end_date):
+    """
+    إجماليات المبيعات لفترة من جدول الملخص اليومي (صف لكل يوم بدل كل عنصر مبيعات)
+
+    :param start_date: أول يوم (date)
+    :param end_date: آخر يوم (date)
+    :return: قاموس الإجماليات مع قائمة الأيام
+    """
+    days = DailySalesSummary.query.filter(
+        DailySalesSummary.date.between(start_date, end_date)
+    ).order_by(DailySalesSummary.date).all()
+
+    totals = dict.fromkeys(SUMMARY_FIELDS, 0)
+    for summary in days:
+        for field in SUMMARY_FIELDS:
+            totals[field] += getattr(summary, field) or 0
+
+    totals['profit'] = totals['final_amount'] - totals['cost_amount']
+    totals['net_amount'] = totals['final_amount'] - totals['returns_amount']
+    totals['days'] = [summary.to_dict() for summary in days]
+    return totals
+
+def get_top_products(start_date, end_date, limit=10):
+    """
+    أفضل المنتجات مبيعًا لفترة من جدول الملخص اليومي للمنتجات
+
+    :return: قائمة قواميس (product_id, product_name, quantity, revenue)
+    """
+    quantity = func.sum(DailyProductSales.quantity - DailyProductSales.returned_quantity)
+    revenue = func.sum(DailyProductSales.revenue - DailyProductSales.returned_amount)
+    rows = db.session.query(DailyProductSales.product_id, Product.name, quantity, revenue) \
+        .outerjoin(Product, Product.id == DailyProductSales.product_id) \
+        .filter(DailyProductSales.date.between(start_date, end_date)) \
+        .group_by(DailyProductSales.product_id, Product.name) \
+        .order_by(quantity.desc()) \
+        .limit(limit).all()
+
+    return [
+        {'product_id': product_id, 'product_name': name or '', 'quantity': qty or 0, 'revenue': rev or 0}
+        for product_id, name, qty, rev in rows
+    ]
+
 def add_sample_data():
     """إضافة بيانات تجريبية"""
     try:
@@ -640,3 +1115,8 @@ def add_sample_data():
     except Exception as e:
         print(f"خطأ في إضافة البيانات التجريبية: {e}")
         db.session.rollback()
+
+# تسجيل أحداث فهرس البحث وتنبيهات المخزون والبث المباشر (تعتمد على النماذج أعلاه)
+import product_search  # noqa: E402,F401
+import live_events  # noqa: E402,F401
+import notifications  # noqa: E402,F401
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+إخراج الفواتير الحرارية مباشرة بأوامر ESC/POS (طابعات 80mm)
+
+بدل إنشاء PDF يحوله برنامج التشغيل إلى صورة، تُرسم الأسطر هنا كصور نقطية
+بعرض رأس الطباعة وتُرسل للطابعة كأوامر GS v 0. النص العربي يُشكّل ويُرسم مرة
+واحدة لكل مقطع نصي (اسم منتج، عنوان ثابت...) ثم يُعاد استخدامه من الذاكرة.
+"""
+
+import os
+import socket
+from functools import lru_cache
+
+import arabic_reshaper
+from bidi.algorithm import get_display
+from PIL import Image, ImageDraw, ImageFont
+from config import Config
+
+# أوامر ESC/POS
+ESC_INIT = b'\x1b@'
+ESC_FEED = b'\x1bd'
+GS_RASTER = b'\x1dv0\x00'
+GS_CUT = b'\x1dVA\x00'
+
+# خطوط العرض حسب نوع السطر: (الحجم بالنقاط، عريض)
+TEXT_SIZES = {
+    'normal': (22, False),
+    'title': (32, True),
+    'final': (28, True),
+    'table': (20, False),
+    'table_header': (20, True),
+}
+
+def shape_text(text):
+    """
+    تشكيل النص العربي (وصل الحروف وترتيب العرض من اليمين لليسار)
+
+    الرسم النقطي لا يشكّل النص بنفسه (Pillow دون raqm)، لذلك يُشكّل هنا دائمًا.
+    """
+    if any('\u0600' <= char <= '\u06ff' for char in text):
+        return get_display(arabic_reshaper.reshape(text))
+    return text
+
+@lru_cache(maxsize=8)
+def _load_font(size, bold):
+    """تحميل الخط مرة واحدة لكل حجم"""
+    font_file = Config.ESCPOS_BOLD_FONT if bold else Config.ESCPOS_FONT
+    try:
+        return ImageFont.truetype(font_file, size)
+    except OSError:
+        return ImageFont.load_default(size)
+
+@lru_cache(maxsize=4096)
+def render_run(text, style='normal'):
+    """
+    رسم مقطع نصي كصورة أحادية اللون (تُخزن في الذاكرة لإعادة الاستخدام)
+
+    :param text: النص قبل التشكيل
+    :param style: نوع السطر من TEXT_SIZES
+    :return: صورة بوضع 'L' (أبيض على أسود) بارتفاع السطر
+    """
+    size, bold = TEXT_SIZES[style]
+    font = _load_font(size, bold)
+    shaped = shape_text(text)
+    left, top, right, bottom = font.getbbox(shaped or ' ')
+    ascent, descent = font.getmetrics()
+
+    image = Image.new('L', (max(right - left, 1), ascent + descent), 0)
+    ImageDraw.Draw(image).text((-left, 0), shaped, font=font, fill=255)
+    return image
+
+class EscPosReceipt:
+    """منشئ فاتورة ESC/POS سطرًا بسطر"""
+
+    def __init__(self, width=None, margin=8):
+        """
+        :param width: عرض رأس الطباعة بالنقاط (576 لطابعات 80mm بدقة 203dpi)
+        :param margin: الهامش الجانبي بالنقاط
+        """
+        self.width = width or Config.ESCPOS_DOTS_WIDTH
+        self.margin = margin
+        self._chunks = [ESC_INIT]
+
+    def _line(self, height):
+        """سطر فارغ بعرض رأس الطباعة"""
+        return Image.new('L', (self.width, height), 0)
+
+    def _place(self, line, run, left, right, align):
+        """وضع مقطع نصي داخل خانة [left, right) حسب المحاذاة"""
+        if run.width > right - left:
+            # قص النص الطويل مع الاحتفاظ ببدايته (يمين النص العربي)
+            if align == 'right':
+                run = run.crop((run.width - (right - left), 0, run.width, run.height))
+            else:
+                run = run.crop((0, 0, right - left, run.height))
+        if align == 'right':
+            x = right - run.width
+        elif align == 'center':
+            x = left + (right - left - run.width) // 2
+        else:
+            x = left
+        line.paste(run, (x, (line.height - run.height) // 2))
+
+    def _emit(self, line):
+        """تحويل السطر إلى أمر GS v 0 (بت 1 = نقطة سوداء)"""
+        width_bytes = (self.width + 7) // 8
+        self._chunks.append(GS_RASTER + bytes([
+            width_bytes & 0xff, width_bytes >> 8, line.height & 0xff, line.height >> 8
+        ]))
+        self._chunks.append(line.point(lambda value: 255 if value >= 128 else 0, '1').tobytes())
+
+    def text(self, text, style='normal', align='right'):
+        """سطر نصي واحد"""
+        run = render_run(text, style)
+        line = self._line(run.height)
+        self._place(line, run, self.margin, self.width - self.margin, align)
+        self._emit(line)
+
+    def row(self, cells, fractions, style='table'):
+        """
+        سطر جدول بخانات متعددة (من اليسار لليمين كما في فاتورة PDF)
+
+        :param cells: نصوص الخانات
+        :param fractions: نسبة عرض كل خانة من العرض المتاح
+        """
+        runs = [render_run(str(cell), style) for cell in cells]
+        line = self._line(max(run.height for run in runs))
+        usable = self.width - 2 * self.margin
+        left = self.margin
+        for run, fraction in zip(runs, fractions):
+            right = left + int(usable * fraction)
+            self._place(line, run, left + 2, right - 2, 'center')
+            left = right
+        self._emit(line)
+
+    def separator(self, thickness=2):
+        """خط فاصل أفقي"""
+        line = self._line(thickness + 6)
+        ImageDraw.Draw(line).rectangle(
+            (self.margin, 3, self.width - self.margin, 3 + thickness - 1), fill=255
+        )
+        self._emit(line)
+
+    def feed(self, lines=1):
+        """تقديم الورق عدد من الأسطر"""
+        self._chunks.append(ESC_FEED + bytes([lines]))
+
+    def cut(self):
+        """تقديم الورق ثم القص"""
+        self.feed(4)
+        self._chunks.append(GS_CUT)
+
+    def getvalue(self):
+        """أوامر الفاتورة كاملة"""
+        return b''.join(self._chunks)
+
+# نسب أعمدة جدول المنتجات (مطابقة لفاتورة PDF: 25، 10، 15، 15 مم)
+ITEMS_COLUMNS = (25 / 65, 10 / 65, 15 / 65, 15 / 65)
+
+def _items_table(receipt, items):
+    """جدول المنتجات"""
+    receipt.separator()
+    receipt.row(['المنتج', 'الكمية', 'السعر', 'المجموع'], ITEMS_COLUMNS, 'table_header')
+    receipt.separator(1)
+    for item in items:
+        product_name = item.product.name[:20] + "..." if len(item.product.name) > 20 else item.product.name
+        receipt.row([product_name, str(item.quantity), f"{item.unit_price:.2f}", f"{item.total_price:.2f}"],
+                    ITEMS_COLUMNS)
+    receipt.separator()
+
+def render_sale_receipt(sale, store_settings=None, width=None):
+    """
+    فاتورة بيع بأوامر ESC/POS بنفس ترتيب فاتورة PDF
+
+    :param sale: كائن Sale أو نسخته من batch_invoices.sale_snapshot
+    :return: بايتات الأوامر
+    """
+    if not hasattr(sale, 'items'):
+        # نموذج قاعدة البيانات: sale_items والخصم بدل حقول الفاتورة
+        from batch_invoices import sale_snapshot
+        sale = sale_snapshot(sale)
+
+    receipt = EscPosReceipt(width)
+
+    store_name = store_settings.store_name if store_settings else "متجر الهواتف"
+    receipt.text(store_name, 'title', 'center')
+    if store_settings and store_settings.address:
+        receipt.text(store_settings.address)
+    if store_settings and store_settings.phone:
+        receipt.text(f"هاتف: {store_settings.phone}")
+    receipt.feed()
+
+    receipt.text("فاتورة بيع", 'title', 'center')
+    receipt.text(f"رقم الفاتورة: {sale.id}")
+    receipt.text(f"التاريخ: {sale.created_at.strftime('%Y-%m-%d %H:%M')}")
+    if sale.customer:
+        receipt.text(f"العميل: {sale.customer.name}")
+
+    _items_table(receipt, sale.items)
+
+    currency = store_settings.currency_symbol if store_settings else "د.ج"
+    receipt.text(f"المجموع الفرعي: {sale.subtotal:.2f} {currency}")
+    if sale.discount_amount > 0:
+        receipt.text(f"الخصم: {sale.discount_amount:.2f} {currency}")
+    if sale.tax_amount > 0:
+        receipt.text(f"الضريبة: {sale.tax_amount:.2f} {currency}")
+    receipt.text(f"المجموع النهائي: {sale.final_amount:.2f} {currency}", 'final')
+    receipt.feed()
+
+    receipt.text("شكراً لزيارتكم", align='center')
+    receipt.text("نتمنى لكم يوماً سعيداً", align='center')
+    receipt.cut()
+    return receipt.getvalue()
+
+def render_purchase_receipt(purchase, store_settings=None, width=None):
+    """
+    فاتورة شراء بأوامر ESC/POS بنفس ترتيب فاتورة PDF
+
+    :param purchase: كائن PurchaseInvoice أو نسخته من batch_invoices.purchase_snapshot
+    :return: بايتات الأوامر
+    """
+    if not hasattr(purchase, 'items'):
+        from batch_invoices import purchase_snapshot
+        purchase = purchase_snapshot(purchase)
+
+    receipt = EscPosReceipt(width)
+
+    store_name = store_settings.store_name if store_settings else "متجر الهواتف"
+    receipt.text(store_name, 'title', 'center')
+    receipt.feed()
+
+    receipt.text("فاتورة شراء", 'title', 'center')
+    receipt.text(f"رقم الفاتورة: {purchase.id}")
+    receipt.text(f"التاريخ: {purchase.created_at.strftime('%Y-%m-%d %H:%M')}")
+    if purchase.supplier:
+        receipt.text(f"المورد: {purchase.supplier.name}")
+
+    _items_table(receipt, purchase.items)
+
+    currency = store_settings.currency_symbol if store_settings else "د.ج"
+    receipt.text(f"المجموع النهائي: {purchase.total_amount:.2f} {currency}", 'final')
+    receipt.cut()
+    return receipt.getvalue()
+
+def send_to_printer(data, target=None, timeout=10):
+    """
+    إرسال أوامر ESC/POS إلى الطابعة
+
+    :param data: بايتات الأوامر
+    :param target: 'tcp://host:port' لطابعة شبكية (المنفذ الافتراضي 9100)
+                   أو مسار ملف/جهاز مثل /dev/usb/lp0
+    :return: عدد البايتات المرسلة
+    """
+    target = target or Config.ESCPOS_PRINTER
+    if not target:
+        raise ValueError("لم يتم تحديد الطابعة")
+
+    if target.startswith('tcp://'):
+        host, _, port = target[len('tcp://'):].partition(':')
+        with socket.create_connection((host, int(port or 9100)), timeout=timeout) as connection:
+            connection.sendall(data)
+    else:
+        directory = os.path.dirname(target)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(target, 'ab') as f:
+            f.write(data)
+    return len(data)
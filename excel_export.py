@@ -4,10 +4,140 @@
 """
 
 from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
-from datetime import datetime
+from collections import namedtuple
+from datetime import datetime, time, timedelta
 from io import BytesIO
+import tempfile
+
+# تعريف عمود في التصدير (مشترك بين Excel وCSV وParquet):
+# الاسم البرمجي، العنوان، العرض، دالة استخراج القيمة الخام، نوع القيمة، هل يُجمع في الإجمالي
+ExportColumn = namedtuple('ExportColumn', ['name', 'header', 'width', 'value', 'kind', 'total'])
+
+def _column(name, header, width, value, kind='text', total=False):
+    return ExportColumn(name, header, width, value, kind, total)
+
+SALES_COLUMNS = [
+    _column('id', 'رقم الفاتورة', 12, lambda sale: sale.id, 'int'),
+    _column('created_at', 'التاريخ', 12, lambda sale: sale.created_at, 'date'),
+    _column('customer', 'العميل', 20, lambda sale: sale.customer.name if sale.customer else 'عميل غير محدد'),
+    _column('total_amount', 'المجموع الفرعي', 15, lambda sale: sale.total_amount, 'money', True),
+    _column('discount', 'الخصم', 12, lambda sale: sale.discount, 'money', True),
+    _column('final_amount', 'المجموع النهائي', 15, lambda sale: sale.final_amount, 'money', True),
+    _column('payment_method', 'طريقة الدفع', 12, lambda sale: sale.payment_method),
+    _column('notes', 'ملاحظات', 25, lambda sale: sale.notes or ''),
+]
+
+PRODUCTS_COLUMNS = [
+    _column('id', 'الرقم', 8, lambda product: product.id, 'int'),
+    _column('name', 'اسم المنتج', 25, lambda product: product.name),
+    _column('brand', 'الماركة', 15, lambda product: product.brand),
+    _column('model', 'الموديل', 15, lambda product: product.model),
+    _column('color', 'اللون', 12, lambda product: product.color or ''),
+    _column('price_buy', 'سعر الشراء', 15, lambda product: product.price_buy, 'money'),
+    _column('price_sell', 'سعر البيع', 15, lambda product: product.price_sell, 'money'),
+    _column('quantity', 'الكمية', 10, lambda product: product.quantity, 'int', True),
+    _column('min_quantity', 'الحد الأدنى', 12, lambda product: product.min_quantity, 'int'),
+    _column('category', 'الفئة', 15, lambda product: product.category.name if product.category else ''),
+]
+
+PURCHASES_COLUMNS = [
+    _column('invoice_number', 'رقم الفاتورة', 15, lambda purchase: purchase.invoice_number),
+    _column('created_at', 'التاريخ', 12, lambda purchase: purchase.created_at, 'date'),
+    _column('supplier', 'المورد', 20, lambda purchase: purchase.supplier.name if purchase.supplier else ''),
+    _column('total_amount', 'المجموع الفرعي', 15, lambda purchase: purchase.total_amount, 'money', True),
+    _column('discount', 'الخصم', 12, lambda purchase: purchase.discount, 'money', True),
+    _column('final_amount', 'المجموع النهائي', 15, lambda purchase: purchase.final_amount, 'money', True),
+    _column('payment_method', 'طريقة الدفع', 12, lambda purchase: purchase.payment_method),
+    _column('notes', 'ملاحظات', 25, lambda purchase: purchase.notes or ''),
+]
+
+SALE_ITEMS_COLUMNS = [
+    _column('id', 'الرقم', 8, lambda item: item.id, 'int'),
+    _column('sale_id', 'رقم الفاتورة', 12, lambda item: item.sale_id, 'int'),
+    _column('created_at', 'التاريخ', 12, lambda item: item.sale.created_at, 'date'),
+    _column('product_id', 'رقم المنتج', 10, lambda item: item.product_id, 'int'),
+    _column('product', 'المنتج', 25, lambda item: item.product.name if item.product else ''),
+    _column('quantity', 'الكمية', 10, lambda item: item.quantity, 'int', True),
+    _column('unit_price', 'سعر الوحدة', 15, lambda item: item.unit_price, 'money'),
+    _column('total_price', 'المجموع', 15, lambda item: item.total_price, 'money', True),
+]
+
+# الحد الذي يبقى تحته الملف المؤقت في الذاكرة قبل نقله إلى القرص
+EXPORT_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+def iter_in_chunks(rows, chunk_size=1000):
+    """
+    المرور على نتائج الاستعلام على دفعات (مؤشر من جهة الخادم) بدل تحميلها كاملة
+
+    :param rows: استعلام SQLAlchemy أو أي قائمة/مولد
+    :param chunk_size: حجم الدفعة
+    """
+    if hasattr(rows, 'yield_per'):
+        return rows.yield_per(chunk_size)
+    return rows
+
+def _period_end(end_date):
+    """
+    بداية اليوم التالي لتاريخ النهاية: يوم النهاية مشمول كاملاً
+
+    :param end_date: date أو datetime (يُستخدم التاريخ فقط)
+    """
+    return datetime.combine(end_date, time()) + timedelta(days=1)
+
+def sales_export_query(start_date=None, end_date=None):
+    """استعلام المبيعات للتصدير مع تحميل العميل في نفس الاستعلام"""
+    from sqlalchemy.orm import joinedload
+    from database import Sale
+
+    query = Sale.query.options(joinedload(Sale.customer))
+    if start_date:
+        query = query.filter(Sale.created_at >= start_date)
+    if end_date:
+        query = query.filter(Sale.created_at < _period_end(end_date))
+    return query.order_by(Sale.created_at, Sale.id)
+
+def products_export_query():
+    """استعلام المنتجات للتصدير مع تحميل الفئة في نفس الاستعلام"""
+    from sqlalchemy.orm import joinedload
+    from database import Product
+
+    return Product.query.options(joinedload(Product.category)).order_by(Product.id)
+
+def sale_items_export_query(start_date=None, end_date=None):
+    """استعلام عناصر المبيعات للتصدير مع تحميل المبيعة والمنتج في نفس الاستعلام"""
+    from sqlalchemy.orm import contains_eager, joinedload
+    from database import Sale, SaleItem
+
+    query = (SaleItem.query.join(SaleItem.sale)
+             .options(contains_eager(SaleItem.sale), joinedload(SaleItem.product)))
+    if start_date:
+        query = query.filter(Sale.created_at >= start_date)
+    if end_date:
+        query = query.filter(Sale.created_at < _period_end(end_date))
+    return query.order_by(Sale.created_at, SaleItem.id)
+
+def purchases_export_query(start_date=None, end_date=None):
+    """استعلام المشتريات للتصدير مع تحميل المورد في نفس الاستعلام"""
+    from sqlalchemy.orm import joinedload
+    from database import PurchaseInvoice
+
+    query = PurchaseInvoice.query.options(joinedload(PurchaseInvoice.supplier))
+    if start_date:
+        query = query.filter(PurchaseInvoice.created_at >= start_date)
+    if end_date:
+        query = query.filter(PurchaseInvoice.created_at < _period_end(end_date))
+    return query.order_by(PurchaseInvoice.created_at, PurchaseInvoice.id)
+
+# مجموعات البيانات القابلة للتصدير: (الأعمدة، دالة الاستعلام، هل تقبل فترة زمنية)
+EXPORT_DATASETS = {
+    'sales': (SALES_COLUMNS, sales_export_query, True),
+    'sale_items': (SALE_ITEMS_COLUMNS, sale_items_export_query, True),
+    'purchases': (PURCHASES_COLUMNS, purchases_export_query, True),
+    'products': (PRODUCTS_COLUMNS, products_export_query, False),
+}
 
 class ExcelExporter:
     """فئة تصدير البيانات إلى Excel"""
@@ -299,6 +429,128 @@ class ExcelExporter:
         buffer.seek(0)
         return buffer.getvalue()
 
+    def _register_styles(self, wb):
+        """تسجيل الأنماط المسماة مرة واحدة لكل ملف بدل إنشاء كائنات تنسيق لكل خلية"""
+        border = Border(
+            left=Side(style='thin'),
+            right=Side(style='thin'),
+            top=Side(style='thin'),
+            bottom=Side(style='thin')
+        )
+
+        styles = {
+            'report_title': dict(font=Font(bold=True, size=16), alignment=Alignment(horizontal="center", vertical="center")),
+            'report_period': dict(alignment=Alignment(horizontal="center", vertical="center")),
+            'report_header': dict(
+                font=Font(bold=True, size=12, color="FFFFFF"),
+                fill=PatternFill(start_color="366092", end_color="366092", fill_type="solid"),
+                alignment=Alignment(horizontal="center", vertical="center"),
+                border=border
+            ),
+            'report_cell': dict(border=border),
+            'report_date': dict(border=border, number_format='yyyy-mm-dd'),
+            'report_money': dict(border=border, number_format=f'#,##0.00 "{self.currency_symbol}"'),
+            'report_total': dict(font=Font(bold=True), border=border),
+            'report_total_money': dict(font=Font(bold=True), border=border,
+                                       number_format=f'#,##0.00 "{self.currency_symbol}"'),
+        }
+        for name, attributes in styles.items():
+            style = NamedStyle(name=name)
+            for attribute, value in attributes.items():
+                setattr(style, attribute, value)
+            wb.add_named_style(style)
+
+    def _styled_cell(self, ws, value, style):
+        """خلية للكتابة المتدفقة بنمط مسمى"""
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        return cell
+
+    def _stream_report(self, sheet_title, title, columns, rows, start_date=None, end_date=None, chunk_size=1000):
+        """
+        كتابة تقرير بوضع الكتابة فقط (write-only) صفًا بصف إلى ملف مؤقت
+
+        الذاكرة المستخدمة ثابتة مهما كان عدد الصفوف: الصفوف تُقرأ من قاعدة البيانات على
+        دفعات وتُكتب مباشرة دون الاحتفاظ بها.
+
+        :return: ملف مؤقت مفتوح في بدايته (يُغلق بعد الإرسال)
+        """
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title=sheet_title)
+        self._register_styles(wb)
+
+        # تنسيق عرض الأعمدة (يجب قبل كتابة أي صف)
+        for i, column in enumerate(columns, 1):
+            ws.column_dimensions[get_column_letter(i)].width = column.width
+
+        # العنوان الرئيسي وفترة التقرير
+        ws.append([self._styled_cell(ws, title, 'report_title')])
+        if start_date and end_date:
+            period = f"من {start_date.strftime('%Y-%m-%d')} إلى {end_date.strftime('%Y-%m-%d')}"
+            ws.append([self._styled_cell(ws, period, 'report_period')])
+        ws.append([])
+
+        # رؤوس الأعمدة
+        ws.append([self._styled_cell(ws, column.header, 'report_header') for column in columns])
+
+        cell_styles = [
+            {'money': 'report_money', 'date': 'report_date'}.get(column.kind, 'report_cell')
+            for column in columns
+        ]
+        totals = [0 if column.total else None for column in columns]
+        count = 0
+
+        for row in iter_in_chunks(rows, chunk_size):
+            values = [column.value(row) for column in columns]
+            ws.append([self._styled_cell(ws, value, style) for value, style in zip(values, cell_styles)])
+            for i, value in enumerate(values):
+                if totals[i] is not None:
+                    totals[i] += value or 0
+            count += 1
+
+        # الإجمالي
+        ws.append([])
+        summary = [self._styled_cell(ws, f"الإجمالي ({count}):", 'report_total')]
+        for i, column in enumerate(columns[1:], 1):
+            style = 'report_total_money' if column.kind == 'money' else 'report_total'
+            summary.append(self._styled_cell(ws, totals[i], style))
+        ws.append(summary)
+
+        output = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE)
+        wb.save(output)
+        output.seek(0)
+        return output
+
+    def stream_sales_report(self, sales, start_date=None, end_date=None, chunk_size=1000):
+        """
+        تصدير تقرير المبيعات بوضع متدفق للفترات الطويلة
+
+        :param sales: استعلام المبيعات (انظر sales_export_query) أو أي مولد
+        :return: ملف مؤقت مفتوح في بدايته
+        """
+        return self._stream_report("تقرير المبيعات", "تقرير المبيعات - متجر الهواتف المحمولة",
+                                   SALES_COLUMNS, sales, start_date, end_date, chunk_size)
+
+    def stream_products_report(self, products, chunk_size=1000):
+        """
+        تصدير تقرير المنتجات بوضع متدفق
+
+        :param products: استعلام المنتجات (انظر products_export_query) أو أي مولد
+        :return: ملف مؤقت مفتوح في بدايته
+        """
+        return self._stream_report("تقرير المنتجات", "تقرير المنتجات - متجر الهواتف المحمولة",
+                                   PRODUCTS_COLUMNS, products, chunk_size=chunk_size)
+
+    def stream_purchase_report(self, purchases, start_date=None, end_date=None, chunk_size=1000):
+        """
+        تصدير تقرير المشتريات بوضع متدفق للفترات الطويلة
+
+        :param purchases: استعلام المشتريات (انظر purchases_export_query) أو أي مولد
+        :return: ملف مؤقت مفتوح في بدايته
+        """
+        return self._stream_report("تقرير المشتريات", "تقرير المشتريات - متجر الهواتف المحمولة",
+                                   PURCHASES_COLUMNS, purchases, start_date, end_date, chunk_size)
+
 def format_currency_excel(amount):
     """تنسيق العملة للـ Excel"""
     return f"{amount:,.2f} د.ج"
\ No newline at end of file
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+إعدادات gunicorn: تشغيل الخيوط الخلفية داخل كل عامل بعد fork
+
+مع --preload يُنشأ التطبيق في العملية الرئيسية، والخيوط لا تنتقل إلى العمال عند
+fork، لذلك تبدأ هنا وليس في create_app.
+"""
+
+def post_fork(server, worker):
+    from app import app, start_background_tasks
+    start_background_tasks(app)
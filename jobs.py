@@ -0,0 +1,530 @@
+# -*- coding: utf-8 -*-
+"""
+نظام المهام الخلفية للتصدير وإنشاء ملفات PDF
+
+المهام الطويلة (تقارير Excel والفواتير) تُسجل في طابور SQLite وتُنفذ في مجموعة
+عمليات منفصلة، فيعود الطلب فورًا ولا يُحجز خيط الخادم. يتابع العميل حالة المهمة
+ثم يحمل الملف عند جاهزيته.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import multiprocessing
+from config import Config
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+PDF_MIMETYPE = 'application/pdf'
+
+# دوال تنفيذ المهام حسب النوع
+_job_handlers = {}
+
+def job_handler(kind):
+    """
+    تسجيل دالة تنفيذ لنوع مهمة
+
+    الدالة تستقبل (المعاملات، مسار الملف الناتج) وتكتب الملف ثم تُرجع (اسم الملف للتحميل، نوع المحتوى).
+    يجب أن تكون الدالة على مستوى الوحدة لتُنقل إلى عمليات التنفيذ.
+
+    :param kind: نوع المهمة
+    """
+    def decorator(func):
+        _job_handlers[kind] = func
+        return func
+    return decorator
+
+def get_job_handler(kind):
+    """الحصول على دالة تنفيذ نوع مهمة (None إذا لم يكن مسجلاً)"""
+    return _job_handlers.get(kind)
+
+class JobQueue:
+    """
+    طابور مهام في ملف SQLite (وضع WAL)
+
+    يمكن لعدة عمليات gunicorn استخدامه معًا: حجز المهمة يتم داخل معاملة
+    BEGIN IMMEDIATE فلا تُنفذ المهمة الواحدة مرتين.
+    """
+
+    def __init__(self, jobs_dir):
+        """
+        :param jobs_dir: مجلد قاعدة بيانات الطابور والملفات الناتجة
+        """
+        self.jobs_dir = jobs_dir
+        self.results_dir = os.path.join(jobs_dir, 'results')
+        self.db_path = os.path.join(jobs_dir, 'jobs.db')
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _create_schema(self, conn):
+        """إنشاء المجلدات والجدول عند أول استخدام (لا ملفات عند استيراد الوحدة)"""
+        if not os.path.exists(self.results_dir):
+            os.makedirs(self.results_dir)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result_path TEXT,
+                filename TEXT,
+                mimetype TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                progress_done INTEGER,
+                progress_total INTEGER
+            )
+        """)
+        # طوابير أنشئت قبل إضافة أعمدة التقدم
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column in ('progress_done', 'progress_total'):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} INTEGER")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created_at ON jobs (status, created_at)")
+
+    def _connection(self):
+        """اتصال مستقل لكل خيط ولكل عملية (لا يُشارك الاتصال بعد fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            with self._schema_lock:
+                if not self._schema_ready and not os.path.exists(self.jobs_dir):
+                    os.makedirs(self.jobs_dir)
+                conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+                conn.row_factory = sqlite3.Row
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                if not self._schema_ready:
+                    self._create_schema(conn)
+                    self._schema_ready = True
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def enqueue(self, kind, params=None):
+        """
+        إضافة مهمة إلى الطابور
+
+        :param kind: نوع المهمة (يجب أن يكون مسجلاً بـ job_handler)
+        :param params: معاملات قابلة للتحويل إلى JSON
+        :return: معرف المهمة
+        """
+        if kind not in _job_handlers:
+            raise ValueError(f"نوع مهمة غير معروف: {kind}")
+
+        job_id = uuid.uuid4().hex
+        self._connection().execute(
+            "INSERT INTO jobs (id, kind, params, status, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(params or {}, ensure_ascii=False), JOB_QUEUED, time.time())
+        )
+        return job_id
+
+    def claim(self):
+        """
+        حجز أقدم مهمة في الانتظار
+
+        :return: قاموس المهمة أو None إذا كان الطابور فارغًا
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (JOB_QUEUED,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, started_at = ? WHERE id = ?",
+                    (JOB_RUNNING, time.time(), row['id'])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if row is None:
+            return None
+        job = self._to_dict(row)
+        job['status'] = JOB_RUNNING
+        return job
+
+    def complete(self, job_id, result_path, filename, mimetype):
+        """تسجيل انتهاء المهمة بنجاح"""
+        self._connection().execute(
+            "UPDATE jobs SET status = ?, result_path = ?, filename = ?, mimetype = ?, finished_at = ? WHERE id = ?",
+            (JOB_DONE, result_path, filename, mimetype, time.time(), job_id)
+        )
+
+    def fail(self, job_id, error):
+        """تسجيل فشل المهمة"""
+        self._connection().execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+            (JOB_FAILED, str(error), time.time(), job_id)
+        )
+
+    def set_progress(self, job_id, done, total):
+        """
+        تسجيل تقدم مهمة جارية
+
+        :param done: عدد العناصر المنتهية
+        :param total: إجمالي العناصر
+        """
+        self._connection().execute(
+            "UPDATE jobs SET progress_done = ?, progress_total = ? WHERE id = ?",
+            (done, total, job_id)
+        )
+
+    def get(self, job_id):
+        """
+        الحصول على حالة مهمة
+
+        :return: قاموس المهمة أو None
+        """
+        row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def result_path(self, job_id):
+        """مسار الملف الناتج لمهمة"""
+        self._connection()
+        return os.path.join(self.results_dir, f"{job_id}.out")
+
+    def requeue_stale(self, max_age, exclude=()):
+        """
+        إعادة المهام العالقة في حالة التنفيذ (بعد توقف عملية التنفيذ) إلى الانتظار
+
+        :param max_age: أقصى مدة تنفيذ مقبولة بالثواني
+        :param exclude: معرفات مهام ما زالت تُنفذ (لا تُعاد فتُنفذ مرتين)
+        :return: عدد المهام المعادة
+        """
+        exclude = list(exclude)
+        placeholders = ', '.join('?' * len(exclude))
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = ?, started_at = NULL, progress_done = NULL, progress_total = NULL "
+            "WHERE status = ? AND started_at < ?"
+            + (f" AND id NOT IN ({placeholders})" if exclude else ""),
+            [JOB_QUEUED, JOB_RUNNING, time.time() - max_age] + exclude
+        )
+        return cursor.rowcount
+
+    def cleanup(self, max_age):
+        """
+        حذف المهام المنتهية الأقدم من المدة المحددة مع ملفاتها
+
+        :param max_age: مدة الاحتفاظ بالثواني
+        :return: عدد المهام المحذوفة
+        """
+        conn = self._connection()
+        rows = conn.execute(
+            "SELECT id, result_path FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+            (JOB_DONE, JOB_FAILED, time.time() - max_age)
+        ).fetchall()
+        for row in rows:
+            if row['result_path'] and os.path.exists(row['result_path']):
+                try:
+                    os.remove(row['result_path'])
+                except OSError as e:
+                    print(f"خطأ في حذف ملف المهمة: {e}")
+            conn.execute("DELETE FROM jobs WHERE id = ?", (row['id'],))
+        return len(rows)
+
+    def _to_dict(self, row):
+        """تحويل صف المهمة إلى قاموس"""
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        return job
+
+def _init_worker():
+    """تهيئة عملية التنفيذ: لا خيوط خلفية داخلها، مع تجهيز خطوط الفواتير مسبقًا"""
+    Config.CACHE_JANITOR_ENABLED = False
+    Config.JOBS_WORKER_ENABLED = False
+    Config.NOTIFICATIONS_ENABLED = False
+
+    from thermal_invoice import warm_up
+    warm_up()
+
+# المهمة الجارية في عملية التنفيذ الحالية: (مجلد الطابور، معرف المهمة)
+_current_job = None
+_progress_queues = {}
+
+def report_progress(done, total):
+    """
+    تسجيل تقدم المهمة الجارية في الطابور (تستدعيها دوال التنفيذ)
+
+    لا تأثير لها خارج عملية التنفيذ، وفشل التسجيل لا يوقف المهمة.
+
+    :param done: عدد العناصر المنتهية
+    :param total: إجمالي العناصر
+    """
+    if _current_job is None:
+        return
+    jobs_dir, job_id = _current_job
+    try:
+        queue = _progress_queues.get(jobs_dir)
+        if queue is None:
+            queue = _progress_queues[jobs_dir] = JobQueue(jobs_dir)
+        queue.set_progress(job_id, done, total)
+    except Exception as e:
+        print(f"خطأ في تسجيل تقدم المهمة {job_id}: {e}")
+
+def _execute(handler, params, output_path, job=None):
+    """
+    تنفيذ المهمة داخل عملية التنفيذ
+
+    :param job: (مجلد الطابور، معرف المهمة) لتسجيل التقدم عبر report_progress
+    """
+    global _current_job
+    _current_job = job
+    try:
+        return handler(params, output_path)
+    finally:
+        _current_job = None
+
+class JobWorker:
+    """
+    موزع المهام: يحجز المهام من الطابور ويرسلها إلى مجموعة عمليات
+
+    يعمل في خيط خلفي داخل عملية الخادم، أما التنفيذ الفعلي ففي عمليات منفصلة
+    (spawn) فلا يتأثر خيط الطلبات بالمهام الثقيلة.
+    """
+
+    def __init__(self, queue, processes=None, poll_interval=None):
+        """
+        :param queue: طابور المهام
+        :param processes: عدد عمليات التنفيذ
+        :param poll_interval: ثوانٍ بين فحوصات الطابور
+        """
+        self.queue = queue
+        self.processes = processes or Config.JOBS_PROCESSES
+        self.poll_interval = poll_interval or Config.JOBS_POLL_INTERVAL
+        self._pool = None
+        self._running = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _get_pool(self):
+        """إنشاء مجموعة العمليات عند أول مهمة"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+        return self._pool
+
+    def _collect(self):
+        """تسجيل نتائج المهام المنتهية"""
+        for job_id, (future, output_path) in list(self._running.items()):
+            if not future.done():
+                continue
+            del self._running[job_id]
+            try:
+                filename, mimetype = future.result()
+                self.queue.complete(job_id, output_path, filename, mimetype)
+            except Exception as e:
+                print(f"خطأ في تنفيذ المهمة {job_id}: {e}")
+                self.queue.fail(job_id, e)
+
+    def run_once(self):
+        """
+        دورة توزيع واحدة: تسجيل المنتهي ثم حجز مهام جديدة حسب السعة المتاحة
+
+        :return: عدد المهام المرسلة
+        """
+        submitted = 0
+        with self._lock:
+            self._collect()
+            while len(self._running) < self.processes:
+                job = self.queue.claim()
+                if job is None:
+                    break
+                handler = get_job_handler(job['kind'])
+                if handler is None:
+                    self.queue.fail(job['id'], f"نوع مهمة غير معروف: {job['kind']}")
+                    continue
+                output_path = self.queue.result_path(job['id'])
+                future = self._get_pool().submit(_execute, handler, job['params'], output_path,
+                                                 (self.queue.jobs_dir, job['id']))
+                self._running[job['id']] = (future, output_path)
+                submitted += 1
+        return submitted
+
+    def run_until_idle(self, timeout=60):
+        """
+        توزيع المهام حتى يفرغ الطابور وتنتهي جميع المهام الجارية
+
+        :param timeout: أقصى مدة انتظار بالثواني
+        :return: True إذا انتهت جميع المهام
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            submitted = self.run_once()
+            if not submitted and not self._running:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def _run(self):
+        """حلقة التوزيع في الخيط الخلفي"""
+        last_cleanup = 0
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.run_once()
+                if time.time() - last_cleanup > 3600:
+                    with self._lock:
+                        self.queue.requeue_stale(Config.JOBS_TIMEOUT, exclude=self._running)
+                    self.queue.cleanup(Config.JOBS_RESULT_TTL)
+                    last_cleanup = time.time()
+            except Exception as e:
+                print(f"خطأ في موزع المهام: {e}")
+
+    def start(self):
+        """تشغيل الموزع في خيط خلفي (مرة واحدة لكل عملية)"""
+        if self._thread is not None and self._thread.is_alive():
+            return False
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='job-worker', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """إيقاف الخيط الخلفي ومجموعة العمليات"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def stats(self):
+        """إحصائيات الموزع"""
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'processes': self.processes,
+            'active_jobs': len(self._running)
+        }
+
+def _parse_date(value):
+    """تحويل تاريخ نصي (YYYY-MM-DD) إلى datetime"""
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
+
+def _app_context():
+    """سياق التطبيق داخل عملية التنفيذ"""
+    from app import app
+    return app.app_context()
+
+def _save_stream(output, output_path):
+    """نسخ ملف مؤقت إلى مسار الملف الناتج"""
+    with output, open(output_path, 'wb') as f:
+        shutil.copyfileobj(output, f)
+
+@job_handler('sales_export')
+def export_sales_job(params, output_path):
+    """مهمة تصدير تقرير المبيعات"""
+    from excel_export import ExcelExporter, sales_export_query
+
+    start_date = _parse_date(params.get('start_date'))
+    end_date = _parse_date(params.get('end_date'))
+    with _app_context():
+        output = ExcelExporter().stream_sales_report(sales_export_query(start_date, end_date), start_date, end_date)
+    _save_stream(output, output_path)
+    return f"sales_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx", XLSX_MIMETYPE
+
+@job_handler('products_export')
+def export_products_job(params, output_path):
+    """مهمة تصدير تقرير المنتجات"""
+    from excel_export import ExcelExporter, products_export_query
+
+    with _app_context():
+        output = ExcelExporter().stream_products_report(products_export_query())
+    _save_stream(output, output_path)
+    return f"products_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx", XLSX_MIMETYPE
+
+@job_handler('purchases_export')
+def export_purchases_job(params, output_path):
+    """مهمة تصدير تقرير المشتريات"""
+    from excel_export import ExcelExporter, purchases_export_query
+
+    start_date = _parse_date(params.get('start_date'))
+    end_date = _parse_date(params.get('end_date'))
+    with _app_context():
+        output = ExcelExporter().stream_purchase_report(purchases_export_query(start_date, end_date), start_date, end_date)
+    _save_stream(output, output_path)
+    return f"purchases_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx", XLSX_MIMETYPE
+
+def _invoice_job(kind, record_id, output_path):
+    """إنشاء فاتورة حرارية واحدة من نسخة محملة بعناصرها"""
+    from batch_invoices import load_invoices, store_snapshot
+    from database import StoreSettings
+    from thermal_invoice import ThermalInvoiceGenerator
+
+    with _app_context():
+        records = load_invoices(kind, [record_id])
+        store_settings = store_snapshot(StoreSettings.query.first())
+    if not records:
+        raise ValueError(f"الفاتورة غير موجودة: {record_id}")
+
+    generator = ThermalInvoiceGenerator()
+    generate = generator.generate_sale_invoice if kind == 'sale' else generator.generate_purchase_invoice
+    _save_stream(generate(records[0], store_settings), output_path)
+    return f"{kind}_invoice_{record_id}.pdf", PDF_MIMETYPE
+
+@job_handler('sale_invoice')
+def sale_invoice_job(params, output_path):
+    """مهمة إنشاء فاتورة بيع حرارية"""
+    return _invoice_job('sale', params['sale_id'], output_path)
+
+@job_handler('purchase_invoice')
+def purchase_invoice_job(params, output_path):
+    """مهمة إنشاء فاتورة شراء حرارية"""
+    return _invoice_job('purchase', params['purchase_id'], output_path)
+
+@job_handler('invoice_batch')
+def invoice_batch_job(params, output_path):
+    """مهمة إنشاء عدة فواتير في ملف PDF مدمج أو zip"""
+    from batch_invoices import load_invoices, render_invoices, store_snapshot
+    from database import StoreSettings
+
+    kind = params['kind']
+    output = params.get('output', 'pdf')
+    with _app_context():
+        records = load_invoices(kind, params['ids'])
+        store_settings = store_snapshot(StoreSettings.query.first())
+
+    report_progress(0, len(records))
+    _save_stream(render_invoices(kind, records, store_settings, output, progress=report_progress), output_path)
+    mimetype = PDF_MIMETYPE if output == 'pdf' else 'application/zip'
+    return f"{kind}_invoices_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{output}", mimetype
+
+# الطابور والموزع المشتركان
+job_queue = JobQueue(Config.JOBS_DIR)
+job_worker = JobWorker(job_queue)
+
+if __name__ == '__main__':
+    # تشغيل الموزع كعملية مستقلة: python jobs.py --processes 2
+    import argparse
+
+    parser = argparse.ArgumentParser(description='تشغيل منفذ المهام الخلفية')
+    parser.add_argument('--processes', type=int, default=Config.JOBS_PROCESSES, help='عدد عمليات التنفيذ')
+    args = parser.parse_args()
+
+    job_worker.processes = args.processes
+    print(f"🔄 منفذ المهام يعمل ({args.processes} عمليات)")
+    try:
+        while True:
+            job_worker.run_once()
+            time.sleep(job_worker.poll_interval)
+    except KeyboardInterrupt:
+        job_worker.stop()
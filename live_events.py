@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+بث الأحداث المباشرة إلى المتصفحات (Server-Sent Events)
+
+وسيط نشر/اشتراك داخل العملية: أحداث البيع والمرتجعات والمخزون المنخفض تُجمع أثناء
+المعاملة وتُنشر مرة واحدة بعد نجاحها، ثم تُوزع على طوابير جميع المتصفحات المتصلة.
+كل حدث يحمل الفروقات (counters) فتحدّث لوحة التحكم أرقامها دون إعادة الاستعلام.
+
+يُحفظ آخر EVENTS_HISTORY حدث، فالمتصفح الذي ينقطع اتصاله (أو يغلقه عند إخفاء
+التبويب) يستعيد ما فاته عبر Last-Event-ID.
+"""
+
+import itertools
+import json
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config import Config
+from database import Sale, Return
+
+class BrokerFull(Exception):
+    """تم بلوغ الحد الأقصى للاتصالات المفتوحة"""
+
+class Subscription:
+    """اشتراك متصفح واحد: طابور أحداث محدود"""
+
+    def __init__(self, size):
+        self.queue = queue.Queue(maxsize=size)
+        # امتلاء الطابور (متصفح بطيء) ينهي البث؛ يعيد المتصفح الاتصال ويستعيد ما فاته
+        self.overflowed = False
+
+    def get(self, timeout):
+        """
+        الحدث التالي
+
+        :return: الحدث أو None عند انتهاء المهلة
+        """
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class EventBroker:
+    """وسيط النشر/الاشتراك في العملية الحالية"""
+
+    def __init__(self, history=None, queue_size=None, max_subscribers=None):
+        """
+        :param history: عدد الأحداث المحفوظة للاستعادة
+        :param queue_size: حجم طابور كل متصفح
+        :param max_subscribers: الحد الأقصى للاتصالات المفتوحة
+        """
+        self.queue_size = queue_size or Config.EVENTS_QUEUE_SIZE
+        self.max_subscribers = max_subscribers or Config.EVENTS_MAX_SUBSCRIBERS
+        # معرف تشغيل العملية: معرفات الأحداث من تشغيل سابق لا تُستعاد
+        self.epoch = uuid.uuid4().hex[:8]
+        self._history = deque(maxlen=history or Config.EVENTS_HISTORY)
+        self._sequence = itertools.count(1)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def publish(self, event_type, data=None, counters=None):
+        """
+        نشر حدث لجميع المتصفحات المتصلة
+
+        :param event_type: نوع الحدث (sale، return، low_stock، restocked)
+        :param data: بيانات الحدث
+        :param counters: فروقات عدادات لوحة التحكم (مثل {'today_sales_count': 1})
+        :return: الحدث المنشور
+        """
+        with self._lock:
+            item = {
+                'id': f"{self.epoch}-{next(self._sequence)}",
+                'type': event_type,
+                'data': {**(data or {}), 'counters': counters or {}}
+            }
+            self._history.append(item)
+            self.published += 1
+            for subscription in self._subscribers:
+                if subscription.overflowed:
+                    continue
+                try:
+                    subscription.queue.put_nowait(item)
+                except queue.Full:
+                    subscription.overflowed = True
+        return item
+
+    def _missed(self, last_event_id):
+        """الأحداث المحفوظة بعد معرف معين (قائمة فارغة إذا كان من تشغيل آخر)"""
+        epoch, _, sequence = (last_event_id or '').partition('-')
+        if epoch != self.epoch or not sequence.isdigit():
+            return []
+        return [item for item in self._history if int(item['id'].partition('-')[2]) > int(sequence)]
+
+    def subscribe(self, last_event_id=None):
+        """
+        فتح اشتراك جديد
+
+        :param last_event_id: آخر حدث استلمه المتصفح (لاستعادة ما فاته)
+        :return: الاشتراك
+        :raises BrokerFull: عند بلوغ الحد الأقصى للاتصالات
+        """
+        subscription = Subscription(self.queue_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise BrokerFull()
+            for item in self._missed(last_event_id)[-self.queue_size:]:
+                subscription.queue.put_nowait(item)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """إغلاق اشتراك"""
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stats(self):
+        """إحصائيات الوسيط في هذه العملية"""
+        return {
+            'subscribers': len(self._subscribers),
+            'published': self.published,
+            'history': len(self._history)
+        }
+
+def format_sse(item):
+    """تمثيل الحدث بصيغة text/event-stream"""
+    data = json.dumps(item['data'], ensure_ascii=False, default=str)
+    return f"id: {item['id']}\nevent: {item['type']}\ndata: {data}\n\n"
+
+def stream(broker, subscription, timeout=None, heartbeat=None):
+    """
+    مولد البث لمتصفح واحد
+
+    ينتهي بعد timeout ثانية ليحرر خيط الخادم؛ يعيد المتصفح الاتصال تلقائيًا.
+
+    :param timeout: مدة الاتصال بالثواني
+    :param heartbeat: الفاصل بين رسائل الإبقاء على الاتصال
+    """
+    timeout = Config.EVENTS_STREAM_TIMEOUT if timeout is None else timeout
+    heartbeat = heartbeat or Config.EVENTS_HEARTBEAT
+    deadline = time.monotonic() + timeout
+    try:
+        yield f"retry: {Config.EVENTS_RETRY_MS}\n\n"
+        while not subscription.overflowed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            item = subscription.get(min(heartbeat, remaining))
+            if item is None:
+                yield ": ping\n\n"
+            else:
+                yield format_sse(item)
+    finally:
+        broker.unsubscribe(subscription)
+
+def queue_event(session, event_type, data=None, counters=None):
+    """
+    إضافة حدث يُنشر بعد نجاح معاملة الجلسة (ويُتجاهل عند التراجع)
+
+    :param session: جلسة SQLAlchemy
+    """
+    session.info.setdefault('live_events', []).append((event_type, data, counters))
+
+@event.listens_for(Session, 'after_flush')
+def _collect_events(session, flush_context):
+    """تجميع أحداث المبيعات والمرتجعات الجديدة في المعاملة"""
+    for obj in session.new:
+        if isinstance(obj, Sale):
+            queue_event(session, 'sale',
+                        {'id': obj.id, 'final_amount': obj.final_amount, 'payment_method': obj.payment_method},
+                        {'today_sales_count': 1, 'today_revenue': obj.final_amount or 0})
+        elif isinstance(obj, Return):
+            queue_event(session, 'return',
+                        {'id': obj.id, 'sale_id': obj.sale_id, 'total_amount': obj.total_amount})
+
+@event.listens_for(Session, 'after_commit')
+def _publish_events(session):
+    """نشر الأحداث المجمعة بعد نجاح المعاملة فقط"""
+    events = session.info.pop('live_events', None)
+    for event_type, data, counters in events or ():
+        try:
+            event_broker.publish(event_type, data, counters)
+        except Exception as e:
+            print(f"خطأ في نشر الحدث {event_type}: {e}")
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_events(session):
+    """تجاهل الأحداث المجمعة عند التراجع عن المعاملة"""
+    session.info.pop('live_events', None)
+
+# وسيط العملية الحالية
+event_broker = EventBroker()
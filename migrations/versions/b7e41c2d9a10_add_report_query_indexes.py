@@ -0,0 +1,47 @@
+"""Add indexes for report and listing queries
+
+Revision ID: b7e41c2d9a10
+Revises: 571dee0ef261
+Create Date: 2026-10-17 09:12:44.381205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e41c2d9a10'
+down_revision = '571dee0ef261'
+branch_labels = None
+depends_on = None
+
+
+# (اسم الفهرس، الجدول، الأعمدة) - يجب أن تطابق __table_args__ في database.py
+INDEXES = [
+    ('ix_sales_created_at', 'sales', ['created_at']),
+    ('ix_sales_customer_id', 'sales', ['customer_id']),
+    ('ix_returns_sale_id', 'returns', ['sale_id']),
+    ('ix_returns_return_date', 'returns', ['return_date']),
+    ('ix_return_items_return_id', 'return_items', ['return_id']),
+    ('ix_sale_items_sale_id', 'sale_items', ['sale_id']),
+    ('ix_sale_items_product_id_sale_id', 'sale_items', ['product_id', 'sale_id']),
+    ('ix_purchase_invoices_created_at', 'purchase_invoices', ['created_at']),
+    ('ix_purchase_invoices_supplier_id', 'purchase_invoices', ['supplier_id']),
+    ('ix_purchase_items_purchase_invoice_id', 'purchase_items', ['purchase_invoice_id']),
+    ('ix_purchase_items_product_id', 'purchase_items', ['product_id']),
+    ('ix_notifications_user_id_read_timestamp', 'notifications', ['user_id', 'read', 'timestamp']),
+    ('ix_activity_logs_timestamp', 'activity_logs', ['timestamp']),
+    ('ix_audit_logs_timestamp', 'audit_logs', ['timestamp']),
+    ('ix_audit_logs_table_name_record_id', 'audit_logs', ['table_name', 'record_id']),
+]
+
+
+def upgrade():
+    # db.create_all() قد يكون أنشأ بعض الفهارس مسبقاً في قواعد البيانات الجديدة
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
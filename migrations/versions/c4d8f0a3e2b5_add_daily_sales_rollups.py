@@ -0,0 +1,62 @@
+"""Add daily sales rollup tables
+
+Revision ID: c4d8f0a3e2b5
+Revises: b7e41c2d9a10
+Create Date: 2026-10-17 11:40:02.517934
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d8f0a3e2b5'
+down_revision = 'b7e41c2d9a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_sales_summary',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('sales_count', sa.Integer(), nullable=False),
+    sa.Column('items_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.Column('discount', sa.Float(), nullable=False),
+    sa.Column('final_amount', sa.Float(), nullable=False),
+    sa.Column('cost_amount', sa.Float(), nullable=False),
+    sa.Column('returns_count', sa.Integer(), nullable=False),
+    sa.Column('returns_amount', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('date'),
+    if_not_exists=True
+    )
+    op.create_table('daily_product_sales',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('cost_amount', sa.Float(), nullable=False),
+    sa.Column('returned_quantity', sa.Integer(), nullable=False),
+    sa.Column('returned_amount', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('date', 'product_id', name='uq_daily_product_sales_date_product_id'),
+    if_not_exists=True
+    )
+    op.create_index('ix_daily_product_sales_product_id_date', 'daily_product_sales', ['product_id', 'date'],
+                    unique=False, if_not_exists=True)
+
+    # تعبئة الملخصات من المبيعات والمرتجعات الموجودة حتى لا تظهر التقارير أصفارًا بعد الترقية
+    from database import rebuild_sales_rollups
+    rebuild_sales_rollups(connection=op.get_bind())
+
+
+def downgrade():
+    op.drop_index('ix_daily_product_sales_product_id_date', table_name='daily_product_sales', if_exists=True)
+    op.drop_table('daily_product_sales')
+    op.drop_table('daily_sales_summary')
@@ -0,0 +1,39 @@
+"""Add product full-text search index
+
+Revision ID: d2a7c91f4b6e
+Revises: c4d8f0a3e2b5
+Create Date: 2026-10-17 15:20:41.108214
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a7c91f4b6e'
+down_revision = 'c4d8f0a3e2b5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS product_search ("
+            "product_id INTEGER PRIMARY KEY REFERENCES products (id) ON DELETE CASCADE, "
+            "document TSVECTOR NOT NULL)"
+        )
+        op.execute("CREATE INDEX IF NOT EXISTS ix_product_search_document ON product_search USING GIN (document)")
+    else:
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS product_search USING fts5("
+            "name, brand, model, color, description, codes, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+    # تعبئة الفهرس من المنتجات الموجودة حتى لا يعيد البحث نتائج فارغة بعد الترقية
+    from product_search import rebuild_search_index
+    rebuild_search_index(op.get_bind())
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS product_search")
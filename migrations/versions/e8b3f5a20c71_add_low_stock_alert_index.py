@@ -0,0 +1,31 @@
+"""Add unique index for open low-stock alerts
+
+Revision ID: e8b3f5a20c71
+Revises: d2a7c91f4b6e
+Create Date: 2026-10-17 16:05:12.640387
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b3f5a20c71'
+down_revision = 'd2a7c91f4b6e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # إزالة التنبيهات المكررة قبل إنشاء الفهرس الفريد (يبقى الأقدم لكل مستخدم ومنتج)
+    op.execute(
+        "DELETE FROM notifications WHERE type = 'low_stock' AND id NOT IN ("
+        "SELECT MIN(id) FROM notifications WHERE type = 'low_stock' GROUP BY user_id, product_id)"
+    )
+    op.create_index('uq_notifications_low_stock_user_product', 'notifications', ['user_id', 'product_id'],
+                    unique=True, if_not_exists=True,
+                    sqlite_where=sa.text("type = 'low_stock'"), postgresql_where=sa.text("type = 'low_stock'"))
+
+
+def downgrade():
+    op.drop_index('uq_notifications_low_stock_user_product', table_name='notifications', if_exists=True)
@@ -0,0 +1,25 @@
+"""Add notification keyset pagination index
+
+Revision ID: f3c6a8d91b24
+Revises: e8b3f5a20c71
+Create Date: 2026-10-17 17:20:41.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c6a8d91b24'
+down_revision = 'e8b3f5a20c71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_notifications_user_id_timestamp_id', 'notifications', ['user_id', 'timestamp', 'id'],
+                    unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_notifications_user_id_timestamp_id', table_name='notifications', if_exists=True)
@@ -4,10 +4,142 @@
 """
 
 from datetime import datetime
-import sqlite3
-import os
-from database import db, Product, StoreSettings
-from flask import current_app
+import threading
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from config import Config
+from database import db, with_profile, Product, StoreSettings, Notification, User
+import live_events
+
+LOW_STOCK_INDEX = 'uq_notifications_low_stock_user_product'
+
+# عدد الصفوف في كل استعلام إدراج مجمع (حد معاملات SQLite)
+NOTIFICATION_INSERT_BATCH = 500
+
+def is_low_stock(quantity, min_quantity):
+    """هل الكمية عند الحد الأدنى أو أقل"""
+    return (quantity or 0) <= (min_quantity or 0)
+
+def _low_stock_alert(product_id, name, quantity, min_quantity):
+    """نص تنبيه المخزون المنخفض"""
+    return {
+        'product_id': product_id,
+        'title': f'منتج منخفض المخزون: {name}',
+        'message': f'الكمية المتوفرة: {quantity} الحد الأدنى: {min_quantity}'
+    }
+
+def _low_stock_index_ready(connection):
+    """التحقق من وجود الفهرس الفريد للتنبيهات المفتوحة (تُحفظ النتيجة في الاتصال)"""
+    ready = connection.info.get('low_stock_index_ready')
+    if ready is None:
+        ready = any(index['name'] == LOW_STOCK_INDEX
+                    for index in inspect(connection).get_indexes(Notification.__tablename__))
+        connection.info['low_stock_index_ready'] = ready
+    return ready
+
+def sync_low_stock_alerts(connection, low_products, restocked_ids):
+    """
+    فتح أو تحديث تنبيه واحد لكل منتج منخفض المخزون لكل مستخدم نشط، وحذف تنبيهات
+    المنتجات التي أعيد تزويدها
+
+    :param connection: اتصال المعاملة الحالية
+    :param low_products: قائمة نصوص التنبيهات (انظر _low_stock_alert)
+    :param restocked_ids: معرفات المنتجات التي تجاوزت الحد الأدنى
+    """
+    table = Notification.__table__
+    if restocked_ids:
+        connection.execute(table.delete().where(
+            table.c.type == 'low_stock', table.c.product_id.in_(restocked_ids)
+        ))
+    if not low_products:
+        return
+
+    user_ids = connection.execute(
+        db.select(User.__table__.c.id).where(User.__table__.c.is_active.is_not(False))
+    ).scalars().all()
+    if not user_ids:
+        return
+
+    now = datetime.utcnow()
+    rows = [
+        {**alert, 'user_id': user_id, 'type': 'low_stock', 'read': False, 'timestamp': now}
+        for alert in low_products for user_id in user_ids
+    ]
+
+    if connection.dialect.name in ('sqlite', 'postgresql') and _low_stock_index_ready(connection):
+        if connection.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        # التنبيه المفتوح يبقى كما هو (وقته وحالة قراءته) ويُحدث نص الكمية فقط
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'product_id'],
+            index_where=db.text("type = 'low_stock'"),
+            set_={'title': stmt.excluded.title, 'message': stmt.excluded.message}
+        )
+        connection.execute(stmt, rows)
+        return
+
+    # قاعدة بيانات لم تُرحّل بعد: البحث عن التنبيهات المفتوحة ثم الإضافة
+    product_ids = [alert['product_id'] for alert in low_products]
+    existing = set(connection.execute(
+        db.select(table.c.user_id, table.c.product_id)
+        .where(table.c.type == 'low_stock', table.c.product_id.in_(product_ids))
+    ).tuples())
+    new_rows = [row for row in rows if (row['user_id'], row['product_id']) not in existing]
+    if new_rows:
+        connection.execute(table.insert(), new_rows)
+
+@event.listens_for(Session, 'after_flush')
+def _track_stock_levels(session, flush_context):
+    """
+    اكتشاف المخزون المنخفض من تغيرات الكمية (مبيعات، مرتجعات، مشتريات، تعديل يدوي)
+    في نفس المعاملة، فتكلفة الفحص تتناسب مع عدد المنتجات المتغيرة فقط
+    """
+    low_products = []
+    restocked_ids = []
+    # المنتجات التي عبرت الحد الأدنى في هذه المعاملة (لبث الحدث مرة واحدة)
+    crossed_low = []
+    crossed_restocked = []
+
+    for obj in session.new:
+        if isinstance(obj, Product) and is_low_stock(obj.quantity, obj.min_quantity):
+            low_products.append(_low_stock_alert(obj.id, obj.name, obj.quantity, obj.min_quantity))
+            crossed_low.append(low_products[-1])
+
+    for obj in session.dirty:
+        if not isinstance(obj, Product):
+            continue
+        state = inspect(obj)
+        quantity = state.attrs.quantity.history
+        min_quantity = state.attrs.min_quantity.history
+        if not quantity.has_changes() and not min_quantity.has_changes():
+            continue
+        old_quantity = quantity.deleted[0] if quantity.deleted else obj.quantity
+        old_min_quantity = min_quantity.deleted[0] if min_quantity.deleted else obj.min_quantity
+        was_low = is_low_stock(old_quantity, old_min_quantity)
+        if is_low_stock(obj.quantity, obj.min_quantity):
+            low_products.append(_low_stock_alert(obj.id, obj.name, obj.quantity, obj.min_quantity))
+            if not was_low:
+                crossed_low.append(low_products[-1])
+        elif was_low:
+            restocked_ids.append(obj.id)
+            crossed_restocked.append(obj.id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            restocked_ids.append(obj.id)
+            if is_low_stock(obj.quantity, obj.min_quantity):
+                crossed_restocked.append(obj.id)
+
+    if low_products or restocked_ids:
+        sync_low_stock_alerts(session.connection(), low_products, restocked_ids)
+
+    for alert in crossed_low:
+        live_events.queue_event(session, 'low_stock', alert, {'low_stock_count': 1})
+    for product_id in crossed_restocked:
+        live_events.queue_event(session, 'restocked', {'product_id': product_id}, {'low_stock_count': -1})
 
 class NotificationManager:
     """مدير الإشعارات في النظام"""
@@ -16,29 +148,44 @@ class NotificationManager:
         self.notifications = []
 
     def check_low_stock(self):
-        """فحص المنتجات منخفضة المخزون وإضافة إشعارات"""
+        """
+        مطابقة كاملة لتنبيهات المخزون المنخفض مع الكميات الحالية
+
+        الاكتشاف العادي يتم تلقائيًا عند تغير الكميات (انظر _track_stock_levels)؛
+        هذه الدالة للتعبئة الأولية أو بعد تعديل الكميات خارج النماذج.
+
+        :return: قائمة المنتجات منخفضة المخزون
+        """
         try:
             low_stock_products = Product.query.filter(
                 Product.quantity <= Product.min_quantity
             ).all()
+            low_ids = {product.id for product in low_stock_products}
 
-            notifications = []
-            for product in low_stock_products:
-                notification = {
-                    'id': len(self.notifications) + 1,
+            alerted_ids = set(db.session.execute(
+                db.select(Notification.product_id).where(Notification.type == 'low_stock').distinct()
+            ).scalars())
+
+            sync_low_stock_alerts(
+                db.session.connection(),
+                [_low_stock_alert(product.id, product.name, product.quantity, product.min_quantity)
+                 for product in low_stock_products],
+                list(alerted_ids - low_ids)
+            )
+            db.session.commit()
+
+            return [
+                {
                     'type': 'low_stock',
-                    'title': f'منتج منخفض المخزون: {product.name}',
-                    'message': f'الكمية المتوفرة: {product.quantity} الحد الأدنى: {product.min_quantity}',
-                    'product_id': product.id,
+                    **_low_stock_alert(product.id, product.name, product.quantity, product.min_quantity),
                     'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                     'read': False
                 }
-                notifications.append(notification)
-
-            self.notifications.extend(notifications)
-            return notifications
+                for product in low_stock_products
+            ]
         except Exception as e:
             print(f"خطأ في فحص المخزون المنخفض: {e}")
+            db.session.rollback()
             return []
 
     def get_notifications(self, unread_only=False):
@@ -60,93 +207,222 @@ class NotificationManager:
         self.notifications = []
 
     def save_to_database(self, user_id):
-        """حفظ الإشعارات في قاعدة البيانات للمستخدم"""
-        try:
-            # التحقق من وجود جدول الإشعارات
-            if not hasattr(db.Model, '_get_table_name'):
-                return False
-
-            notifications_table_name = 'notifications'
-
-            # التحقق من وجود الجدول
-            inspector = db.inspect(db.engine)
-            if notifications_table_name not in inspector.get_table_names():
-                # إنشاء الجدول إذا لم يكن موجودًا
-                sql = """
-                CREATE TABLE notifications (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    type TEXT,
-                    title TEXT,
-                    message TEXT,
-                    product_id INTEGER,
-                    timestamp DATETIME,
-                    read BOOLEAN DEFAULT FALSE,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-                """
-                db.session.execute(sql)
-                db.session.commit()
+        """
+        حفظ الإشعارات غير المقروءة من الذاكرة للمستخدم في استعلامات إدراج مجمعة
 
-            # حفظ الإشعارات غير المقروءة
-            for notification in self.notifications:
-                if not notification['read']:
-                    sql = """
-                    INSERT INTO notifications (user_id, type, title, message, product_id, timestamp)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                    """
-                    db.session.execute(sql, (
-                        user_id,
-                        notification['type'],
-                        notification['title'],
-                        notification['message'],
-                        notification['product_id'],
-                        notification['timestamp']
-                    ))
+        تُحفظ الإشعارات الجديدة فقط (دون id)؛ المحملة من قاعدة البيانات موجودة أصلاً.
+        تنبيهات المخزون المنخفض تمر عبر sync_low_stock_alerts (تنبيه مفتوح واحد لكل
+        منتج). الإشعارات المحفوظة تُزال من الذاكرة فلا تُحفظ مرة ثانية، ثم يُطبق حد
+        NOTIFICATIONS_MAX_COUNT على إشعارات المستخدم.
 
+        :param user_id: معرف المستخدم
+        :return: True عند النجاح
+        """
+        try:
+            new = [notification for notification in self.notifications
+                   if not notification['read'] and not notification.get('id')]
+            low_stock = [notification for notification in new
+                         if notification['type'] == 'low_stock' and notification.get('product_id')]
+            pending = [notification for notification in new if notification not in low_stock]
+            rows = [
+                {
+                    'user_id': user_id,
+                    'type': notification['type'],
+                    'title': notification['title'],
+                    'message': notification.get('message'),
+                    'product_id': notification.get('product_id'),
+                    'read': False,
+                    'timestamp': _parse_timestamp(notification.get('timestamp'))
+                }
+                for notification in pending
+            ]
+
+            for i in range(0, len(rows), NOTIFICATION_INSERT_BATCH):
+                db.session.execute(db.insert(Notification).values(rows[i:i + NOTIFICATION_INSERT_BATCH]))
+            if low_stock:
+                sync_low_stock_alerts(db.session.connection(), [
+                    {key: notification.get(key) for key in ('product_id', 'title', 'message')}
+                    for notification in low_stock
+                ], [])
+            self.apply_retention(user_id)
             db.session.commit()
+
+            self.notifications = [notification for notification in self.notifications
+                                  if not any(notification is saved for saved in new)]
             return True
         except Exception as e:
             print(f"خطأ في حفظ الإشعارات: {e}")
             db.session.rollback()
             return False
 
-    def load_from_database(self, user_id):
-        """تحميل الإشعارات من قاعدة البيانات"""
-        try:
-            notifications_table_name = 'notifications'
-
-            # التحقق من وجود الجدول
-            inspector = db.inspect(db.engine)
-            if notifications_table_name not in inspector.get_table_names():
-                return False
-
-            sql = """
-            SELECT id, type, title, message, product_id, timestamp, read
-            FROM notifications
-            WHERE user_id = ?
-            ORDER BY timestamp DESC
-            """
-            results = db.session.execute(sql, (user_id,)).fetchall()
-
-            notifications = []
-            for row in results:
-                notification = {
-                    'id': row[0],
-                    'type': row[1],
-                    'title': row[2],
-                    'message': row[3],
-                    'product_id': row[4],
-                    'timestamp': row[5],
-                    'read': bool(row[6])
-                }
-                notifications.append(notification)
+    def load_page(self, user_id, limit=None, cursor=None, unread_only=False):
+        """
+        صفحة من إشعارات المستخدم (الأحدث أولاً) بترقيم المؤشر دون OFFSET
+
+        :param user_id: معرف المستخدم
+        :param limit: عدد الإشعارات في الصفحة
+        :param cursor: مؤشر الصفحة التالية من استدعاء سابق
+        :param unread_only: غير المقروءة فقط
+        :return: (قائمة الإشعارات، مؤشر الصفحة التالية أو None)
+        """
+        limit = limit or Config.ITEMS_PER_PAGE
+        query = with_profile(Notification.query, 'notification_list').filter(Notification.user_id == user_id)
+        if unread_only:
+            query = query.filter(Notification.read == False)  # noqa: E712
+        if cursor:
+            timestamp, notification_id = _parse_cursor(cursor)
+            query = query.filter(db.tuple_(Notification.timestamp, Notification.id) < (timestamp, notification_id))
 
-            self.notifications = notifications
+        items = query.order_by(Notification.timestamp.desc(), Notification.id.desc()).limit(limit + 1).all()
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = f"{items[-1].timestamp.isoformat()},{items[-1].id}"
+        return [item.to_dict() for item in items], next_cursor
+
+    def load_from_database(self, user_id, limit=None):
+        """
+        تحميل أحدث إشعارات المستخدم إلى الذاكرة
+
+        :param limit: عدد الإشعارات (الافتراضي NOTIFICATIONS_MAX_COUNT)
+        :return: True عند النجاح
+        """
+        try:
+            self.notifications, _ = self.load_page(user_id, limit or Config.NOTIFICATIONS_MAX_COUNT)
             return True
         except Exception as e:
             print(f"خطأ في تحميل الإشعارات: {e}")
             return False
 
+    def unread_count(self, user_id):
+        """عدد الإشعارات غير المقروءة (من الفهرس دون قراءة الجدول)"""
+        return db.session.execute(
+            db.select(db.func.count()).select_from(Notification)
+            .where(Notification.user_id == user_id, Notification.read == False)  # noqa: E712
+        ).scalar()
+
+    def apply_retention(self, user_id=None, max_count=None):
+        """
+        حذف الإشعارات الأقدم من أحدث NOTIFICATIONS_MAX_COUNT لكل مستخدم
+
+        تنبيهات المخزون المنخفض المفتوحة لا تُحذف لأنها تمثل الحالة الحالية.
+        لا تُنفذ commit (يستدعيها المتصل داخل معاملته).
+
+        :param user_id: مستخدم واحد أو None لجميع المستخدمين
+        :param max_count: عدد الإشعارات المحفوظة لكل مستخدم
+        :return: عدد الإشعارات المحذوفة
+        """
+        max_count = max_count or Config.NOTIFICATIONS_MAX_COUNT
+        ranked = db.select(
+            Notification.id,
+            db.func.row_number().over(
+                partition_by=Notification.user_id,
+                order_by=(Notification.timestamp.desc(), Notification.id.desc())
+            ).label('position')
+        ).where(Notification.type != 'low_stock')
+        if user_id is not None:
+            ranked = ranked.where(Notification.user_id == user_id)
+        ranked = ranked.subquery()
+
+        result = db.session.execute(
+            db.delete(Notification)
+            .where(Notification.id.in_(db.select(ranked.c.id).where(ranked.c.position > max_count)))
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+def _parse_timestamp(value):
+    """تحويل وقت الإشعار في الذاكرة (نص أو datetime) إلى datetime"""
+    if isinstance(value, datetime):
+        return value
+    if value:
+        try:
+            return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            pass
+    return datetime.utcnow()
+
+def _parse_cursor(cursor):
+    """
+    قراءة مؤشر الصفحة
+
+    :return: (الوقت، المعرف)
+    :raises ValueError: إذا كان المؤشر غير صالح
+    """
+    timestamp, _, notification_id = cursor.rpartition(',')
+    return datetime.fromisoformat(timestamp), int(notification_id)
+
+class NotificationRetention:
+    """تطبيق حد عدد الإشعارات دوريًا في الخلفية"""
+
+    def __init__(self, interval=None):
+        """
+        :param interval: الفاصل بين الدورات بالثواني
+        """
+        self.interval = interval if interval is not None else Config.NOTIFICATIONS_CHECK_INTERVAL
+        self.deleted = 0
+        self._app = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        """
+        دورة واحدة لجميع المستخدمين
+
+        :return: عدد الإشعارات المحذوفة
+        """
+        with self._app.app_context():
+            try:
+                deleted = notification_manager.apply_retention()
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        self.deleted += deleted
+        return deleted
+
+    def _run(self):
+        """حلقة التنظيف في الخيط الخلفي"""
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"خطأ في تنظيف الإشعارات: {e}")
+
+    def start(self, app):
+        """تشغيل التنظيف في خيط خلفي (مرة واحدة لكل عملية)"""
+        if self._thread is not None and self._thread.is_alive():
+            return False
+        self._app = app
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='notification-retention', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """إيقاف الخيط الخلفي"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
 # إنشاء مثيل مدير الإشعارات
 notification_manager = NotificationManager()
+notification_retention = NotificationRetention()
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='صيانة الإشعارات')
+    parser.add_argument('--retention', action='store_true', help='حذف الإشعارات الزائدة عن الحد لكل مستخدم')
+    parser.add_argument('--low-stock', action='store_true', help='مطابقة تنبيهات المخزون المنخفض مع الكميات')
+    args = parser.parse_args()
+
+    from app import app
+
+    if args.retention:
+        notification_retention._app = app
+        print(f"✅ تم حذف {notification_retention.run_once()} إشعار")
+    if args.low_stock:
+        with app.app_context():
+            print(f"✅ {len(notification_manager.check_low_stock())} منتج منخفض المخزون")
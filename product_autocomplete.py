@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+إكمال تلقائي متسامح مع الأخطاء الإملائية لأسماء المنتجات وموديلاتها
+
+فهرس ثلاثيات أحرف (trigrams) في الذاكرة على مستوى الكلمات: كل كلمة مميزة في
+الاسم والماركة والموديل واللون تُفهرس بثلاثياتها، ولكل كلمة قائمة المنتجات التي
+تحتويها. البحث يقارن كلمات الطلب بالمفردات (أقل بكثير من عدد المنتجات) ثم يجمع
+درجات المنتجات، فيبقى زمن البحث بضعة مللي ثوانٍ حتى مع عشرات آلاف المنتجات.
+
+يُحدث الفهرس تدريجيًا: عند تغير وسم 'product_names' (انظر cache_tags_for) تُقرأ
+المنتجات المعدلة منذ آخر مزامنة فقط، وتُحذف المنتجات التي لم تعد موجودة.
+
+قياس الأداء: python product_autocomplete.py --benchmark 50000
+"""
+
+import argparse
+import heapq
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+# إضافة المجلد الحالي إلى المسار
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from database import db, Product, AUTOCOMPLETE_INDEX_FIELDS
+from product_search import search_tokens, text_tokens
+
+# وسم الإبطال المشترك بين العمليات
+AUTOCOMPLETE_INDEX_TAG = 'product_names'
+
+# وزن كل حقل في ترتيب النتائج
+FIELD_WEIGHTS = {'name': 1.0, 'model': 0.9, 'brand': 0.7, 'color': 0.4}
+
+# الحد الأقصى لعدد الكلمات المرشحة لكل كلمة في الطلب
+MAX_WORD_CANDIDATES = 30
+
+def trigrams(word):
+    """ثلاثيات الأحرف لكلمة مع الحشو (مثل pg_trgm)"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class ProductAutocomplete:
+    """فهرس الإكمال التلقائي للمنتجات في العملية الحالية"""
+
+    def __init__(self, registry=None, min_similarity=None):
+        """
+        :param registry: سجل الوسوم (الافتراضي سجل cache_manager)
+        :param min_similarity: الحد الأدنى لتشابه الكلمة (0-1)
+        """
+        self._registry = registry
+        self.min_similarity = min_similarity if min_similarity is not None else Config.AUTOCOMPLETE_MIN_SIMILARITY
+        self._products = {}        # المعرف ← بيانات المنتج المعروضة
+        self._product_words = {}   # المعرف ← {الكلمة: الوزن}
+        self._postings = {}        # الكلمة ← {المعرف: الوزن}
+        self._word_trigrams = {}   # الثلاثية ← مجموعة الكلمات
+        self._word_sizes = {}      # الكلمة ← عدد ثلاثياتها
+        self._version = None
+        self._synced_at = None
+        self._lock = threading.RLock()
+        self.rebuilds = 0
+        self.refreshes = 0
+
+    @property
+    def registry(self):
+        if self._registry is None:
+            # دون حفظ: cache_manager.configure قد يغير المجلد بعد الإنشاء
+            from cache import cache_manager
+            return cache_manager.tags
+        return self._registry
+
+    def _current_version(self):
+        """إصدار الوسم الحالي (None إذا تعذرت القراءة فيُعاد البناء)"""
+        try:
+            return self.registry.snapshot([AUTOCOMPLETE_INDEX_TAG])[AUTOCOMPLETE_INDEX_TAG]
+        except OSError as e:
+            print(f"خطأ في قراءة إصدار فهرس الإكمال التلقائي: {e}")
+            return None
+
+    def _add_word(self, word):
+        grams = trigrams(word)
+        self._word_sizes[word] = len(grams)
+        for gram in grams:
+            self._word_trigrams.setdefault(gram, set()).add(word)
+
+    def _remove_word(self, word):
+        for gram in trigrams(word):
+            words = self._word_trigrams.get(gram)
+            if words is not None:
+                words.discard(word)
+                if not words:
+                    del self._word_trigrams[gram]
+        del self._word_sizes[word]
+
+    def remove(self, product_id):
+        """حذف منتج من الفهرس"""
+        with self._lock:
+            self._products.pop(product_id, None)
+            for word in self._product_words.pop(product_id, {}):
+                products = self._postings[word]
+                del products[product_id]
+                if not products:
+                    del self._postings[word]
+                    self._remove_word(word)
+
+    def add(self, product):
+        """
+        إضافة منتج أو استبداله
+
+        :param product: قاموس يحتوي على id وحقول AUTOCOMPLETE_INDEX_FIELDS
+        """
+        words = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for word in text_tokens(product.get(field)):
+                words[word] = max(words.get(word, 0), weight)
+
+        with self._lock:
+            self.remove(product['id'])
+            self._products[product['id']] = {field: product.get(field) for field in ('id',) + AUTOCOMPLETE_INDEX_FIELDS}
+            self._product_words[product['id']] = words
+            for word, weight in words.items():
+                products = self._postings.get(word)
+                if products is None:
+                    products = self._postings[word] = {}
+                    self._add_word(word)
+                products[product['id']] = weight
+
+    def _columns(self):
+        return [Product.id] + [getattr(Product, field) for field in AUTOCOMPLETE_INDEX_FIELDS]
+
+    def load(self):
+        """
+        بناء الفهرس كاملاً من قاعدة البيانات (يتطلب سياق التطبيق)
+
+        :return: عدد المنتجات المفهرسة
+        """
+        # قراءة الإصدار قبل الاستعلام: أي تغيير أثناء البناء يفرض مزامنة لاحقة
+        version = self._current_version()
+        synced_at = datetime.utcnow()
+        rows = db.session.execute(db.select(*self._columns())).all()
+
+        with self._lock:
+            self._products, self._product_words, self._postings = {}, {}, {}
+            self._word_trigrams, self._word_sizes = {}, {}
+            for row in rows:
+                self.add(dict(row._mapping))
+            self._version = version
+            self._synced_at = synced_at
+            self.rebuilds += 1
+        return len(rows)
+
+    def refresh(self):
+        """
+        مزامنة تدريجية: المنتجات المعدلة منذ آخر مزامنة (مع هامش للمعاملات المتأخرة)
+        وحذف المنتجات غير الموجودة
+
+        :return: عدد المنتجات المحدثة
+        """
+        version = self._current_version()
+        synced_at = datetime.utcnow()
+        since = self._synced_at - timedelta(seconds=Config.AUTOCOMPLETE_SYNC_OVERLAP)
+        rows = db.session.execute(
+            db.select(*self._columns()).where(Product.updated_at >= since)
+        ).all()
+        existing = set(db.session.execute(db.select(Product.id)).scalars())
+
+        with self._lock:
+            for row in rows:
+                self.add(dict(row._mapping))
+            for product_id in set(self._products) - existing:
+                self.remove(product_id)
+            self._version = version
+            self._synced_at = synced_at
+            self.refreshes += 1
+        return len(rows)
+
+    def ensure_fresh(self):
+        """مزامنة الفهرس إذا تغيرت المنتجات في أي عملية"""
+        version = self._current_version()
+        if version is not None and version == self._version:
+            return
+        if self._synced_at is None or version is None:
+            self.load()
+        else:
+            self.refresh()
+
+    def _match_words(self, token, prefix):
+        """
+        الكلمات المشابهة لكلمة من الطلب
+
+        :param prefix: الكلمة الأخيرة قيد الكتابة (تطابق بدايات الكلمات)
+        :return: قائمة (الكلمة، التشابه)
+        """
+        grams = trigrams(token)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._word_trigrams.get(gram, ()))
+
+        matches = []
+        for word, count in shared.items():
+            similarity = count / (len(grams) + self._word_sizes[word] - count)
+            if prefix and word.startswith(token):
+                similarity = max(similarity, 0.5 + 0.5 * len(token) / len(word))
+            if similarity >= self.min_similarity:
+                matches.append((word, similarity))
+        return heapq.nlargest(MAX_WORD_CANDIDATES, matches, key=lambda match: match[1])
+
+    def search(self, query, limit=10):
+        """
+        أفضل المنتجات المطابقة تقريبيًا
+
+        :param query: النص المكتوب (مثل "galxy s24")
+        :param limit: عدد النتائج
+        :return: قائمة قواميس المنتجات مع درجة التشابه score
+        """
+        tokens = search_tokens(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            scores = {}
+            for index, token in enumerate(tokens):
+                best = {}
+                for word, similarity in self._match_words(token, prefix=index == len(tokens) - 1):
+                    for product_id, weight in self._postings[word].items():
+                        score = similarity * weight
+                        if score > best.get(product_id, 0):
+                            best[product_id] = score
+                for product_id, score in best.items():
+                    scores[product_id] = scores.get(product_id, 0) + score
+
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [
+                {**self._products[product_id], 'score': round(score / len(tokens), 3)}
+                for product_id, score in top
+            ]
+
+    def complete(self, query, limit=10):
+        """البحث بعد مزامنة الفهرس (يتطلب سياق التطبيق)"""
+        self.ensure_fresh()
+        return self.search(query, limit)
+
+    def stats(self):
+        """إحصائيات الفهرس في هذه العملية"""
+        return {
+            'products': len(self._products),
+            'words': len(self._postings),
+            'trigrams': len(self._word_trigrams),
+            'rebuilds': self.rebuilds,
+            'refreshes': self.refreshes
+        }
+
+def benchmark(count, queries=200):
+    """
+    قياس زمن البحث في فهرس منتجات تجريبية
+
+    :return: (زمن البناء بالثواني، متوسط زمن البحث بالمللي ثانية، أقصى زمن)
+    """
+    brands = ['Samsung', 'Apple', 'Xiaomi', 'Oppo', 'Huawei', 'Realme', 'Nokia', 'Infinix']
+    names = ['Galaxy', 'iPhone', 'Redmi', 'Reno', 'Nova', 'Note', 'Hot', 'ايفون', 'سامسونج', 'شاحن', 'غطاء']
+    colors = ['أسود', 'أبيض', 'أزرق', 'ذهبي', 'Black', 'Blue']
+    rng = random.Random(1)
+
+    index = ProductAutocomplete(min_similarity=Config.AUTOCOMPLETE_MIN_SIMILARITY)
+    start = time.perf_counter()
+    for product_id in range(1, count + 1):
+        model = f"{rng.choice('ASMXN')}{rng.randint(1, 99)}"
+        index.add({'id': product_id, 'name': f"{rng.choice(names)} {model} {rng.choice([64, 128, 256])}GB",
+                   'brand': rng.choice(brands), 'model': model, 'color': rng.choice(colors), 'price_sell': 0})
+    build_time = time.perf_counter() - start
+
+    samples = ['galxy s24', 'ايفون 13', 'iphon', 'redmi note', 'شاحن', 'samsng a5', 'نوفا', 'reno 8 blu']
+    timings = []
+    for i in range(queries):
+        start = time.perf_counter()
+        index.search(samples[i % len(samples)], 10)
+        timings.append((time.perf_counter() - start) * 1000)
+    return build_time, sum(timings) / len(timings), max(timings)
+
+def main():
+    """الدالة الرئيسية"""
+    parser = argparse.ArgumentParser(description='فهرس الإكمال التلقائي للمنتجات')
+    parser.add_argument('--benchmark', type=int, metavar='COUNT', help='قياس الأداء على عدد من المنتجات التجريبية')
+    parser.add_argument('query', nargs='?', help='نص للبحث في منتجات قاعدة البيانات')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        build_time, mean_ms, max_ms = benchmark(args.benchmark)
+        print(f"⏱️  {args.benchmark} منتج: البناء {build_time:.2f}s، البحث متوسط {mean_ms:.2f}ms، أقصى {max_ms:.2f}ms")
+
+    if args.query:
+        from app import app
+
+        with app.app_context():
+            for match in product_autocomplete.complete(args.query):
+                print(f"   {match['score']:.2f}  {match['id']}: {match['name']} - {match['brand']} {match['model']}")
+    return True
+
+# فهرس العملية الحالية
+product_autocomplete = ProductAutocomplete()
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
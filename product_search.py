@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+البحث النصي في المنتجات (FTS5 في SQLite وtsvector في PostgreSQL)
+
+يُحفظ لكل منتج مستند بحث منفصل بعد توحيد النص العربي (إزالة التشكيل والتطويل وتوحيد
+أشكال الألف والياء والتاء المربوطة). يُحدث المستند في نفس معاملة تعديل المنتج
+(حدث after_flush كما في الملخصات اليومية) لأن التوحيد يتم في بايثون، ويُنشأ الجدول
+مع db.create_all أو بالترحيل. النتائج مرتبة حسب الصلة مع مطابقة بدايات الكلمات.
+
+إعادة بناء الفهرس: python product_search.py --rebuild
+"""
+
+import argparse
+import os
+import re
+import sys
+
+from sqlalchemy import event, inspect, or_, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+# إضافة المجلد الحالي إلى المسار
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from database import db, Product
+
+SEARCH_TABLE = 'product_search'
+
+# حقول المنتج التي يُبنى منها مستند البحث
+PRODUCT_SEARCH_COLUMNS = ('name', 'brand', 'model', 'color', 'description', 'barcode', 'imei')
+
+# أوزان أعمدة FTS5 بترتيب الأعمدة (الاسم أهم من الوصف)
+FTS5_WEIGHTS = (10.0, 4.0, 4.0, 1.0, 1.0, 2.0)
+
+# الحد الأقصى لعدد كلمات البحث
+MAX_QUERY_TOKENS = 8
+
+_ARABIC_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')  # التشكيل والتطويل
+_ARABIC_LETTERS = str.maketrans({
+    'آ': 'ا',  # آ ← ا
+    'أ': 'ا',  # أ ← ا
+    'إ': 'ا',  # إ ← ا
+    'ٱ': 'ا',  # ٱ ← ا
+    'ى': 'ي',  # ى ← ي
+    'ة': 'ه',  # ة ← ه
+    'ؤ': 'و',  # ؤ ← و
+    'ئ': 'ي',  # ئ ← ي
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},  # الأرقام العربية الهندية
+    **{chr(0x06f0 + digit): str(digit) for digit in range(10)},  # الأرقام الفارسية
+})
+_TOKEN = re.compile(r'\w+')
+
+def normalize_arabic(value):
+    """
+    توحيد النص للبحث: إزالة التشكيل والتطويل، توحيد الألف والياء والتاء المربوطة
+    والأرقام، وتحويل الأحرف اللاتينية إلى صغيرة
+
+    :param value: النص الأصلي (أو None)
+    :return: النص الموحد
+    """
+    if not value:
+        return ''
+    return _ARABIC_DIACRITICS.sub('', str(value)).translate(_ARABIC_LETTERS).lower()
+
+def text_tokens(value):
+    """كلمات النص بعد التوحيد"""
+    return _TOKEN.findall(normalize_arabic(value))
+
+def search_tokens(query):
+    """كلمات البحث بعد التوحيد"""
+    return text_tokens(query)[:MAX_QUERY_TOKENS]
+
+def _document(values):
+    """
+    حقول مستند البحث الموحدة
+
+    :param values: قاموس قيم حقول المنتج
+    """
+    return {
+        'name': normalize_arabic(values.get('name')),
+        'brand': normalize_arabic(values.get('brand')),
+        'model': normalize_arabic(values.get('model')),
+        'color': normalize_arabic(values.get('color')),
+        'description': normalize_arabic(values.get('description')),
+        'codes': ' '.join(filter(None, (values.get('barcode'), values.get('imei')))),
+    }
+
+def _supported(connection):
+    """هل تدعم قاعدة البيانات فهرس البحث"""
+    return connection.dialect.name in ('sqlite', 'postgresql')
+
+def search_index_exists(connection):
+    """التحقق من وجود جدول البحث (تُحفظ النتيجة في الاتصال)"""
+    ready = connection.info.get('product_search_ready')
+    if ready is None:
+        ready = _supported(connection) and inspect(connection).has_table(SEARCH_TABLE)
+        connection.info['product_search_ready'] = ready
+    return ready
+
+def _delete_documents(connection, ids):
+    """حذف مستندات البحث لمجموعة منتجات"""
+    if connection.dialect.name == 'sqlite':
+        statement = text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :id")
+    else:
+        statement = text(f"DELETE FROM {SEARCH_TABLE} WHERE product_id = :id")
+    connection.execute(statement, [{'id': product_id} for product_id in ids])
+
+def _index_documents(connection, products, replace=True):
+    """
+    إضافة أو استبدال مستندات البحث
+
+    :param products: قائمة قواميس تحتوي على id وحقول PRODUCT_SEARCH_COLUMNS
+    :param replace: حذف المستندات السابقة لنفس المنتجات أولاً
+    """
+    if not products:
+        return
+    if replace:
+        _delete_documents(connection, [product['id'] for product in products])
+
+    if connection.dialect.name == 'sqlite':
+        statement = text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, name, brand, model, color, description, codes) "
+            "VALUES (:id, :name, :brand, :model, :color, :description, :codes)"
+        )
+        parameters = [{'id': product['id'], **_document(product)} for product in products]
+    else:
+        # الوزن A للاسم، B للماركة والموديل والرموز، D للون والوصف
+        statement = text(
+            f"INSERT INTO {SEARCH_TABLE} (product_id, document) VALUES (:id, "
+            "setweight(to_tsvector('simple', :weight_a), 'A') || "
+            "setweight(to_tsvector('simple', :weight_b), 'B') || "
+            "setweight(to_tsvector('simple', :weight_d), 'D'))"
+        )
+        parameters = []
+        for product in products:
+            document = _document(product)
+            parameters.append({
+                'id': product['id'],
+                'weight_a': document['name'],
+                'weight_b': f"{document['brand']} {document['model']} {document['codes']}",
+                'weight_d': f"{document['color']} {document['description']}"
+            })
+    connection.execute(statement, parameters)
+
+def create_search_index(connection):
+    """
+    إنشاء جدول البحث إذا لم يكن موجودًا ثم تعبئته من المنتجات الحالية
+
+    :return: True إذا تم إنشاء الجدول
+    """
+    if not _supported(connection) or inspect(connection).has_table(SEARCH_TABLE):
+        return False
+
+    if connection.dialect.name == 'sqlite':
+        try:
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+                "name, brand, model, color, description, codes, "
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            ))
+        except OperationalError as e:
+            # نسخة SQLite دون FTS5: يُستخدم البحث بـ LIKE
+            print(f"خطأ في إنشاء فهرس البحث: {e}")
+            return False
+    else:
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+            "product_id INTEGER PRIMARY KEY REFERENCES products (id) ON DELETE CASCADE, "
+            "document TSVECTOR NOT NULL)"
+        ))
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)"
+        ))
+    connection.info['product_search_ready'] = True
+    rebuild_search_index(connection)
+    return True
+
+def rebuild_search_index(connection, batch_size=1000):
+    """
+    إعادة بناء جميع مستندات البحث من جدول المنتجات
+
+    :return: عدد المنتجات المفهرسة
+    """
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    columns = [Product.__table__.c.id] + [Product.__table__.c[name] for name in PRODUCT_SEARCH_COLUMNS]
+    result = connection.execute(db.select(*columns).order_by(Product.__table__.c.id))
+
+    count = 0
+    while True:
+        rows = result.fetchmany(batch_size)
+        if not rows:
+            break
+        _index_documents(connection, [dict(row._mapping) for row in rows], replace=False)
+        count += len(rows)
+    return count
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_index(target, connection, **kw):
+    """إنشاء جدول البحث مع db.create_all"""
+    create_search_index(connection)
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    """حذف جدول البحث مع db.drop_all"""
+    if _supported(connection):
+        connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+        connection.info.pop('product_search_ready', None)
+
+@event.listens_for(Session, 'after_flush')
+def _update_search_index(session, flush_context):
+    """تحديث مستندات البحث في نفس معاملة تعديل المنتجات"""
+    changed = []
+    deleted = []
+    for obj in session.new:
+        if isinstance(obj, Product):
+            changed.append(obj)
+    for obj in session.dirty:
+        if isinstance(obj, Product):
+            state = inspect(obj)
+            if any(state.attrs[name].history.has_changes() for name in PRODUCT_SEARCH_COLUMNS):
+                changed.append(obj)
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            deleted.append(obj.id)
+
+    if not changed and not deleted:
+        return
+
+    connection = session.connection()
+    if not search_index_exists(connection):
+        return
+    if deleted:
+        _delete_documents(connection, deleted)
+    _index_documents(connection, [
+        {'id': obj.id, **{name: getattr(obj, name) for name in PRODUCT_SEARCH_COLUMNS}}
+        for obj in changed
+    ])
+
+def search_product_ids(query, limit=None):
+    """
+    معرفات المنتجات المطابقة مرتبة حسب الصلة
+
+    :param query: نص البحث (كل كلمة تطابق بدايات الكلمات)
+    :param limit: الحد الأقصى للنتائج
+    :return: قائمة المعرفات، أو None إذا لم يكن الفهرس متاحًا
+    """
+    tokens = search_tokens(query)
+    if not tokens:
+        return []
+
+    limit = limit or Config.SEARCH_MAX_RESULTS
+    connection = db.session.connection()
+    if not search_index_exists(connection):
+        return None
+
+    if connection.dialect.name == 'sqlite':
+        weights = ', '.join(str(weight) for weight in FTS5_WEIGHTS)
+        statement = text(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :query "
+            f"ORDER BY bm25({SEARCH_TABLE}, {weights}) LIMIT :limit"
+        )
+        match = ' '.join(f'"{token}"*' for token in tokens)
+    else:
+        statement = text(
+            f"SELECT product_id FROM {SEARCH_TABLE}, to_tsquery('simple', :query) AS query "
+            "WHERE document @@ query ORDER BY ts_rank_cd(document, query) DESC, product_id LIMIT :limit"
+        )
+        match = ' & '.join(f'{token}:*' for token in tokens)
+
+    return [row[0] for row in connection.execute(statement, {'query': match, 'limit': limit})]
+
+def _like_search(query, base_query, limit):
+    """البحث الاحتياطي بـ LIKE عندما لا يتوفر الفهرس"""
+    for token in query.split()[:MAX_QUERY_TOKENS]:
+        pattern = f"%{token}%"
+        base_query = base_query.filter(or_(
+            Product.name.ilike(pattern), Product.brand.ilike(pattern), Product.model.ilike(pattern),
+            Product.description.ilike(pattern), Product.barcode.ilike(pattern)
+        ))
+    return base_query.order_by(Product.name).limit(limit).all()
+
+def search_products(query, limit=None, base_query=None):
+    """
+    البحث في المنتجات مرتبة حسب الصلة
+
+    :param query: نص البحث
+    :param limit: الحد الأقصى للنتائج
+    :param base_query: استعلام Product لتطبيق مرشحات إضافية أو ملف تحميل مسبق
+    :return: قائمة المنتجات
+    """
+    limit = limit or Config.SEARCH_MAX_RESULTS
+    base_query = base_query if base_query is not None else Product.query
+
+    # مع المرشحات الإضافية قد يُستبعد بعض المطابق، فيُطلب الحد الأقصى من الفهرس
+    ids = search_product_ids(query, Config.SEARCH_MAX_RESULTS)
+    if ids is None:
+        return _like_search(query, base_query, limit)
+    if not ids:
+        return []
+
+    products = {product.id: product for product in base_query.filter(Product.id.in_(ids))}
+    return [products[product_id] for product_id in ids if product_id in products][:limit]
+
+def main():
+    """الدالة الرئيسية"""
+    parser = argparse.ArgumentParser(description='فهرس البحث في المنتجات')
+    parser.add_argument('--rebuild', action='store_true', help='إعادة بناء الفهرس من جدول المنتجات')
+    parser.add_argument('query', nargs='?', help='نص للبحث')
+    args = parser.parse_args()
+
+    try:
+        from app import app
+
+        with app.app_context():
+            if args.rebuild:
+                with db.engine.begin() as connection:
+                    if not create_search_index(connection):
+                        count = rebuild_search_index(connection)
+                    else:
+                        count = connection.execute(text(f"SELECT count(*) FROM {SEARCH_TABLE}")).scalar()
+                print(f"✅ تمت فهرسة {count} منتج")
+            if args.query:
+                for product in search_products(args.query, limit=20):
+                    print(f"   {product.id}: {product.name} - {product.brand} {product.model}")
+        return True
+
+    except Exception as e:
+        print(f"❌ خطأ في فهرس البحث: {e}")
+        return False
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
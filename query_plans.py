@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+أداة فحص خطط تنفيذ استعلامات التقارير الأساسية
+
+تشغل EXPLAIN QUERY PLAN (SQLite) أو EXPLAIN (PostgreSQL) على الاستعلامات الأكثر
+استخدامًا في لوحة التحكم والتقارير، وتنبه إلى أي استعلام يمر على جدول كامل
+بدلاً من استخدام فهرس.
+"""
+
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func
+
+
+def canonical_report_queries():
+    """
+    الاستعلامات الأساسية للتقارير والقوائم
+
+    :return: قائمة (اسم الاستعلام، الاستعلام)
+    """
+    from database import (Sale, SaleItem, PurchaseInvoice, PurchaseItem, Return,
+                          Notification, ActivityLog, AuditLog)
+
+    end_date = datetime.utcnow()
+    start_date = end_date - timedelta(days=30)
+
+    return [
+        ('sales_by_date_range',
+         select(Sale)
+         .where(Sale.created_at.between(start_date, end_date))
+         .order_by(Sale.created_at.desc())),
+        ('sales_totals_by_day',
+         select(func.date(Sale.created_at), func.count(Sale.id), func.sum(Sale.final_amount))
+         .where(Sale.created_at.between(start_date, end_date))
+         .group_by(func.date(Sale.created_at))),
+        ('top_products',
+         select(SaleItem.product_id, func.sum(SaleItem.quantity), func.sum(SaleItem.total_price))
+         .join(Sale, Sale.id == SaleItem.sale_id)
+         .where(Sale.created_at.between(start_date, end_date))
+         .group_by(SaleItem.product_id)),
+        ('sale_items_for_sales',
+         select(SaleItem).where(SaleItem.sale_id.in_([1, 2, 3]))),
+        ('product_sales_history',
+         select(SaleItem).where(SaleItem.product_id == 1)),
+        ('purchases_by_date_range',
+         select(PurchaseInvoice)
+         .where(PurchaseInvoice.created_at.between(start_date, end_date))
+         .order_by(PurchaseInvoice.created_at.desc())),
+        ('purchase_items_for_invoice',
+         select(PurchaseItem).where(PurchaseItem.purchase_invoice_id == 1)),
+        ('returns_for_sale',
+         select(Return).where(Return.sale_id == 1)),
+        ('unread_notifications',
+         select(Notification)
+         .where(Notification.user_id == 1, Notification.read == False)  # noqa: E712
+         .order_by(Notification.timestamp.desc())),
+        ('recent_activity_logs',
+         select(ActivityLog).order_by(ActivityLog.timestamp.desc()).limit(50)),
+        ('recent_audit_logs',
+         select(AuditLog).order_by(AuditLog.timestamp.desc()).limit(50)),
+    ]
+
+
+def _plain(value):
+    """تحويل القيم إلى أنواع يفهمها مشغل قاعدة البيانات مباشرة"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+    return value
+
+
+def explain(connection, statement):
+    """
+    الحصول على خطة تنفيذ استعلام
+
+    :param connection: اتصال SQLAlchemy
+    :param statement: الاستعلام
+    :return: قائمة أسطر الخطة
+    """
+    dialect = connection.dialect
+    compiled = statement.compile(dialect=dialect, compile_kwargs={'render_postcompile': True})
+    params = compiled.params
+
+    if dialect.name == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+
+    if compiled.positiontup is not None:
+        args = tuple(_plain(params[name]) for name in compiled.positiontup)
+    else:
+        args = {name: _plain(value) for name, value in params.items()}
+
+    rows = connection.exec_driver_sql(prefix + str(compiled), args).fetchall()
+    if dialect.name == 'sqlite':
+        # (id, parent, notused, detail)
+        return [row[-1] for row in rows]
+    return [row[0] for row in rows]
+
+
+def is_full_scan(plan_line):
+    """هل يمثل سطر الخطة مرورًا على جدول كامل دون فهرس؟"""
+    line = plan_line.strip()
+    if line.startswith('SCAN '):
+        # SQLite: "SCAN sales" بدون "USING INDEX"
+        return 'USING' not in line and 'CONSTANT ROW' not in line
+    return 'Seq Scan' in line
+
+
+def check_query_plans(connection):
+    """
+    فحص خطط جميع الاستعلامات الأساسية
+
+    :param connection: اتصال SQLAlchemy
+    :return: (قاموس {اسم الاستعلام: أسطر الخطة}، قائمة الاستعلامات التي تمر على جدول كامل)
+    """
+    plans = {}
+    regressions = []
+    for name, statement in canonical_report_queries():
+        plan = explain(connection, statement)
+        plans[name] = plan
+        if any(is_full_scan(line) for line in plan):
+            regressions.append(name)
+    return plans, regressions
+
+
+def main():
+    """الدالة الرئيسية"""
+    from app import app
+    from database import db
+
+    print("🔍 فحص خطط تنفيذ استعلامات التقارير")
+    print("=" * 50)
+
+    with app.app_context():
+        with db.engine.connect() as connection:
+            plans, regressions = check_query_plans(connection)
+
+    for name, plan in plans.items():
+        status = "❌" if name in regressions else "✅"
+        print(f"\n{status} {name}")
+        for line in plan:
+            print(f"    {line}")
+
+    if regressions:
+        print(f"\n⚠️  استعلامات تمر على جداول كاملة: {', '.join(regressions)}")
+        return False
+
+    print("\n✅ جميع الاستعلامات تستخدم الفهارس")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -44,13 +44,15 @@ def create_directories():
     create_directories()
     print("✅ تم إنشاء المجلدات المطلوبة")
     try:
-        from app import app
+        from app import app, start_background_tasks
         print("\n🌐 التطبيق يعمل على: http://localhost:5000")
         print("👤 المستخدم الافتراضي: owner")
         print("🔑 كلمة المرور الافتراضية: Owner@123")
         print("💡 زر /init_database لإنشاء قاعدة البيانات")
         print("=" * 50)
         
+        start_background_tasks(app)
+        
         app.run(host='0.0.0.0', port=5000, debug=True)
         
     except Exception as e:
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+إعادة بناء الملخصات اليومية للمبيعات من جداول المبيعات والمرتجعات
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+# إضافة المجلد الحالي إلى المسار
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def parse_date(value):
+    """تحويل نص YYYY-MM-DD إلى تاريخ"""
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def main():
+    """الدالة الرئيسية"""
+    parser = argparse.ArgumentParser(description='إعادة بناء الملخصات اليومية للمبيعات')
+    parser.add_argument('--start', type=parse_date, default=None, help='أول يوم YYYY-MM-DD')
+    parser.add_argument('--end', type=parse_date, default=None, help='آخر يوم YYYY-MM-DD')
+    args = parser.parse_args()
+
+    try:
+        from app import app
+        from database import rebuild_sales_rollups
+
+        print("🔄 إعادة بناء الملخصات اليومية...")
+        with app.app_context():
+            days = rebuild_sales_rollups(args.start, args.end)
+
+        print(f"✅ تمت إعادة بناء {days} يوم")
+        return True
+
+    except Exception as e:
+        print(f"❌ خطأ في إعادة بناء الملخصات: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
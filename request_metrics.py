@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+قياس عدد استعلامات SQL وزمنها لكل طلب
+
+تُعد الاستعلامات عبر أحداث محرك SQLAlchemy، ويُسجل زمن كل طلب في مخزن دائري
+لكل مسار لحساب p50/p95/p99. تُضاف النتائج إلى ترويسة Server-Timing لتظهر في
+أدوات المطور في المتصفح.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import Config
+
+def percentile(values, fraction):
+    """
+    النسبة المئوية من قائمة مرتبة (أقرب رتبة)
+
+    :param values: قيم مرتبة تصاعديًا
+    :param fraction: النسبة بين 0 و1
+    """
+    if not values:
+        return 0
+    index = min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))
+    return values[index]
+
+class RequestMetrics:
+    """مخزن دائري لقياسات الطلبات لكل مسار"""
+
+    def __init__(self, window=None):
+        """
+        :param window: عدد الطلبات المحفوظة لكل مسار
+        """
+        self.window = window or Config.REQUEST_METRICS_WINDOW
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, duration_ms, db_ms, queries):
+        """تسجيل قياس طلب واحد"""
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window)
+            samples.append((duration_ms, db_ms, queries))
+
+    def summary(self):
+        """
+        ملخص القياسات لكل مسار
+
+        :return: قاموس {المسار: الإحصائيات}
+        """
+        with self._lock:
+            snapshot = {endpoint: list(samples) for endpoint, samples in self._samples.items()}
+
+        result = {}
+        for endpoint, samples in snapshot.items():
+            durations = sorted(sample[0] for sample in samples)
+            db_times = sorted(sample[1] for sample in samples)
+            queries = sorted(sample[2] for sample in samples)
+            result[endpoint] = {
+                'count': len(samples),
+                'duration_ms': {
+                    'p50': round(percentile(durations, 0.50), 2),
+                    'p95': round(percentile(durations, 0.95), 2),
+                    'p99': round(percentile(durations, 0.99), 2),
+                },
+                'db_ms': {
+                    'p50': round(percentile(db_times, 0.50), 2),
+                    'p95': round(percentile(db_times, 0.95), 2),
+                    'p99': round(percentile(db_times, 0.99), 2),
+                },
+                'queries': {
+                    'p50': percentile(queries, 0.50),
+                    'p95': percentile(queries, 0.95),
+                    'max': queries[-1],
+                },
+            }
+        return result
+
+    def clear(self):
+        """مسح جميع القياسات"""
+        with self._lock:
+            self._samples.clear()
+
+# عدادات الاستعلامات خارج سياق الطلب (انظر query_budget)
+_query_counters = []
+_query_counters_lock = threading.Lock()
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get('query_start_time')
+    elapsed = (time.perf_counter() - start_times.pop()) * 1000 if start_times else 0
+
+    if has_request_context() and 'db_queries' in g:
+        g.db_queries += 1
+        g.db_time_ms += elapsed
+
+    if _query_counters:
+        with _query_counters_lock:
+            for counter in _query_counters:
+                counter.append(statement)
+
+def _start_request():
+    """بداية قياس الطلب"""
+    g.request_start = time.perf_counter()
+    g.db_queries = 0
+    g.db_time_ms = 0.0
+
+def _finish_request(response):
+    """نهاية قياس الطلب: التسجيل وإضافة ترويسة Server-Timing"""
+    if 'request_start' not in g:
+        return response
+
+    duration_ms = (time.perf_counter() - g.request_start) * 1000
+    endpoint = request.endpoint or 'unknown'
+    request_metrics.record(endpoint, duration_ms, g.db_time_ms, g.db_queries)
+
+    response.headers.add(
+        'Server-Timing',
+        f'db;dur={g.db_time_ms:.2f};desc="{g.db_queries} queries", app;dur={duration_ms:.2f}'
+    )
+    return response
+
+def init_request_metrics(app):
+    """
+    تفعيل قياس الطلبات في التطبيق
+
+    :param app: تطبيق Flask
+    """
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.extensions['request_metrics'] = request_metrics
+
+@contextmanager
+def query_budget(max_queries):
+    """
+    التحقق من أن الكود داخل السياق لا يتجاوز عدد الاستعلامات المحدد
+
+    :param max_queries: الحد الأقصى لعدد الاستعلامات
+    :return: قائمة نصوص الاستعلامات المنفذة
+    """
+    statements = []
+    with _query_counters_lock:
+        _query_counters.append(statements)
+    try:
+        yield statements
+    finally:
+        with _query_counters_lock:
+            _query_counters.remove(statements)
+
+    if len(statements) > max_queries:
+        listing = '\n'.join(statements)
+        raise AssertionError(f"تم تنفيذ {len(statements)} استعلام والحد {max_queries}:\n{listing}")
+
+def assert_route_query_budget(client, path, max_queries, method='get', **kwargs):
+    """
+    أداة اختبار: طلب مسار والتحقق من عدد استعلاماته
+
+    :param client: عميل الاختبار في Flask
+    :param path: مسار الطلب
+    :param max_queries: الحد الأقصى لعدد الاستعلامات
+    :return: الاستجابة
+    """
+    with query_budget(max_queries):
+        response = getattr(client, method)(path, **kwargs)
+    return response
+
+# القياسات المشتركة
+request_metrics = RequestMetrics()
@@ -1,8 +1,9 @@
-from app import create_app
+from app import create_app, start_background_tasks
 
 import os
 os.environ['FLASK_APP'] = 'app.py'
 app = create_app()
 
 if __name__ == '__main__':
+    start_background_tasks(app)
     app.run()
@@ -4,9 +4,10 @@
 تشغيل تطبيق الويب لمتجر الهواتف
 """
 
-from app import app  # استخدم النسخة الكاملة التي تحتوي على مسارات المشتريات
+from app import app, start_background_tasks  # استخدم النسخة الكاملة التي تحتوي على مسارات المشتريات
 
 if __name__ == '__main__':
     print("🚀 بدء تشغيل تطبيق الويب...")
+    start_background_tasks(app)
     print("🌐 يمكنك الوصول للتطبيق على: http://localhost:5000")
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
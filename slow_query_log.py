@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+سجل الاستعلامات البطيئة
+
+كل استعلام يتجاوز الحد المحدد يُكتب سطرًا في ملف JSONL دوّار مع شكل المعاملات
+(الأنواع دون القيم)، المدة، المسار الذي نفذه، وخطة التنفيذ (SQLite وPostgreSQL).
+الأمر `python slow_query_log.py` يلخص السجل حسب بصمة الاستعلام.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from sqlalchemy import event
+
+# إضافة المجلد الحالي إلى المسار
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%\(\w+\)s|%s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|%s|:\w+))*\s*\)')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|:\w+|\$\d+')
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize_statement(statement):
+    """
+    توحيد نص الاستعلام: إزالة القيم الحرفية وتوحيد قوائم IN والمسافات
+
+    :return: النص الموحد
+    """
+    normalized = _STRING_LITERAL.sub('?', statement)
+    normalized = _NUMBER_LITERAL.sub('?', normalized)
+    normalized = _PLACEHOLDER.sub('?', normalized)
+    normalized = _PLACEHOLDER_LIST.sub('(...)', normalized)
+    return _WHITESPACE.sub(' ', normalized).strip().lower()
+
+def fingerprint(statement):
+    """بصمة قصيرة للاستعلام الموحد"""
+    return hashlib.md5(normalize_statement(statement).encode('utf-8')).hexdigest()[:12]
+
+def parameters_shape(parameters, executemany=False):
+    """
+    شكل المعاملات دون قيمها (لا تُحفظ بيانات العملاء في السجل)
+
+    :return: قائمة أو قاموس بأسماء الأنواع
+    """
+    if executemany:
+        rows = list(parameters or [])
+        return {'rows': len(rows), 'row': parameters_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+class SlowQueryLogger:
+    """مسجل الاستعلامات البطيئة عبر أحداث محرك SQLAlchemy"""
+
+    def __init__(self, path=None, threshold_ms=None, max_bytes=None, backups=None, capture_plans=True):
+        """
+        :param path: ملف السجل (JSONL)
+        :param threshold_ms: الحد الأدنى للمدة بالمللي ثانية
+        :param max_bytes: حجم الملف قبل التدوير
+        :param backups: عدد الملفات القديمة المحفوظة
+        :param capture_plans: تسجيل خطة التنفيذ مع الاستعلام
+        """
+        self.path = path or Config.SLOW_QUERY_LOG_FILE
+        self.threshold_ms = Config.SLOW_QUERY_THRESHOLD_MS if threshold_ms is None else threshold_ms
+        self.capture_plans = capture_plans
+        self._engines = []
+
+        log_dir = os.path.dirname(self.path)
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+
+        self._handler = RotatingFileHandler(
+            self.path,
+            maxBytes=max_bytes or Config.SLOW_QUERY_LOG_MAX_BYTES,
+            backupCount=Config.SLOW_QUERY_LOG_BACKUPS if backups is None else backups,
+            encoding='utf-8'
+        )
+        self._handler.setFormatter(logging.Formatter('%(message)s'))
+        self._logger = logging.getLogger(f'slow_queries.{id(self)}')
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._logger.addHandler(self._handler)
+
+    def attach(self, engine):
+        """بدء مراقبة محرك قاعدة بيانات"""
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        self._engines.append(engine)
+
+    def detach(self):
+        """إيقاف المراقبة وإغلاق الملف"""
+        for engine in self._engines:
+            event.remove(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.remove(engine, 'after_cursor_execute', self._after_cursor_execute)
+        self._engines = []
+        self._logger.removeHandler(self._handler)
+        self._handler.close()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slow_query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get('slow_query_start')
+        if not start_times:
+            return
+        duration_ms = (time.perf_counter() - start_times.pop()) * 1000
+        if duration_ms < self.threshold_ms:
+            return
+
+        try:
+            plan = None
+            if self.capture_plans and not executemany:
+                plan = self._explain(conn, statement, parameters)
+            self.write({
+                'timestamp': datetime.now().isoformat(timespec='milliseconds'),
+                'duration_ms': round(duration_ms, 2),
+                'fingerprint': fingerprint(statement),
+                'statement': statement,
+                'parameters': parameters_shape(parameters, executemany),
+                'endpoint': self._endpoint(),
+                'thread': threading.current_thread().name,
+                'plan': plan,
+            })
+        except Exception as e:
+            print(f"خطأ في سجل الاستعلامات البطيئة: {e}")
+
+    def _endpoint(self):
+        """المسار الذي نفذ الاستعلام (None خارج الطلبات)"""
+        from flask import has_request_context, request
+        if has_request_context():
+            return request.endpoint
+        return None
+
+    def _explain(self, conn, statement, parameters):
+        """
+        خطة تنفيذ الاستعلام بمؤشر مستقل (لا يمر بأحداث المحرك)
+
+        :return: قائمة أسطر الخطة أو None
+        """
+        if not statement.lstrip().lower().startswith(('select', 'with')):
+            return None
+
+        dialect = conn.dialect.name
+        if dialect == 'sqlite':
+            prefix = 'EXPLAIN QUERY PLAN '
+        elif dialect == 'postgresql':
+            prefix = 'EXPLAIN '
+        else:
+            return None
+
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters or ())
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        if dialect == 'sqlite':
+            # (id, parent, notused, detail)
+            return [row[-1] for row in rows]
+        return [row[0] for row in rows]
+
+    def write(self, record):
+        """كتابة سطر في السجل"""
+        self._logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+def init_slow_query_log(app):
+    """
+    تفعيل سجل الاستعلامات البطيئة لمحرك التطبيق
+
+    :param app: تطبيق Flask
+    :return: المسجل
+    """
+    from database import db
+
+    logger = SlowQueryLogger()
+    with app.app_context():
+        logger.attach(db.engine)
+    app.extensions['slow_query_log'] = logger
+    return logger
+
+def read_log(path):
+    """قراءة سجلات الملف الحالي والملفات المدورة"""
+    paths = [f"{path}.{i}" for i in range(Config.SLOW_QUERY_LOG_BACKUPS, 0, -1)] + [path]
+    for log_path in paths:
+        if not os.path.exists(log_path):
+            continue
+        with open(log_path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+def summarize(records):
+    """
+    تجميع السجلات حسب البصمة
+
+    :return: قائمة مرتبة حسب إجمالي الزمن (الأعلى أولاً)
+    """
+    from request_metrics import percentile
+
+    groups = defaultdict(list)
+    for record in records:
+        groups[record.get('fingerprint') or fingerprint(record['statement'])].append(record)
+
+    summary = []
+    for key, items in groups.items():
+        durations = sorted(item['duration_ms'] for item in items)
+        summary.append({
+            'fingerprint': key,
+            'count': len(items),
+            'total_ms': round(sum(durations), 2),
+            'p95_ms': percentile(durations, 0.95),
+            'max_ms': durations[-1],
+            'endpoints': sorted({item.get('endpoint') or '-' for item in items}),
+            'statement': normalize_statement(items[-1]['statement']),
+            'plan': items[-1].get('plan'),
+        })
+    summary.sort(key=lambda item: item['total_ms'], reverse=True)
+    return summary
+
+def main():
+    """الدالة الرئيسية"""
+    parser = argparse.ArgumentParser(description='ملخص سجل الاستعلامات البطيئة')
+    parser.add_argument('--file', default=Config.SLOW_QUERY_LOG_FILE, help='ملف السجل')
+    parser.add_argument('--top', type=int, default=20, help='عدد الاستعلامات المعروضة')
+    args = parser.parse_args()
+
+    summary = summarize(read_log(args.file))
+    if not summary:
+        print("✅ لا توجد استعلامات بطيئة مسجلة")
+        return True
+
+    print("🐢 أبطأ الاستعلامات حسب إجمالي الزمن")
+    print("=" * 50)
+    for item in summary[:args.top]:
+        print(f"\n[{item['fingerprint']}] {item['count']} مرة، إجمالي {item['total_ms']}ms، "
+              f"p95 {item['p95_ms']}ms، أقصى {item['max_ms']}ms")
+        print(f"    المسارات: {', '.join(item['endpoints'])}")
+        print(f"    {item['statement'][:300]}")
+        for line in item['plan'] or []:
+            print(f"      {line}")
+    return True
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
@@ -105,7 +105,8 @@ def start_application():
     
     try:
         # تشغيل التطبيق
-        from app import app
+        from app import app, start_background_tasks
+        start_background_tasks(app)
         app.run(host='0.0.0.0', port=5000, debug=True)
     except ImportError as e:
         print(f"❌ خطأ في استيراد التطبيق: {e}")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار فهرس الباركود وIMEI في الذاكرة
+"""
+
+
+from flask import Flask
+from sqlalchemy import event
+
+from barcode_index import BarcodeIndex
+from database import db, Product
+
+
+def test_barcode_index():
+    """اختبار المسح دون استعلامات وإعادة البناء بعد تغيير الرموز في عملية أخرى"""
+    from views import main_blueprint
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    app.register_blueprint(main_blueprint)
+
+    with app.app_context():
+        db.create_all()
+        phone = Product(name='هاتف', model='A1', price_buy=100, price_sell=150,
+                        quantity=5, barcode='111', imei='356000000000001')
+        db.session.add_all([phone, Product(name='شاحن', model='C', price_buy=5, price_sell=10, barcode='222')])
+        db.session.commit()
+
+        client = app.test_client()
+        response = client.get('/api/products/barcode/111').get_json()
+        assert response['success'] and response['product']['name'] == 'هاتف'
+        assert client.get('/api/products/barcode/356000000000001').get_json()['product']['id'] == phone.id
+        assert client.get('/api/products/barcode/999').status_code == 404
+
+        # عامل آخر يبني فهرسه مرة واحدة ثم يمسح دون استعلامات
+        worker = BarcodeIndex()
+        assert worker.lookup('222')['price_sell'] == 10
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            assert worker.lookup('111')['id'] == phone.id
+            # تغير الكمية (كل بيعة) لا يعيد بناء الفهرس
+            phone.quantity = 4
+            db.session.commit()
+            statements.clear()
+            assert worker.lookup('111') is not None
+            assert statements == [] and worker.rebuilds == 1
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        # تغيير الباركود يظهر في العامل الآخر
+        phone.barcode = '333'
+        db.session.commit()
+        assert worker.lookup('111') is None
+        assert worker.lookup('333')['id'] == phone.id
+        assert worker.rebuilds == 2
+
+        db.session.delete(phone)
+        db.session.commit()
+        assert worker.lookup('333') is None
+        print("✅ فهرس الباركود يعمل")
+
+
+if __name__ == "__main__":
+    test_barcode_index()
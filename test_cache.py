@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار نظام التخزين المؤقت
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from cache import CacheJanitor, CacheManager, cached
+
+
+def _make_manager(**kwargs):
+    """إنشاء مدير تخزين مؤقت في مجلد مؤقت"""
+    return CacheManager(cache_dir=tempfile.mkdtemp(prefix='cache_test_'), **kwargs)
+
+
+def test_memory_tier():
+    """اختبار طبقة الذاكرة أمام القرص"""
+    manager = _make_manager(memory_max_entries=2)
+    try:
+        manager.set('a', {'total': 1})
+        assert manager.get('a') == {'total': 1}
+        assert manager.memory.hits == 1
+        assert manager.disk_hits == 0
+
+        # الطرد حسب الأقدم استخدامًا
+        manager.set('b', 2)
+        manager.set('c', 3)
+        assert manager.memory.evictions == 1
+        assert manager.stats()['memory']['entries'] == 2
+
+        # القراءة من القرص عند الإخفاق في الذاكرة ثم الترقية
+        assert manager.get('a') == {'total': 1}
+        assert manager.disk_hits == 1
+        assert manager.get('a') == {'total': 1}
+        assert manager.disk_hits == 1
+
+        # تعديل القيمة المُرجعة لا يغير ما في الذاكرة
+        value = manager.get('a')
+        value['total'] = 99
+        assert manager.get('a') == {'total': 1}
+        assert manager.memory.hits == 4
+
+        manager.delete('a')
+        assert manager.get('a') is None
+        print("✅ طبقة الذاكرة تعمل")
+    finally:
+        shutil.rmtree(manager.cache_dir, ignore_errors=True)
+
+
+def test_memory_byte_budget():
+    """اختبار حد الحجم لطبقة الذاكرة"""
+    manager = _make_manager(memory_max_bytes=64)
+    try:
+        manager.set('big', 'x' * 200)
+        assert manager.stats()['memory']['entries'] == 0
+        assert manager.get('big') == 'x' * 200
+        print("✅ حد الحجم يعمل")
+    finally:
+        shutil.rmtree(manager.cache_dir, ignore_errors=True)
+
+
+def test_cached_single_flight():
+    """اختبار إعادة الحساب من مستدعٍ واحد فقط عند انتهاء الصلاحية"""
+    manager = _make_manager()
+    calls = []
+
+    @cached(timeout=60, key_prefix='report', manager=manager)
+    def slow_report():
+        calls.append(1)
+        time.sleep(0.1)
+        return len(calls)
+
+    try:
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(slow_report())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == [1] * 8
+
+        # انتهاء الصلاحية: يحصل المستدعون على القيمة القديمة أثناء إعادة الحساب
+        key = next(iter(manager.memory._entries))
+        data, _, size = manager.memory._entries[key]
+        manager.memory._entries[key] = (data, time.time() - 1, size)
+        assert slow_report() == 2
+        print("✅ إعادة الحساب الفردية تعمل")
+    finally:
+        shutil.rmtree(manager.cache_dir, ignore_errors=True)
+
+
+def test_cached_early_refresh():
+    """اختبار التحديث الاحتمالي المبكر"""
+    manager = _make_manager()
+    calls = []
+
+    @cached(timeout=60, manager=manager, early_refresh=1e9)
+    def popular_report():
+        calls.append(1)
+        time.sleep(0.01)
+        return 'ok'
+
+    try:
+        popular_report()
+        popular_report()
+        assert len(calls) == 2
+
+        @cached(timeout=60, manager=manager)
+        def plain_report():
+            calls.append(1)
+            return 'ok'
+
+        plain_report()
+        plain_report()
+        assert len(calls) == 3
+        print("✅ التحديث المبكر يعمل")
+    finally:
+        shutil.rmtree(manager.cache_dir, ignore_errors=True)
+
+
+def test_tag_invalidation():
+    """اختبار إبطال العناصر بالوسوم بين مديرين يتشاركان المجلد نفسه"""
+    manager = _make_manager()
+    other_worker = CacheManager(cache_dir=manager.cache_dir)
+    try:
+        manager.set('report:month', 100, tags=['sales', 'sales:2026-10'])
+        manager.set('report:old', 50, tags=['sales:2026-09'])
+        manager.set('products:list', [1, 2], tags=['products'])
+        assert other_worker.get('report:month') == 100
+
+        other_worker.invalidate_tags('sales:2026-10')
+        assert manager.get('report:month') is None
+        assert other_worker.get('report:month') is None
+        assert manager.get('report:old') == 50
+        assert manager.get('products:list') == [1, 2]
+
+        # لقطة أُخذت قبل الإبطال لا تُحفظ كقيمة صالحة
+        snapshot = manager.tag_snapshot(['products'])
+        manager.invalidate_tags('products')
+        manager.set('products:list', [1], tags=snapshot)
+        assert manager.get('products:list') is None
+
+        # إبطال ثانٍ في نفس لحظة وقت تعديل المجلد يظهر للعمليات الأخرى
+        tags_dir = manager.tags.tags_dir
+        snapshot = other_worker.tag_snapshot(['sales'])
+        mtime = os.stat(tags_dir).st_mtime_ns
+        manager.invalidate_tags('sales')
+        os.utime(tags_dir, ns=(mtime, mtime))
+        assert not other_worker.tags.is_valid(snapshot)
+        print("✅ إبطال الوسوم يعمل")
+    finally:
+        shutil.rmtree(manager.cache_dir, ignore_errors=True)
+
+
+def test_sharded_binary_format():
+    """اختبار التخزين المجزأ والترويسة الثابتة والتنظيف"""
+    for serializer in ('pickle', 'json', 'msgpack'):
+        manager = _make_manager(memory_max_entries=0, serializer=serializer)
+        try:
+            manager.set('fresh', {'name': 'هاتف', 'qty': 3})
+            manager.set('old', [1, 2, 3], timeout=-1)
+            assert manager.get('fresh') == {'name': 'هاتف', 'qty': 3}
+
+            path = manager.backend._get_cache_path('fresh')
+            assert os.path.basename(os.path.dirname(path)) == os.path.basename(path)[:2]
+
+            # ملف JSON قديم في المجلد الرئيسي وملف تالف
+            with open(os.path.join(manager.cache_dir, 'legacy.cache'), 'w') as f:
+                f.write('{"value": 1, "expire": 0}')
+            broken_path = manager.backend._get_cache_path('broken')
+            os.makedirs(os.path.dirname(broken_path), exist_ok=True)
+            with open(broken_path, 'wb') as f:
+                f.write(b'xx')
+
+            assert manager.cleanup() == 3
+            assert manager.get('fresh') == {'name': 'هاتف', 'qty': 3}
+            assert manager.clear() == 1
+            assert manager.get('fresh') is None
+        finally:
+            shutil.rmtree(manager.cache_dir, ignore_errors=True)
+    print("✅ صيغة التخزين المجزأ تعمل")
+
+
+def test_janitor_budget():
+    """اختبار المنظف: حذف منتهي الصلاحية ثم فرض الحد الأقصى للحجم"""
+    manager = _make_manager(memory_max_entries=0)
+    try:
+        for i in range(200):
+            manager.set(f'key:{i}', 'x' * 1000, timeout=-1 if i < 50 else 60)
+
+        janitor = CacheJanitor(manager, max_bytes=50 * 1024, slice_size=16)
+        report = janitor.run_slice()
+        assert report['scanned'] < 200
+
+        report = janitor.run_full()
+        assert janitor.totals['expired'] == 50
+        assert janitor.totals['evicted'] > 0
+        assert report['bytes_total'] <= 50 * 1024
+        assert janitor.totals['bytes_reclaimed'] > 0
+        print("✅ منظف التخزين المؤقت يعمل")
+    finally:
+        shutil.rmtree(manager.cache_dir, ignore_errors=True)
+
+
+def test_sqlite_backend():
+    """اختبار طبقة التخزين في ملف SQLite واحد"""
+    manager = _make_manager(memory_max_entries=0, backend='sqlite')
+    other_worker = CacheManager(cache_dir=manager.cache_dir, memory_max_entries=0, backend='sqlite')
+    try:
+        manager.set_many({f'product:{i}': {'id': i} for i in range(1200)}, tags=['products'])
+        manager.set('old', 1, timeout=-1)
+
+        values = other_worker.get_many([f'product:{i}' for i in range(0, 1300, 100)] + ['old'])
+        assert len(values) == 12
+        assert values['product:1100'] == {'id': 1100}
+
+        other_worker.invalidate_tags('products')
+        assert manager.get('product:5') is None
+
+        manager.set('fresh', 'ok')
+        manager.set('expired', 2, timeout=-1)
+        assert manager.cleanup() == 1
+        assert other_worker.get('fresh') == 'ok'
+
+        janitor = CacheJanitor(manager, max_bytes=1)
+        report = janitor.run_full()
+        assert report['evicted'] > 0
+        assert report['bytes_total'] <= 1
+        assert manager.clear() == 0
+        print("✅ طبقة SQLite تعمل")
+    finally:
+        shutil.rmtree(manager.cache_dir, ignore_errors=True)
+
+
+def main():
+    """الدالة الرئيسية"""
+    print("🧪 اختبار التخزين المؤقت")
+    print("=" * 50)
+    test_memory_tier()
+    test_memory_byte_budget()
+    test_cached_single_flight()
+    test_cached_early_refresh()
+    test_tag_invalidation()
+    test_sharded_binary_format()
+    test_janitor_budget()
+    test_sqlite_backend()
+    print("\n✅ جميع الاختبارات نجحت!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار تخزين تاريخ المحادثات بالإضافة إلى نهاية الملف
+"""
+
+import json
+import os
+import tempfile
+import threading
+
+from chat_history import ChatHistory, OFFSET
+
+
+def test_chat_history_append_only():
+    """اختبار الإضافة والقراءة بالفهرس والضغط والإصلاح والتحويل من الملف القديم"""
+    directory = tempfile.mkdtemp()
+    with open(os.path.join(directory, 'chat_history.json'), 'w', encoding='utf-8') as f:
+        json.dump([{'timestamp': '2025-01-01T00:00:00', 'user_message': 'قديم', 'ai_response': 'رد',
+                    'type': 'programming_assistance'}], f)
+
+    path = os.path.join(directory, 'chat_history.jsonl')
+    history = ChatHistory(path, max_entries=40)
+    assert history.get_recent_conversations(1)[0]['user_message'] == 'قديم'
+
+    # الإضافة من عدة خيوط لا تفقد أي محادثة، وكل إضافة سطر واحد
+    def worker(n):
+        for i in range(10):
+            history.add_conversation(f"سؤال {n}-{i}", 'جواب')
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(history) == 31
+    assert os.path.getsize(path + '.idx') == 31 * OFFSET.size
+    with open(path, encoding='utf-8') as f:
+        ids = [json.loads(line)['id'] for line in f]
+    assert ids == list(range(1, 32))
+
+    recent = history.get_recent_conversations(3)
+    assert [conv['id'] for conv in recent] == [29, 30, 31]
+
+    # توقف مفاجئ: سطر ناقص وفهرس لم يُحدث
+    with open(path, 'ab') as f:
+        f.write('{"id": 32, "user_message": "نا'.encode('utf-8'))
+    ChatHistory(path).add_conversation('بعد التوقف', 'جواب')
+    os.remove(path + '.idx')
+    assert history.get_recent_conversations(1)[0]['user_message'] == 'بعد التوقف'
+    assert len(history) == 32
+
+    # الضغط التلقائي عند تجاوز الحد بربع يحتفظ بالأحدث
+    for i in range(20):
+        history.add_conversation(f"جديد {i}", 'جواب')
+    assert len(history) <= 50
+    assert history.get_recent_conversations(1)[0]['user_message'] == 'جديد 19'
+    assert history.compact() == 40
+    assert history.load_history()[0]['id'] == 13
+    print("✅ تاريخ المحادثات يعمل")
+
+
+
+def test_chat_history_search_index():
+    """اختبار البحث المرتب وعدادات المواضيع من الفهرس المقلوب"""
+    path = os.path.join(tempfile.mkdtemp(), 'chat_history.jsonl')
+    history = ChatHistory(path, max_entries=0)
+    history.add_conversation('كيف أصلح error في flask route؟', 'تحقق من المسار')
+    history.add_conversation('python database', 'استخدم إستعلام SQL مع الفهرس')
+    history.add_conversation('سؤال عن الطقس', 'مشمس')
+
+    # توحيد الهمزات وتطابق بدايات الكلمات
+    results = history.search_conversations('استعلام')
+    assert [conv['id'] for conv in results] == [2]
+    assert [conv['id'] for conv in history.search_conversations('flas')] == [1]
+    assert history.search_conversations('غير موجود') == []
+    assert dict(history.get_programming_topics()) == {'error': 1, 'flask': 1, 'route': 1, 'python': 1, 'database': 1}
+
+    # فقدان الفهرس أو توقف قبل فهرسة المحادثة يُستكمل عند البحث التالي
+    history.search_index.close()
+    os.remove(path + '.search.db')
+    history.search_index._local.connection = None
+    with open(path, 'ab') as f:
+        offset = f.tell()
+        f.write(history._encode({'id': 4, 'user_message': 'css bug', 'ai_response': ''}))
+    with open(path + '.idx', 'ab') as f:
+        f.write(OFFSET.pack(offset))
+    assert [conv['id'] for conv in history.search_conversations('css')] == [4]
+    assert dict(history.get_programming_topics())['bug'] == 1
+
+    # الضغط يعيد بناء الفهرس بالمواضع الجديدة
+    history.max_entries = 2
+    history.compact()
+    assert history.search_conversations('flask') == []
+    assert history.search_conversations('مشمس')[0]['user_message'] == 'سؤال عن الطقس'
+    print("✅ البحث في تاريخ المحادثات يعمل")
+
+
+def test_chat_search_route():
+    """اختبار حدود عدد النتائج ورسالة الخطأ العامة في مسار البحث"""
+    from flask import Flask
+    from views import main_blueprint
+    import views.chat as chat_views
+
+    history = ChatHistory(os.path.join(tempfile.mkdtemp(), 'chat_history.jsonl'), max_entries=0)
+    history.add_conversation('flask route', 'أ')
+    history.add_conversation('flask error', 'ب')
+    original_history = chat_views.chat_history
+    chat_views.chat_history = history
+    app = Flask(__name__)
+    app.register_blueprint(main_blueprint)
+    client = app.test_client()
+    try:
+        assert len(client.get('/chat/search?q=flask&limit=0').get_json()['results']) == 1
+        assert len(client.get('/chat/search?q=flask&limit=-5').get_json()['results']) == 1
+
+        def broken_search(keyword, limit):
+            raise RuntimeError('/secret/path/chat_history.jsonl.search.db')
+
+        history.search_conversations = broken_search
+        response = client.get('/chat/search?q=flask')
+        assert response.status_code == 500
+        assert 'secret' not in response.get_data(as_text=True)
+        print("✅ مسار البحث في المحادثات يعمل")
+    finally:
+        chat_views.chat_history = original_history
+
+
+if __name__ == "__main__":
+    test_chat_history_append_only()
+    test_chat_history_search_index()
+    test_chat_search_route()
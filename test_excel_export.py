@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار التصدير المتدفق إلى Excel وCSV
+"""
+
+import csv
+import io
+from datetime import datetime
+
+from flask import Flask
+from openpyxl import load_workbook
+
+from database import db, Customer, Product, Sale, SaleItem
+from data_export import CSVExporter
+from excel_export import (ExcelExporter, SALES_COLUMNS, sales_export_query, products_export_query,
+                          sale_items_export_query, purchases_export_query)
+
+
+def test_stream_sales_report():
+    """اختبار تصدير عدد كبير من المبيعات بوضع الكتابة فقط"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        customer = Customer(name='أحمد')
+        db.session.add(customer)
+        db.session.add(Product(name='Galaxy S24', model='S24', price_buy=100, price_sell=150, quantity=10))
+        db.session.flush()
+        db.session.add_all([
+            Sale(customer_id=customer.id if i % 2 else None, total_amount=100, discount=10,
+                 final_amount=90, payment_method='cash', created_at=datetime(2026, 1, 1 + i % 28))
+            for i in range(500)
+        ])
+        db.session.commit()
+
+        exporter = ExcelExporter()
+        start_date, end_date = datetime(2026, 1, 1), datetime(2026, 12, 31)
+        output = exporter.stream_sales_report(sales_export_query(start_date, end_date),
+                                              start_date, end_date, chunk_size=64)
+        rows = list(load_workbook(output).active.iter_rows(values_only=True))
+        output.close()
+
+        assert rows[0][0] == "تقرير المبيعات - متجر الهواتف المحمولة"
+        assert rows[3][0] == 'رقم الفاتورة'
+        data = rows[4:504]
+        assert len(data) == 500
+        assert {row[2] for row in data} == {'أحمد', 'عميل غير محدد'}
+        assert rows[-1][0] == "الإجمالي (500):"
+        assert rows[-1][3:6] == (50000, 5000, 45000)
+
+        # تصدير يوم واحد (البداية = النهاية) يشمل مبيعات اليوم كاملاً
+        db.session.add(Sale(total_amount=5, final_amount=5, created_at=datetime(2026, 2, 3, 18, 30)))
+        db.session.commit()
+        day = datetime(2026, 2, 3)
+        assert [sale.final_amount for sale in sales_export_query(day, day)] == [5]
+        assert sale_items_export_query(day, day).count() == 0
+        assert purchases_export_query(day, day).count() == 0
+
+        output = exporter.stream_products_report(products_export_query())
+        rows = list(load_workbook(output).active.iter_rows(values_only=True))
+        output.close()
+        assert rows[3][1] == 'Galaxy S24'
+        assert rows[-1][7] == 10
+    print("✅ التصدير المتدفق يعمل")
+
+
+def test_csv_export():
+    """اختبار تصدير CSV المتدفق بنفس تعريفات أعمدة Excel"""
+    from views import main_blueprint
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    app.register_blueprint(main_blueprint)
+    with app.app_context():
+        db.create_all()
+        phone = Product(name='Galaxy S24', model='S24', price_buy=100, price_sell=150, quantity=10)
+        db.session.add(phone)
+        db.session.flush()
+        for i in range(25):
+            sale = Sale(total_amount=150, discount=0, final_amount=150, payment_method='cash',
+                        created_at=datetime(2026, 2, 1 + i))
+            sale.sale_items.append(SaleItem(product_id=phone.id, quantity=1, unit_price=150, total_price=150))
+            db.session.add(sale)
+        db.session.commit()
+
+        chunks = list(CSVExporter().iter_dataset('sales', chunk_size=10))
+        assert len(chunks) == 3
+        rows = list(csv.reader(io.StringIO(b''.join(chunks).decode('utf-8'))))
+        assert rows[0] == [column.header for column in SALES_COLUMNS]
+        assert len(rows) == 26
+        assert rows[1][1] == '2026-02-01T00:00:00'
+
+    client = app.test_client()
+    response = client.get('/exports/sale_items.csv?header=names&start_date=2026-02-20')
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0][:3] == ['id', 'sale_id', 'created_at']
+    assert len(rows) == 7
+    assert rows[1][4] == 'Galaxy S24'
+    assert client.get('/exports/unknown.csv').status_code == 404
+    assert client.get('/exports/sales.csv?start_date=bad').status_code == 400
+    print("✅ تصدير CSV يعمل")
+
+
+if __name__ == "__main__":
+    test_stream_sales_report()
+    test_csv_export()
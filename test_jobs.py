@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار نظام المهام الخلفية
+"""
+
+import os
+import shutil
+import tempfile
+
+from flask import Flask
+
+from jobs import JOB_DONE, JOB_FAILED, JobQueue, JobWorker, job_handler, report_progress
+
+
+@job_handler('test_echo')
+def _echo_job(params, output_path):
+    """مهمة اختبار تكتب النص المرسل"""
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(params['text'])
+    return 'echo.txt', 'text/plain'
+
+
+@job_handler('test_progress')
+def _progress_job(params, output_path):
+    """مهمة اختبار تسجل تقدمها"""
+    for done in range(1, params['total'] + 1):
+        report_progress(done, params['total'])
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('تم')
+    return 'progress.txt', 'text/plain'
+
+
+@job_handler('test_broken')
+def _broken_job(params, output_path):
+    """مهمة اختبار تفشل دائمًا"""
+    raise RuntimeError('تعذر التنفيذ')
+
+
+def test_job_queue_and_worker():
+    """اختبار الطابور والتنفيذ في عمليات منفصلة"""
+    jobs_dir = os.path.join(tempfile.mkdtemp(prefix='jobs_test_'), 'jobs')
+    queue = JobQueue(jobs_dir)
+    worker = JobWorker(queue, processes=2, poll_interval=0.05)
+    try:
+        # إنشاء الطابور لا يكتب أي ملف قبل أول استخدام
+        assert not os.path.exists(jobs_dir)
+        ids = [queue.enqueue('test_echo', {'text': f'تقرير {i}'}) for i in range(3)]
+        broken_id = queue.enqueue('test_broken')
+        progress_id = queue.enqueue('test_progress', {'total': 3})
+        assert queue.get(ids[0])['status'] == 'queued'
+
+        assert worker.run_until_idle(timeout=60)
+
+        for i, job_id in enumerate(ids):
+            job = queue.get(job_id)
+            assert job['status'] == JOB_DONE
+            with open(job['result_path'], encoding='utf-8') as f:
+                assert f.read() == f'تقرير {i}'
+        broken = queue.get(broken_id)
+        assert broken['status'] == JOB_FAILED
+        assert 'تعذر التنفيذ' in broken['error']
+        progress = queue.get(progress_id)
+        assert (progress['progress_done'], progress['progress_total']) == (3, 3)
+        assert queue.get(ids[0])['progress_total'] is None
+        assert queue.claim() is None
+
+        # مهمة طويلة ما زالت تُنفذ في هذه العملية لا تُعاد إلى الطابور
+        long_id = queue.enqueue('test_echo', {'text': 'طويلة'})
+        queue.claim()
+        assert queue.requeue_stale(-1, exclude=[long_id]) == 0
+        assert queue.requeue_stale(-1) == 1
+        queue.claim()
+        queue.complete(long_id, None, None, None)
+
+        assert queue.cleanup(-1) == 6
+        assert queue.get(ids[0]) is None
+        print("✅ طابور المهام يعمل")
+    finally:
+        worker.stop()
+        shutil.rmtree(os.path.dirname(jobs_dir), ignore_errors=True)
+
+
+def test_job_routes():
+    """اختبار مسارات الحالة والتحميل"""
+    import jobs
+    from views import main_blueprint
+    import views.jobs as job_views
+
+    jobs_dir = tempfile.mkdtemp(prefix='jobs_test_')
+    original_queue = job_views.job_queue
+    job_views.job_queue = JobQueue(jobs_dir)
+    app = Flask(__name__)
+    app.register_blueprint(main_blueprint)
+    try:
+        client = app.test_client()
+        assert client.post('/jobs/exports/unknown').status_code == 404
+        invalid = client.post('/jobs/invoices/batch', json={'kind': 'sale', 'ids': ['abc']})
+        assert invalid.status_code == 400 and 'error' in invalid.get_json()
+
+        bad_date = client.post('/jobs/exports/sales', json={'start_date': '2026-13-45'})
+        assert bad_date.status_code == 400 and 'error' in bad_date.get_json()
+        assert client.post('/jobs/exports/sales', json={'end_date': 20260101}).status_code == 400
+        assert job_views.job_queue.claim() is None
+
+        response = client.post('/jobs/exports/sales', json={'start_date': '2026-01-01'})
+        assert response.status_code == 202
+        job = response.get_json()
+        assert job['status'] == 'queued'
+        assert job_views.job_queue.get(job['id'])['params'] == {'start_date': '2026-01-01'}
+        assert client.get(f"/jobs/{job['id']}/download").status_code == 409
+        job_views.job_queue.set_progress(job['id'], 1, 4)
+        assert client.get(job['status_url']).get_json()['progress'] == {'done': 1, 'total': 4}
+
+        claimed = job_views.job_queue.claim()
+        output_path = job_views.job_queue.result_path(claimed['id'])
+        with open(output_path, 'wb') as f:
+            f.write(b'xlsx')
+        job_views.job_queue.complete(claimed['id'], output_path, 'sales.xlsx', jobs.XLSX_MIMETYPE)
+
+        status = client.get(job['status_url']).get_json()
+        assert status['status'] == JOB_DONE
+        download = client.get(status['download_url'])
+        assert download.status_code == 200
+        assert download.data == b'xlsx'
+        assert client.get('/jobs/missing').status_code == 404
+        print("✅ مسارات المهام تعمل")
+    finally:
+        job_views.job_queue = original_queue
+        shutil.rmtree(jobs_dir, ignore_errors=True)
+
+
+def test_app_import_starts_no_threads():
+    """استيراد التطبيق (عمليات التنفيذ وأوامر CLI) لا يشغل الخيوط الخلفية"""
+    from app import app  # noqa: F401
+    from jobs import job_worker
+    from notifications import notification_retention
+
+    assert not job_worker.stats()['running']
+    assert notification_retention._thread is None
+    print("✅ استيراد التطبيق لا يشغل الخيوط الخلفية")
+
+
+def main():
+    """الدالة الرئيسية"""
+    print("🧪 اختبار المهام الخلفية")
+    print("=" * 50)
+    test_job_queue_and_worker()
+    test_job_routes()
+    test_app_import_starts_no_threads()
+    print("\n✅ جميع الاختبارات نجحت!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار البث المباشر للأحداث (Server-Sent Events)
+"""
+
+
+from flask import Flask
+
+from config import Config
+from database import db, Product, Sale
+from live_events import BrokerFull, EventBroker, event_broker, format_sse, stream
+
+
+def test_event_broker():
+    """اختبار التوزيع واستعادة الأحداث الفائتة والحد الأقصى للاتصالات"""
+    broker = EventBroker(history=3, queue_size=2, max_subscribers=2)
+    first = broker.subscribe()
+    second = broker.subscribe()
+    try:
+        broker.subscribe()
+        assert False, "يجب رفض الاتصال الثالث"
+    except BrokerFull:
+        pass
+
+    sale = broker.publish('sale', {'id': 1}, {'today_sales_count': 1})
+    assert first.get(0)['id'] == sale['id'] and second.get(0)['id'] == sale['id']
+    assert format_sse(sale) == f'id: {sale["id"]}\nevent: sale\ndata: {{"id": 1, "counters": {{"today_sales_count": 1}}}}\n\n'
+
+    # المتصفح البطيء يُفصل بدلاً من حجز الذاكرة
+    for i in range(3):
+        broker.publish('return', {'id': i})
+    assert first.overflowed
+
+    # إعادة الاتصال تستعيد ما بعد آخر حدث مستلم فقط، ولا تستعيد معرفات تشغيل آخر
+    broker.unsubscribe(first)
+    replay = broker.subscribe(sale['id'])
+    assert [replay.get(0)['data']['id'] for _ in range(2)] == [1, 2]
+    broker.unsubscribe(replay)
+    assert broker.subscribe('other-1').get(0) is None
+
+    broker.unsubscribe(second)
+    listener = broker.subscribe()
+    broker.publish('sale', {'id': 2})
+    body = ''.join(stream(broker, listener, timeout=0.05, heartbeat=0.01))
+    assert body.startswith('retry: ') and 'event: sale' in body
+    assert broker.stats()['subscribers'] == 1 and ': ping' in body
+    print("✅ وسيط الأحداث يعمل")
+
+
+def test_events_published_after_commit():
+    """اختبار نشر أحداث البيع والمخزون المنخفض بعد نجاح المعاملة فقط"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        phone = Product(name='هاتف', model='A1', price_buy=1, price_sell=2, quantity=10, min_quantity=5)
+        db.session.add(phone)
+        db.session.commit()
+
+        subscription = event_broker.subscribe()
+        try:
+            db.session.add(Sale(total_amount=300, final_amount=250))
+            phone.quantity = 2
+            db.session.rollback()
+            assert subscription.get(0) is None
+
+            db.session.add(Sale(total_amount=300, final_amount=250))
+            phone = db.session.get(Product, phone.id)
+            phone.quantity = 2
+            db.session.commit()
+            events = {item['type']: item['data'] for item in iter(lambda: subscription.get(0), None)}
+            assert events['sale']['counters'] == {'today_sales_count': 1, 'today_revenue': 250}
+            assert events['low_stock']['counters'] == {'low_stock_count': 1}
+
+            # بيع آخر تحت الحد لا يكرر حدث المخزون المنخفض
+            phone.quantity = 1
+            db.session.commit()
+            assert subscription.get(0) is None
+            phone.quantity = 20
+            db.session.commit()
+            assert subscription.get(0)['type'] == 'restocked'
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    # المسار يبث الأحداث الفائتة ثم ينهي الاتصال بعد المهلة
+    from views import main_blueprint
+    app.register_blueprint(main_blueprint)
+    published = event_broker.publish('sale', {'id': 99})
+    original_timeout = Config.EVENTS_STREAM_TIMEOUT
+    Config.EVENTS_STREAM_TIMEOUT = 0.05
+    try:
+        with app.test_client() as client:
+            response = client.get('/events', headers={'Last-Event-ID': f"{event_broker.epoch}-0"})
+            assert response.mimetype == 'text/event-stream'
+            assert f"id: {published['id']}" in response.get_data(as_text=True)
+    finally:
+        Config.EVENTS_STREAM_TIMEOUT = original_timeout
+    print("✅ نشر الأحداث بعد نجاح المعاملة يعمل")
+
+
+if __name__ == "__main__":
+    test_event_broker()
+    test_events_published_after_commit()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار ملفات التحميل المسبق (منع استعلامات N+1 في قوائم الواجهة البرمجية)
+"""
+
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import raiseload
+
+from database import (db, with_profile, User, Category, Supplier, Product, PurchaseInvoice,
+                      PurchaseItem, ActivityLog)
+
+
+def _count_queries(engine, func):
+    """تنفيذ دالة وإرجاع (النتيجة، عدد الاستعلامات)"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return result, len(statements)
+
+
+def test_listing_profiles():
+    """اختبار ثبات عدد الاستعلامات في القوائم مهما كان عدد الصفوف"""
+    from views import main_blueprint
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    app.register_blueprint(main_blueprint)
+    with app.app_context():
+        db.create_all()
+        user = User(username='admin', password_hash='x')
+        categories = [Category(name=f'فئة {i}') for i in range(5)]
+        suppliers = [Supplier(name=f'مورد {i}') for i in range(5)]
+        db.session.add_all([user, *categories, *suppliers])
+        db.session.flush()
+        products = [
+            Product(name=f'هاتف {i}', model=f'M{i}', price_buy=100, price_sell=150,
+                    category_id=categories[i % 5].id, supplier_id=suppliers[i % 5].id)
+            for i in range(60)
+        ]
+        db.session.add_all(products)
+        db.session.flush()
+        for i in range(10):
+            invoice = PurchaseInvoice(supplier_id=suppliers[i % 5].id, invoice_number=f'P{i}',
+                                      total_amount=300, final_amount=300)
+            invoice.purchase_items = [
+                PurchaseItem(product_id=products[j].id, quantity=1, unit_price=100, total_price=100)
+                for j in range(i, i + 3)
+            ]
+            db.session.add(invoice)
+        db.session.add_all([
+            ActivityLog(user_id=user.id, action='create', entity_type='product', entity_id=i)
+            for i in range(20)
+        ])
+        db.session.commit()
+        db.session.expunge_all()
+        engine = db.engine
+
+        rows, count = _count_queries(engine, lambda: [
+            product.to_dict() for product in with_profile(Product.query, 'product_list', strict=True)
+        ])
+        assert len(rows) == 60
+        assert rows[0]['category_name'] == 'فئة 0' and rows[0]['supplier_name'] == 'مورد 0'
+        assert count == 1
+        db.session.expunge_all()
+
+        rows, count = _count_queries(engine, lambda: [
+            category.to_dict() for category in with_profile(Category.query, 'category_list', strict=True)
+        ])
+        assert [row['products_count'] for row in rows] == [12] * 5
+        assert count == 1
+        db.session.expunge_all()
+
+        rows, count = _count_queries(engine, lambda: [
+            invoice.to_dict() for invoice in with_profile(PurchaseInvoice.query, 'purchase_list', strict=True)
+        ])
+        assert len(rows) == 10 and len(rows[0]['items']) == 3
+        assert rows[0]['items'][0]['product_name'] == 'هاتف 0'
+        assert count == 2
+        db.session.expunge_all()
+
+        _, count = _count_queries(engine, lambda: [
+            log.to_dict() for log in with_profile(ActivityLog.query, 'activity_log_list', strict=True)
+        ])
+        assert count == 1
+        db.session.expunge_all()
+
+        # بدون الملف: التحميل الكسول ممنوع في الوضع الصارم
+        try:
+            [product.to_dict() for product in Product.query.options(raiseload('*'))]
+            assert False, "كان يجب رفع خطأ"
+        except InvalidRequestError:
+            pass
+        db.session.expunge_all()
+
+    client = app.test_client()
+    response = client.get('/api/products?per_page=25&page=3')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert len(data['items']) == 10
+    assert client.get('/api/categories').get_json()['items'][0]['products_count'] == 12
+    assert client.get('/api/unknown').status_code == 404
+    print("✅ ملفات التحميل المسبق تعمل")
+
+
+if __name__ == "__main__":
+    test_listing_profiles()
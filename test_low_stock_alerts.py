@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار تنبيهات المخزون المنخفض المبنية على تغير الكميات
+"""
+
+
+from flask import Flask
+from sqlalchemy import event, text
+
+from database import db, Notification, Product, User
+from notifications import notification_manager
+
+
+def _alerts(product_id):
+    return Notification.query.filter_by(type='low_stock', product_id=product_id).order_by(Notification.user_id).all()
+
+
+def test_low_stock_alerts():
+    """اختبار فتح تنبيه واحد لكل منتج وإغلاقه عند إعادة التزويد"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            User(username='owner', password_hash='x', role='owner'),
+            User(username='worker', password_hash='x'),
+            User(username='old', password_hash='x', is_active=False),
+        ])
+        phone = Product(name='هاتف', model='A1', price_buy=1, price_sell=2, quantity=10, min_quantity=5)
+        db.session.add(phone)
+        db.session.commit()
+        assert _alerts(phone.id) == []
+
+        # البيع تحت الحد الأدنى يفتح تنبيهًا واحدًا لكل مستخدم نشط
+        phone.quantity = 4
+        db.session.commit()
+        alerts = _alerts(phone.id)
+        assert len(alerts) == 2 and 'الكمية المتوفرة: 4' in alerts[0].message
+
+        # بيع آخر لا يكرر التنبيه ويحافظ على حالة القراءة
+        alerts[0].read = True
+        db.session.commit()
+        phone.quantity = 3
+        db.session.commit()
+        alerts = _alerts(phone.id)
+        assert len(alerts) == 2 and alerts[0].read and 'الكمية المتوفرة: 3' in alerts[1].message
+
+        # إعادة التزويد تغلق التنبيهات، وبيع منتج متوفر لا يلمس جدول الإشعارات
+        phone.quantity = 20
+        db.session.commit()
+        assert _alerts(phone.id) == []
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            phone.quantity = 19
+            db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert not [statement for statement in statements if 'notifications' in statement]
+
+        # المطابقة الكاملة بعد تعديل الكمية خارج النماذج
+        db.session.execute(text("UPDATE products SET quantity = 1 WHERE id = :id"), {'id': phone.id})
+        db.session.commit()
+        low = notification_manager.check_low_stock()
+        assert [item['product_id'] for item in low] == [phone.id]
+        assert len(_alerts(phone.id)) == 2
+        notification_manager.check_low_stock()
+        assert len(_alerts(phone.id)) == 2
+
+        # إعادة التزويد بعد انتهاء صلاحية الكائن (دون قراءة الكمية أولاً) تغلق التنبيه
+        db.session.expire_all()
+        phone.quantity = 30
+        db.session.commit()
+        assert _alerts(phone.id) == []
+
+        # قاعدة بيانات دون الفهرس الفريد (لم تُرحّل): لا تكرار أيضًا
+        db.session.execute(text("DROP INDEX uq_notifications_low_stock_user_product"))
+        db.session.commit()
+        db.session.connection().info.pop('low_stock_index_ready', None)
+        db.session.expire_all()
+        phone = db.session.get(Product, phone.id)
+        phone.quantity = 0
+        db.session.commit()
+        assert len(_alerts(phone.id)) == 2
+        print("✅ تنبيهات المخزون المنخفض تعمل")
+
+
+if __name__ == "__main__":
+    test_low_stock_alerts()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار حفظ الإشعارات المجمع وترقيمها بالمؤشر وحد الاحتفاظ
+"""
+
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import event
+
+from database import db, Notification, Product, User
+from notifications import NotificationManager
+
+
+def test_notification_persistence():
+    """اختبار الإدراج المجمع والصفحات وعدد غير المقروء والاحتفاظ"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        user = User(username='owner', password_hash='x', role='owner')
+        db.session.add(user)
+        db.session.commit()
+
+        manager = NotificationManager()
+        start = datetime(2026, 1, 1)
+        manager.notifications = [
+            {
+                'type': 'info',
+                'title': f"إشعار {i}",
+                'message': 'رسالة',
+                'timestamp': (start + timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M:%S'),
+                'read': False
+            }
+            for i in range(30)
+        ]
+
+        # الحفظ استعلام إدراج واحد بدلاً من استعلام لكل إشعار
+        inserts = []
+        listener = lambda conn, cursor, statement, *args: inserts.append(statement) if statement.startswith('INSERT') else None
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            assert manager.save_to_database(user.id)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert len(inserts) == 1
+        assert manager.notifications == []
+        assert manager.unread_count(user.id) == 30
+
+        # صفحات متتالية دون تكرار أو فقدان (الأحدث أولاً)
+        titles, cursor = [], None
+        while True:
+            items, cursor = manager.load_page(user.id, limit=8, cursor=cursor)
+            titles.extend(item['title'] for item in items)
+            if cursor is None:
+                break
+        assert titles == [f"إشعار {i}" for i in range(29, -1, -1)]
+
+        Notification.query.filter(Notification.title == 'إشعار 29').update({'read': True})
+        db.session.commit()
+        assert manager.unread_count(user.id) == 29
+        items, _ = manager.load_page(user.id, limit=1, unread_only=True)
+        assert items[0]['title'] == 'إشعار 28'
+
+        # الاحتفاظ بأحدث الإشعارات فقط
+        assert manager.apply_retention(user.id, max_count=10) == 20
+        db.session.commit()
+        assert manager.load_from_database(user.id)
+        assert [n['title'] for n in manager.notifications] == [f"إشعار {i}" for i in range(29, 19, -1)]
+
+        # تحميل ثم حفظ لا يكرر الصفوف المحملة، وتنبيه المخزون المفتوح لا يخالف الفهرس الفريد
+        phone = Product(name='هاتف', model='A1', price_buy=1, price_sell=2, quantity=1, min_quantity=5)
+        db.session.add(phone)
+        db.session.commit()
+        assert manager.load_from_database(user.id)
+        assert any(n['type'] == 'low_stock' for n in manager.notifications)
+        manager.notifications.append({'type': 'low_stock', 'product_id': phone.id, 'title': 'تنبيه',
+                                      'message': 'الكمية 1', 'timestamp': None, 'read': False})
+        assert manager.save_to_database(user.id)
+        assert Notification.query.filter_by(user_id=user.id).count() == 11
+        assert Notification.query.filter_by(type='low_stock').one().message == 'الكمية 1'
+    print("✅ حفظ الإشعارات وترقيمها يعملان بشكل صحيح")
+
+
+if __name__ == "__main__":
+    test_notification_persistence()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار الإكمال التلقائي المتسامح مع الأخطاء الإملائية
+"""
+
+
+from flask import Flask
+
+from database import db, Product
+from product_autocomplete import ProductAutocomplete, trigrams
+
+
+def test_trigrams():
+    """اختبار ثلاثيات الأحرف مع الحشو"""
+    assert trigrams('ab') == {'  a', ' ab', 'ab '}
+    print("✅ ثلاثيات الأحرف تعمل")
+
+
+def test_product_autocomplete():
+    """اختبار المطابقة التقريبية والمزامنة التدريجية بين العمليات"""
+    from views import main_blueprint
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    app.register_blueprint(main_blueprint)
+
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Product(name='Galaxy S24 Ultra', brand='Samsung', model='S24', color='Black',
+                    price_buy=1, price_sell=900, quantity=3),
+            Product(name='Galaxy A15', brand='Samsung', model='A15', price_buy=1, price_sell=200),
+            Product(name='آيفون 15 برو', brand='Apple', model='iPhone 15 Pro', price_buy=1, price_sell=1200),
+            Product(name='شاحن سريع', brand='Anker', model='PD20', price_buy=1, price_sell=20),
+        ])
+        db.session.commit()
+
+        index = ProductAutocomplete()
+        assert index.complete('galxy s24')[0]['model'] == 'S24'
+        assert index.complete('ايفون')[0]['brand'] == 'Apple'
+        assert index.complete('iphon')[0]['brand'] == 'Apple'
+        assert [match['model'] for match in index.complete('galaxy a1')][0] == 'A15'
+        assert index.complete('xqzw') == []
+
+        # تغير الكمية لا يستدعي مزامنة، وتغير الاسم يُقرأ تدريجيًا
+        charger = Product.query.filter_by(model='PD20').one()
+        charger.quantity = 50
+        db.session.commit()
+        index.complete('شاحن')
+        assert index.rebuilds == 1 and index.refreshes == 0
+        charger.name = 'شاحن لاسلكي'
+        db.session.commit()
+        assert index.complete('لاسلكي')[0]['id'] == charger.id
+        assert index.rebuilds == 1 and index.refreshes == 1
+
+        db.session.delete(charger)
+        db.session.commit()
+        assert index.complete('لاسلكي') == []
+        assert index.stats()['products'] == 3
+
+        # البحث الحي يكمل نتائج الفهرس النصي بالمطابقات التقريبية
+        client = app.test_client()
+        suggestions = client.get('/api/products/search?q=galxy').get_json()
+        assert {product['model'] for product in suggestions} == {'S24', 'A15'}
+        assert client.get('/api/products/autocomplete?q=samsng').get_json()[0]['brand'] == 'Samsung'
+        print("✅ الإكمال التلقائي يعمل")
+
+
+if __name__ == "__main__":
+    test_trigrams()
+    test_product_autocomplete()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار البحث النصي في المنتجات (FTS5)
+"""
+
+
+from flask import Flask
+from sqlalchemy import text
+
+from database import db, Category, Product
+from product_search import normalize_arabic, search_product_ids, search_products
+
+
+def test_normalize_arabic():
+    """اختبار توحيد التشكيل والألف والياء والتاء المربوطة"""
+    assert normalize_arabic('إِسْتِعْمَال') == 'استعمال'
+    assert normalize_arabic('شاشـــة أصلية') == 'شاشه اصليه'
+    assert normalize_arabic('مستشفى Galaxy ٥٠') == 'مستشفي galaxy 50'
+    print("✅ توحيد النص العربي يعمل")
+
+
+def test_product_search():
+    """اختبار البحث المرتب ومطابقة البدايات وتحديث الفهرس مع المنتجات"""
+    from views import main_blueprint
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    app.register_blueprint(main_blueprint)
+
+    with app.app_context():
+        db.create_all()
+        phones = Category(name='هواتف')
+        db.session.add(phones)
+        db.session.add_all([
+            Product(name='سامسونج جالاكسي A54', brand='Samsung', model='A54', price_buy=1, price_sell=300,
+                    category=phones),
+            Product(name='غطاء حماية', brand='Generic', model='C1', price_buy=1, price_sell=5,
+                    description='غطاء مناسب لهاتف سامسونج'),
+            Product(name='شاحن أصلي', brand='Apple', model='20W', price_buy=1, price_sell=20),
+        ])
+        db.session.commit()
+
+        # الاسم أهم من الوصف، ومطابقة بداية الكلمة
+        names = [product.name for product in search_products('سامسو')]
+        assert names == ['سامسونج جالاكسي A54', 'غطاء حماية']
+        # الهمزة في المنتج وليست في البحث
+        assert [product.name for product in search_products('شاحن اصلي')] == ['شاحن أصلي']
+        assert search_products('xyz') == []
+
+        # تعديل المنتج أو حذفه يحدث الفهرس في نفس المعاملة
+        charger = Product.query.filter_by(model='20W').one()
+        charger.name = 'شاحن سريع'
+        db.session.commit()
+        assert search_product_ids('اصلي') == []
+        assert search_product_ids('سريع') == [charger.id]
+        db.session.delete(charger)
+        db.session.commit()
+        assert search_product_ids('سريع') == []
+        assert db.session.execute(text("SELECT count(*) FROM product_search")).scalar() == 2
+
+        client = app.test_client()
+        suggestions = client.get('/api/products/search?q=جالاكس').get_json()
+        assert suggestions[0]['category_name'] == 'هواتف'
+        response = client.get('/api/advanced_search?type=products&query=سامسونج&max_price=100').get_json()
+        assert [product['model'] for product in response['results']] == ['C1']
+        print("✅ البحث النصي في المنتجات يعمل")
+
+
+if __name__ == "__main__":
+    test_normalize_arabic()
+    test_product_search()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار استخدام الفهارس في استعلامات التقارير
+"""
+
+from flask import Flask
+
+from database import db
+from query_plans import check_query_plans
+
+
+def test_report_queries_use_indexes():
+    """اختبار عدم مرور استعلامات التقارير على جداول كاملة"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        with db.engine.connect() as connection:
+            plans, regressions = check_query_plans(connection)
+
+    for name, plan in plans.items():
+        print(f"{name}: {plan}")
+    assert regressions == []
+    print("✅ جميع الاستعلامات تستخدم الفهارس")
+
+
+if __name__ == "__main__":
+    test_report_queries_use_indexes()
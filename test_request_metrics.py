@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار قياس عدد الاستعلامات وزمن الطلبات
+"""
+
+
+from flask import Flask
+
+from database import db, Product
+from request_metrics import (RequestMetrics, assert_route_query_budget, init_request_metrics,
+                             percentile, request_metrics)
+
+
+def test_percentiles():
+    """اختبار حساب النسب المئوية والمخزن الدائري"""
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.95) == 95
+    assert percentile(values, 0.99) == 99
+    assert percentile([], 0.5) == 0
+
+    metrics = RequestMetrics(window=10)
+    for i in range(25):
+        metrics.record('main.index', float(i), 1.0, i % 3)
+    summary = metrics.summary()['main.index']
+    assert summary['count'] == 10
+    assert summary['duration_ms']['p99'] == 24
+    print("✅ النسب المئوية تعمل")
+
+
+def test_request_metrics_middleware():
+    """اختبار الترويسة ونقطة الإدارة وحدود الاستعلامات"""
+    from views import main_blueprint
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    app.register_blueprint(main_blueprint)
+    init_request_metrics(app)
+    request_metrics.clear()
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Product(name=f'هاتف {i}', model=f'M{i}', price_buy=100, price_sell=150) for i in range(30)
+        ])
+        db.session.commit()
+
+    client = app.test_client()
+    for _ in range(5):
+        response = assert_route_query_budget(client, '/api/products', 1)
+        assert response.status_code == 200
+    assert 'db;dur=' in response.headers['Server-Timing']
+    assert '1 queries' in response.headers['Server-Timing']
+
+    try:
+        assert_route_query_budget(client, '/api/products', 0)
+        assert False, "كان يجب رفع خطأ"
+    except AssertionError as e:
+        assert 'الحد 0' in str(e)
+
+    summary = client.get('/admin/metrics').get_json()['endpoints']['main.api_listing']
+    assert summary['count'] == 6
+    assert summary['queries']['max'] == 1
+    assert summary['duration_ms']['p50'] > 0
+    print("✅ قياس الطلبات يعمل")
+
+
+if __name__ == "__main__":
+    test_percentiles()
+    test_request_metrics_middleware()
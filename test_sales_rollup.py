@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار الملخصات اليومية للمبيعات
+"""
+
+from datetime import datetime, date
+
+from flask import Flask
+
+from database import (db, Product, Sale, SaleItem, Return, ReturnItem, DailySalesSummary,
+                      DailyProductSales, rebuild_sales_rollups, get_sales_summary, get_top_products)
+
+
+def _make_app():
+    """إنشاء تطبيق بقاعدة بيانات في الذاكرة"""
+    from views import main_blueprint
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    app.register_blueprint(main_blueprint)
+    return app
+
+
+def _snapshot():
+    """قراءة جداول الملخص كقواميس قابلة للمقارنة"""
+    summary = {row.date: {k: v for k, v in row.to_dict().items()} for row in DailySalesSummary.query.all()}
+    products = {(row.date, row.product_id): row.to_dict() for row in DailyProductSales.query.all()}
+    return summary, products
+
+
+def test_rollups_follow_sales_and_returns():
+    """اختبار تحديث الملخص مع كل بيع وإرجاع ومطابقته لإعادة البناء"""
+    app = _make_app()
+    _check_rollups(app)
+
+
+def _check_rollups(app):
+    """خطوات اختبار الملخصات داخل سياق التطبيق"""
+    with app.app_context():
+        db.create_all()
+        phone = Product(name='Galaxy S24', model='S24', price_buy=100, price_sell=150, quantity=10)
+        cable = Product(name='Cable', model='C1', price_buy=2, price_sell=5, quantity=50)
+        db.session.add_all([phone, cable])
+        db.session.commit()
+
+        day = datetime(2026, 10, 1, 10, 0)
+        sales = []
+        for quantity in (1, 2):
+            sale = Sale(total_amount=150 * quantity + 10, discount=5, final_amount=150 * quantity + 5, created_at=day)
+            sale.sale_items.append(SaleItem(product_id=phone.id, quantity=quantity, unit_price=150, total_price=150 * quantity))
+            sale.sale_items.append(SaleItem(product_id=cable.id, quantity=2, unit_price=5, total_price=10))
+            db.session.add(sale)
+            db.session.commit()
+            sales.append(sale)
+
+        returned = Return(sale_id=sale.id, total_amount=150, return_date=datetime(2026, 10, 2, 9, 0))
+        returned.return_items.append(ReturnItem(product_id=phone.id, quantity=1, price=150))
+        db.session.add(returned)
+        db.session.commit()
+
+        summary = get_sales_summary(date(2026, 10, 1), date(2026, 10, 31))
+        assert summary['sales_count'] == 2
+        assert summary['items_count'] == 7
+        assert summary['final_amount'] == 460
+        assert summary['cost_amount'] == 308
+        assert summary['returns_amount'] == 150
+
+        top = get_top_products(date(2026, 10, 1), date(2026, 10, 31))
+        assert top[0]['product_name'] == 'Cable'
+        assert top[1]['quantity'] == 2
+
+        # مسار التقرير يقرأ من نفس الملخصات
+        client = app.test_client()
+        report = client.get('/api/reports/sales?start_date=2026-10-01&end_date=2026-10-31&limit=1').get_json()
+        assert report['summary']['final_amount'] == 460
+        assert len(report['summary']['days']) == 2
+        assert [product['product_name'] for product in report['top_products']] == ['Cable']
+        assert client.get('/api/reports/sales?start_date=bad').status_code == 400
+        assert client.get('/api/reports/sales').get_json()['end_date'] == datetime.utcnow().date().isoformat()
+
+        # التعبئة من اتصال قائم (كما في الترحيل) تطابق الملخصات المحدثة تلقائيًا
+        expected = _snapshot()
+        DailySalesSummary.query.delete()
+        DailyProductSales.query.delete()
+        db.session.commit()
+        assert rebuild_sales_rollups(connection=db.session.connection()) == 2
+        db.session.commit()
+        db.session.expire_all()
+        assert _snapshot() == expected
+        assert client.get('/api/reports/sales?start_date=2026-10-31&end_date=2026-10-01').status_code == 400
+
+        # حذف مبيعة يطرح قيمها من الملخص
+        db.session.delete(sales[0])
+        db.session.commit()
+        incremental = _snapshot()
+
+        rebuild_sales_rollups()
+        assert _snapshot() == incremental
+        print("✅ الملخصات اليومية تعمل")
+
+
+if __name__ == "__main__":
+    test_rollups_follow_sales_and_returns()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار سجل الاستعلامات البطيئة
+"""
+
+import os
+import shutil
+import tempfile
+
+from flask import Flask
+
+from database import db, Product
+from slow_query_log import SlowQueryLogger, fingerprint, normalize_statement, read_log, summarize
+
+
+def test_fingerprint():
+    """اختبار توحيد الاستعلامات قبل التجميع"""
+    first = "SELECT * FROM products WHERE id IN (?, ?, ?) AND name = 'x'"
+    second = "select *  from products\n where id in (?) and name = 'yy'"
+    assert normalize_statement(first) == "select * from products where id in (...) and name = ?"
+    assert fingerprint(first) == fingerprint(second)
+    assert fingerprint(first) != fingerprint("SELECT * FROM sales WHERE id = 1")
+    print("✅ بصمة الاستعلامات تعمل")
+
+
+def test_slow_query_logger():
+    """اختبار تسجيل الاستعلامات مع الخطة والمسار ثم التلخيص"""
+    log_dir = tempfile.mkdtemp(prefix='slow_queries_')
+    original_dir = os.getcwd()
+    os.chdir(log_dir)
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    @app.route('/products-count')
+    def products_count():
+        return {'count': Product.query.filter(Product.price_sell > 100).count()}
+
+    path = os.path.join(log_dir, 'slow.jsonl')
+    logger = SlowQueryLogger(path, threshold_ms=0)
+    try:
+        with app.app_context():
+            db.create_all()
+            logger.attach(db.engine)
+            db.session.add_all([Product(name=f'هاتف {i}', model='M', price_buy=1, price_sell=150) for i in range(3)])
+            db.session.commit()
+
+        client = app.test_client()
+        assert client.get('/products-count').get_json() == {'count': 3}
+        assert client.get('/products-count').status_code == 200
+        logger.detach()
+
+        records = list(read_log(path))
+        selects = [record for record in records if record['endpoint'] == 'products_count']
+        assert len(selects) == 2
+        assert selects[0]['parameters'] == ['int']
+        assert selects[0]['plan'] and 'products' in ' '.join(selects[0]['plan'])
+        inserts = [record for record in records if record['statement'].startswith('INSERT')]
+        assert inserts and inserts[0]['plan'] is None
+
+        summary = summarize(records)
+        grouped = [item for item in summary if item['endpoints'] == ['products_count']]
+        assert grouped[0]['count'] == 2
+        print("✅ سجل الاستعلامات البطيئة يعمل")
+    finally:
+        os.chdir(original_dir)
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_fingerprint()
+    test_slow_query_logger()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار مولد الفواتير الحرارية
+"""
+
+import os
+import re
+import socket
+import tempfile
+import threading
+import zipfile
+
+from flask import Flask
+
+import escpos_receipt
+import thermal_invoice
+from benchmark_invoices import sample_sale
+
+
+def test_styles_built_once():
+    """اختبار تجهيز الخطوط والأنماط مرة واحدة ومشاركتها بين الفواتير"""
+    first = thermal_invoice.ThermalInvoiceGenerator()
+    second = thermal_invoice.ThermalInvoiceGenerator()
+    assert first.arabic_normal_style is second.arabic_normal_style
+    assert thermal_invoice.get_invoice_styles.cache_info().misses == 1
+
+    pdf = second.generate_sale_invoice(sample_sale()).getvalue()
+    assert pdf.startswith(b'%PDF')
+    print("✅ الأنماط المشتركة تعمل")
+
+
+def test_escpos_receipt():
+    """اختبار فاتورة ESC/POS وإرسالها إلى ملف وإلى طابعة شبكية وهمية"""
+    # النص العربي يُشكّل دائمًا (حروف موصولة بترتيب العرض)
+    shaped = escpos_receipt.shape_text('فاتورة بيع')
+    assert all('\ufe70' <= char <= '\ufeff' or char == ' ' for char in shaped)
+    assert shaped[-1] == '\ufed3'  # الفاء في بداية الكلمة على يمين السطر
+
+    generator = thermal_invoice.ThermalInvoiceGenerator()
+    data = generator.generate_sale_receipt_escpos(sample_sale())
+    assert data.startswith(escpos_receipt.ESC_INIT)
+    assert data.endswith(escpos_receipt.GS_CUT)
+
+    # كل سطر نقطي: ترويسة GS v 0 ثم (عرض بالبايت × الارتفاع) من البيانات
+    position = data.index(escpos_receipt.GS_RASTER)
+    width_bytes = data[position + 4] | data[position + 5] << 8
+    height = data[position + 6] | data[position + 7] << 8
+    assert width_bytes == 576 // 8
+    assert any(data[position + 8:position + 8 + width_bytes * height])
+
+    # المقاطع الثابتة تُرسم مرة واحدة
+    hits = escpos_receipt.render_run.cache_info().hits
+    assert generator.generate_sale_receipt_escpos(sample_sale()) == data
+    assert escpos_receipt.render_run.cache_info().hits > hits
+
+    path = os.path.join(tempfile.mkdtemp(), 'printer.bin')
+    assert generator.print_receipt(data, path) == len(data)
+    with open(path, 'rb') as f:
+        assert f.read() == data
+
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+    received = []
+
+    def printer():
+        connection, _ = server.accept()
+        with connection:
+            while True:
+                chunk = connection.recv(65536)
+                if not chunk:
+                    break
+                received.append(chunk)
+
+    thread = threading.Thread(target=printer)
+    thread.start()
+    try:
+        generator.print_receipt(data, f"tcp://127.0.0.1:{server.getsockname()[1]}")
+        thread.join(timeout=10)
+    finally:
+        server.close()
+    assert b''.join(received) == data
+    print("✅ فواتير ESC/POS تعمل")
+
+
+def test_batch_invoices():
+    """اختبار تحميل الفواتير دفعة واحدة وإنشائها في مجموعة عمليات"""
+    from batch_invoices import load_invoices, render_invoices
+    from database import db, Customer, Product, Sale, SaleItem
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        customer = Customer(name='أحمد')
+        phone = Product(name='Galaxy S24', model='S24', price_buy=100, price_sell=150, quantity=10)
+        db.session.add_all([customer, phone])
+        db.session.flush()
+        for i in range(6):
+            sale = Sale(customer_id=customer.id, total_amount=150, discount=0, final_amount=150)
+            sale.sale_items.append(SaleItem(product_id=phone.id, quantity=1, unit_price=150, total_price=150))
+            db.session.add(sale)
+        db.session.commit()
+
+        records = load_invoices('sale', [6, 2, 99, 4, 1, 3, 5])
+
+        # فاتورة ESC/POS من صف Sale فعلي (sale_items وdiscount)
+        sale = db.session.get(Sale, 1)
+        sale.discount = 20
+        assert escpos_receipt.render_sale_receipt(sale).endswith(escpos_receipt.GS_CUT)
+    assert [record.id for record in records] == [6, 2, 4, 1, 3, 5]
+    assert records[0].items[0].product.name == 'Galaxy S24'
+
+    progress = []
+    archive = render_invoices('sale', records, output='zip', processes=2, chunk_size=2,
+                              progress=lambda done, total: progress.append((done, total)))
+    with zipfile.ZipFile(archive) as result:
+        names = result.namelist()
+        assert len(names) == 6
+        assert result.read('sale_invoice_6.pdf').startswith(b'%PDF')
+    assert progress[-1] == (6, 6)
+    assert len(progress) == 3
+
+    merged = render_invoices('sale', records, output='pdf', processes=1).read()
+    assert merged.startswith(b'%PDF')
+    assert len(re.findall(rb'/Type /Page[^s]', merged)) == 6
+    print("✅ إنشاء الفواتير على دفعات يعمل")
+
+
+if __name__ == "__main__":
+    test_styles_built_once()
+    test_escpos_receipt()
+    test_batch_invoices()
@@ -5,60 +5,132 @@
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 from reportlab.lib import colors
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from io import BytesIO
+from functools import lru_cache
 import os
+import threading
 
-class ThermalInvoiceGenerator:
-    """مولد الفواتير الحرارية"""
-    
-    def __init__(self):
-        self.width = 80 * mm  # عرض الفاتورة الحرارية
-        self.height = 120 * mm  # ارتفاع مناسب للطابعات الحرارية الحديثة
+# ملفات الخطوط العربية: (اسم الخط، الملف)
+INVOICE_FONTS = [
+    ('Arial', 'arial.ttf'),
+    ('Arial-Bold', 'arialbd.ttf'),
+    ('Arabic', 'arial.ttf'),
+]
+
+# الخط البديل إذا تعذر تحميل الخط العربي
+FALLBACK_FONT = 'Helvetica'
+
+_fonts_lock = threading.Lock()
+_arabic_font = None
+
+def register_fonts():
+    """
+    تسجيل الخطوط العربية مرة واحدة لكل عملية (قراءة ملفات TTF مكلفة)
+
+    :return: اسم الخط المستخدم للنص العربي
+    """
+    global _arabic_font
+    if _arabic_font is not None:
+        return _arabic_font
 
-        # تسجيل الخطوط العربية
-        try:
-            pdfmetrics.registerFont(TTFont('Arial', 'arial.ttf'))
-            pdfmetrics.registerFont(TTFont('Arial-Bold', 'arialbd.ttf'))
-            pdfmetrics.registerFont(TTFont('Arabic', 'arial.ttf')) # Fallback or specific Arabic font
-        except Exception as e:
-            print(f"Error registering fonts: {e}")
+    with _fonts_lock:
+        if _arabic_font is None:
+            try:
+                registered = set(pdfmetrics.getRegisteredFontNames())
+                for font_name, font_file in INVOICE_FONTS:
+                    if font_name not in registered:
+                        pdfmetrics.registerFont(TTFont(font_name, font_file))
+                _arabic_font = 'Arabic'
+            except Exception as e:
+                print(f"Error registering fonts: {e}")
+                _arabic_font = FALLBACK_FONT
+    return _arabic_font
 
-        # تعريف الأنماط مع الخطوط العربية
-        self.arabic_normal_style = ParagraphStyle(
+@lru_cache(maxsize=None)
+def get_invoice_styles():
+    """
+    أنماط الفاتورة الحرارية (تُبنى مرة واحدة لكل عملية وتُشارك بين الفواتير)
+
+    :return: قاموس الأنماط
+    """
+    font_name = register_fonts()
+    sample_styles = getSampleStyleSheet()
+
+    return {
+        'normal': ParagraphStyle(
             'ArabicNormal',
-            parent=getSampleStyleSheet()['Normal'],
-            fontName='Arabic',
+            parent=sample_styles['Normal'],
+            fontName=font_name,
             fontSize=7,
             alignment=TA_RIGHT,
             spaceAfter=0.5
-        )
-        self.arabic_title_style = ParagraphStyle(
+        ),
+        'title': ParagraphStyle(
             'ArabicTitle',
-            parent=getSampleStyleSheet()['Heading1'],
-            fontName='Arabic',
+            parent=sample_styles['Heading1'],
+            fontName=font_name,
             fontSize=10,
             alignment=TA_CENTER,
             spaceAfter=2,
             textColor=colors.black
-        )
-        self.arabic_final_style = ParagraphStyle(
+        ),
+        'final': ParagraphStyle(
             'ArabicFinal',
-            parent=getSampleStyleSheet()['Normal'],
-            fontName='Arabic',
+            parent=sample_styles['Normal'],
+            fontName=font_name,
             fontSize=9,
             alignment=TA_RIGHT,
             spaceAfter=1,
             textColor=colors.black
-        )
-        
-    def generate_sale_invoice(self, sale, store_settings=None):
-        """إنشاء فاتورة بيع حرارية"""
+        ),
+        'purchase_final': ParagraphStyle(
+            'FinalStyle',
+            parent=sample_styles['Normal'],
+            fontSize=8,
+            alignment=TA_RIGHT,
+            spaceAfter=1
+        ),
+    }
+
+# تنسيق جدول المنتجات (مشترك بين جميع الفواتير)
+ITEMS_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 7),
+    ('FONTSIZE', (0, 1), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 3),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+def warm_up():
+    """تجهيز الخطوط والأنماط مسبقًا عند تشغيل التطبيق"""
+    get_invoice_styles()
+
+class ThermalInvoiceGenerator:
+    """مولد الفواتير الحرارية"""
+    
+    def __init__(self):
+        self.width = 80 * mm  # عرض الفاتورة الحرارية
+        self.height = 120 * mm  # ارتفاع مناسب للطابعات الحرارية الحديثة
+
+        # الخطوط والأنماط تُجهز مرة واحدة لكل عملية
+        styles = get_invoice_styles()
+        self.arabic_normal_style = styles['normal']
+        self.arabic_title_style = styles['title']
+        self.arabic_final_style = styles['final']
+        self.purchase_final_style = styles['purchase_final']
+        
+    def _build_pdf(self, stories):
+        """بناء ملف PDF من فاتورة أو أكثر (كل فاتورة في صفحة)"""
         buffer = BytesIO()
         
         # إعداد الصفحة
@@ -71,6 +143,37 @@ class ThermalInvoiceGenerator:
             bottomMargin=2*mm
         )
         
+        story = []
+        for i, invoice_story in enumerate(stories):
+            if i:
+                story.append(PageBreak())
+            story.extend(invoice_story)
+        
+        # بناء الـ PDF
+        doc.build(story)
+        buffer.seek(0)
+        return buffer
+    
+    def generate_sale_invoice(self, sale, store_settings=None):
+        """إنشاء فاتورة بيع حرارية"""
+        return self._build_pdf([self.build_sale_story(sale, store_settings)])
+    
+    def generate_purchase_invoice(self, purchase, store_settings=None):
+        """إنشاء فاتورة شراء حرارية"""
+        return self._build_pdf([self.build_purchase_story(purchase, store_settings)])
+    
+    def generate_batch_pdf(self, kind, records, store_settings=None):
+        """
+        إنشاء ملف PDF واحد لعدة فواتير
+        
+        :param kind: 'sale' أو 'purchase'
+        :param records: المبيعات أو فواتير الشراء
+        """
+        build_story = self.build_sale_story if kind == 'sale' else self.build_purchase_story
+        return self._build_pdf([build_story(record, store_settings) for record in records])
+    
+    def build_sale_story(self, sale, store_settings=None):
+        """عناصر فاتورة البيع الحرارية"""
         # إعداد الأنماط
         title_style = self.arabic_title_style
         normal_style = self.arabic_normal_style
@@ -113,17 +216,7 @@ class ThermalInvoiceGenerator:
             ])
         
         table = Table(data, colWidths=[25*mm, 10*mm, 15*mm, 15*mm])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 7),
-            ('FONTSIZE', (0, 1), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 3),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        table.setStyle(ITEMS_TABLE_STYLE)
         
         story.append(table)
         story.append(Spacer(1, 1*mm))
@@ -148,25 +241,10 @@ class ThermalInvoiceGenerator:
         story.append(Paragraph("شكراً لزيارتكم", normal_style))
         story.append(Paragraph("نتمنى لكم يوماً سعيداً", normal_style))
         
-        # بناء الـ PDF
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
+        return story
     
-    def generate_purchase_invoice(self, purchase, store_settings=None):
-        """إنشاء فاتورة شراء حرارية"""
-        buffer = BytesIO()
-        
-        # إعداد الصفحة
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=(self.width, self.height),
-            rightMargin=2*mm,
-            leftMargin=2*mm,
-            topMargin=2*mm,
-            bottomMargin=2*mm
-        )
-        
+    def build_purchase_story(self, purchase, store_settings=None):
+        """عناصر فاتورة الشراء الحرارية"""
         # إعداد الأنماط
         title_style = self.arabic_title_style
         normal_style = self.arabic_normal_style
@@ -203,17 +281,7 @@ class ThermalInvoiceGenerator:
             ])
         
         table = Table(data, colWidths=[25*mm, 10*mm, 15*mm, 15*mm])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 7),
-            ('FONTSIZE', (0, 1), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 3),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        table.setStyle(ITEMS_TABLE_STYLE)
         
         story.append(table)
         story.append(Spacer(1, 0.5*mm))
@@ -221,17 +289,21 @@ class ThermalInvoiceGenerator:
         # المجموع النهائي
         currency = store_settings.currency_symbol if store_settings else "د.ج"
         
-        final_style = ParagraphStyle(
-            'FinalStyle',
-            parent=styles['Normal'],
-            fontSize=8,
-            alignment=TA_RIGHT,
-            spaceAfter=1
-        )
-        
-        story.append(Paragraph(f"<b>المجموع النهائي: {purchase.total_amount:.2f} {currency}</b>", final_style))
+        story.append(Paragraph(f"<b>المجموع النهائي: {purchase.total_amount:.2f} {currency}</b>", self.purchase_final_style))
         
-        # بناء الـ PDF
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
\ No newline at end of file
+        return story
+    
+    def generate_sale_receipt_escpos(self, sale, store_settings=None):
+        """إنشاء فاتورة بيع بأوامر ESC/POS مباشرة (دون PDF)"""
+        from escpos_receipt import render_sale_receipt
+        return render_sale_receipt(sale, store_settings)
+    
+    def generate_purchase_receipt_escpos(self, purchase, store_settings=None):
+        """إنشاء فاتورة شراء بأوامر ESC/POS مباشرة (دون PDF)"""
+        from escpos_receipt import render_purchase_receipt
+        return render_purchase_receipt(purchase, store_settings)
+    
+    def print_receipt(self, data, target=None):
+        """إرسال فاتورة ESC/POS إلى الطابعة (الإعداد ESCPOS_PRINTER أو target)"""
+        from escpos_receipt import send_to_printer
+        return send_to_printer(data, target)
@@ -4,3 +4,10 @@ from flask import Blueprint
 main_blueprint = Blueprint('main', __name__)
 
 # استيراد جميع المسارات
+from views import jobs  # noqa: E402,F401
+from views import exports  # noqa: E402,F401
+from views import api  # noqa: E402,F401
+from views import admin  # noqa: E402,F401
+from views import events  # noqa: E402,F401
+from views import chat  # noqa: E402,F401
+from views import reports  # noqa: E402,F401
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""
+مسارات الإدارة: قياسات الأداء
+"""
+
+from flask import current_app, jsonify
+
+from views import main_blueprint
+
+@main_blueprint.route('/admin/metrics')
+def admin_metrics():
+    """زمن وعدد استعلامات كل مسار (p50/p95/p99) منذ تشغيل العملية"""
+    metrics = current_app.extensions.get('request_metrics')
+    if metrics is None:
+        return jsonify({'error': 'قياس الطلبات غير مفعل (REQUEST_METRICS_ENABLED)'}), 404
+    return jsonify({'window': metrics.window, 'endpoints': metrics.summary()})
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+مسارات القوائم في الواجهة البرمجية (JSON)
+
+كل قائمة تستخدم ملف تحميل مسبق من LOADER_PROFILES فيبقى عدد الاستعلامات ثابتًا
+مهما كان عدد الصفوف.
+"""
+
+from flask import jsonify, request
+
+from barcode_index import barcode_index
+from config import Config
+from database import (with_profile, Product, Category, PurchaseInvoice, Return,
+                      Notification, ActivityLog, AuditLog)
+from product_autocomplete import product_autocomplete
+from product_search import search_products
+from views import main_blueprint
+
+# القوائم المتاحة: (النموذج، ملف التحميل، الترتيب)
+API_LISTINGS = {
+    'products': (Product, 'product_list', lambda: Product.id),
+    'categories': (Category, 'category_list', lambda: Category.name),
+    'purchases': (PurchaseInvoice, 'purchase_list', lambda: PurchaseInvoice.created_at.desc()),
+    'returns': (Return, 'return_list', lambda: Return.return_date.desc()),
+    'notifications': (Notification, 'notification_list', lambda: Notification.timestamp.desc()),
+    'activity_logs': (ActivityLog, 'activity_log_list', lambda: ActivityLog.timestamp.desc()),
+    'audit_logs': (AuditLog, 'audit_log_list', lambda: AuditLog.timestamp.desc()),
+}
+
+@main_blueprint.route('/api/<listing>')
+def api_listing(listing):
+    """قائمة مرقمة من السجلات بصيغة JSON"""
+    if listing not in API_LISTINGS:
+        return jsonify({'error': 'قائمة غير معروفة'}), 404
+
+    model, profile, order_by = API_LISTINGS[listing]
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', Config.ITEMS_PER_PAGE, type=int), 1),
+                   Config.MAX_SEARCH_RESULTS)
+
+    query = with_profile(model.query, profile).order_by(order_by())
+    items = query.limit(per_page).offset((page - 1) * per_page).all()
+    return jsonify({
+        'items': [item.to_dict() for item in items],
+        'page': page,
+        'per_page': per_page
+    })
+
+@main_blueprint.route('/api/products/barcode/<path:code>')
+def api_product_by_barcode(code):
+    """البحث عن منتج بالباركود أو رقم IMEI من فهرس الذاكرة (شاشة البيع)"""
+    product = barcode_index.lookup(code)
+    if product is None:
+        return jsonify({'success': False, 'message': 'لم يتم العثور على المنتج'}), 404
+    return jsonify({'success': True, 'product': product})
+
+@main_blueprint.route('/api/products/search')
+def api_product_search():
+    """اقتراحات البحث في المنتجات مرتبة حسب الصلة (مع كل ضغطة مفتاح)"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify([])
+
+    limit = min(max(request.args.get('limit', 10, type=int), 1), Config.MAX_SEARCH_RESULTS)
+    base_query = with_profile(Product.query, 'product_list')
+    products = search_products(query, limit, base_query)
+
+    # إكمال النتائج بمطابقات تقريبية عند الأخطاء الإملائية ("galxy")
+    if len(products) < limit:
+        found = {product.id for product in products}
+        extra_ids = [match['id'] for match in product_autocomplete.complete(query, limit)
+                     if match['id'] not in found][:limit - len(products)]
+        if extra_ids:
+            extra = {product.id: product for product in base_query.filter(Product.id.in_(extra_ids))}
+            products += [extra[product_id] for product_id in extra_ids if product_id in extra]
+    return jsonify([product.to_dict() for product in products])
+
+@main_blueprint.route('/api/products/autocomplete')
+def api_product_autocomplete():
+    """إكمال تلقائي متسامح مع الأخطاء من فهرس الذاكرة (دون استعلام في الحالة العادية)"""
+    query = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', 10, type=int), 1), Config.MAX_SEARCH_RESULTS)
+    return jsonify(product_autocomplete.complete(query, limit) if query else [])
+
+@main_blueprint.route('/api/advanced_search')
+def api_advanced_search():
+    """البحث المتقدم في المنتجات مع مرشحات الفئة والماركة والسعر"""
+    if request.args.get('type', 'products') != 'products':
+        return jsonify({'success': False, 'message': 'نوع البحث غير مدعوم'}), 400
+
+    base_query = with_profile(Product.query, 'product_list')
+    category_id = request.args.get('category_id', type=int)
+    if category_id:
+        base_query = base_query.filter(Product.category_id == category_id)
+    brand = request.args.get('brand', '').strip()
+    if brand:
+        base_query = base_query.filter(Product.brand.ilike(f"%{brand}%"))
+    min_price = request.args.get('min_price', type=float)
+    if min_price is not None:
+        base_query = base_query.filter(Product.price_sell >= min_price)
+    max_price = request.args.get('max_price', type=float)
+    if max_price is not None:
+        base_query = base_query.filter(Product.price_sell <= max_price)
+
+    query = request.args.get('query', '').strip()
+    if query:
+        products = search_products(query, Config.SEARCH_MAX_RESULTS, base_query)
+    else:
+        products = base_query.order_by(Product.name).limit(Config.SEARCH_MAX_RESULTS).all()
+    return jsonify({'success': True, 'results': [product.to_dict() for product in products]})
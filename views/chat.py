@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+مسارات تاريخ محادثات المساعد البرمجي: البحث والمواضيع الشائعة
+"""
+
+from flask import jsonify, request
+
+from chat_history import chat_history
+from views import main_blueprint
+
+@main_blueprint.route('/chat/search')
+def chat_search():
+    """البحث في المحادثات بالفهرس المقلوب (?q=&limit=)"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'results': []})
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+    try:
+        return jsonify({'results': chat_history.search_conversations(query, limit)})
+    except Exception as e:
+        print(f"خطأ في البحث في المحادثات: {e}")
+        return jsonify({'error': 'حدث خطأ أثناء البحث'}), 500
+
+@main_blueprint.route('/chat/topics')
+def chat_topics():
+    """عدد المحادثات لكل موضوع برمجي"""
+    return jsonify({'topics': [{'keyword': keyword, 'count': count}
+                               for keyword, count in chat_history.get_programming_topics()]})
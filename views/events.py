@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+مسار البث المباشر: أحداث المبيعات والمرتجعات والمخزون المنخفض (Server-Sent Events)
+"""
+
+from flask import Response, jsonify, request
+
+from config import Config
+from live_events import BrokerFull, event_broker, stream
+from views import main_blueprint
+
+@main_blueprint.route('/events')
+def live_events_stream():
+    """بث الأحداث للمتصفح؛ Last-Event-ID (أو last_event_id) يستعيد ما فاته"""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        subscription = event_broker.subscribe(last_event_id)
+    except BrokerFull:
+        response = jsonify({'error': 'تم بلوغ الحد الأقصى للاتصالات المباشرة'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(Config.EVENTS_RETRY_MS // 1000)
+        return response
+
+    return Response(
+        stream(event_broker, subscription),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@main_blueprint.route('/events/stats')
+def live_events_stats():
+    """عدد الاتصالات المفتوحة والأحداث المنشورة في هذه العملية"""
+    return jsonify(event_broker.stats())
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+مسارات تصدير البيانات الخام (CSV متدفق وParquet)
+"""
+
+from datetime import datetime
+
+from flask import Response, jsonify, request, send_file, stream_with_context
+
+from data_export import PYARROW_AVAILABLE, CSVExporter, ParquetExporter
+from excel_export import EXPORT_DATASETS
+from views import main_blueprint
+
+def _export_period():
+    """قراءة الفترة الزمنية من معاملات الطلب (YYYY-MM-DD)"""
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    return (datetime.strptime(start_date, '%Y-%m-%d') if start_date else None,
+            datetime.strptime(end_date, '%Y-%m-%d') if end_date else None)
+
+def _export_filename(dataset, extension):
+    """اسم الملف للتحميل"""
+    return f"{dataset}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+@main_blueprint.route('/exports/<dataset>.csv')
+def export_csv(dataset):
+    """تصدير مجموعة بيانات إلى CSV مباشرة من قاعدة البيانات"""
+    if dataset not in EXPORT_DATASETS:
+        return jsonify({'error': 'مجموعة بيانات غير معروفة'}), 404
+    try:
+        start_date, end_date = _export_period()
+    except ValueError:
+        return jsonify({'error': 'صيغة التاريخ غير صحيحة'}), 400
+
+    chunks = CSVExporter().iter_dataset(
+        dataset, start_date, end_date,
+        labels=request.args.get('header') != 'names',
+        bom=request.args.get('bom') == '1'
+    )
+    return Response(
+        stream_with_context(chunks),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename="{_export_filename(dataset, "csv")}"'}
+    )
+
+@main_blueprint.route('/exports/<dataset>.parquet')
+def export_parquet(dataset):
+    """تصدير مجموعة بيانات إلى Parquet"""
+    if dataset not in EXPORT_DATASETS:
+        return jsonify({'error': 'مجموعة بيانات غير معروفة'}), 404
+    if not PYARROW_AVAILABLE:
+        return jsonify({'error': 'تصدير Parquet يتطلب تثبيت pyarrow'}), 501
+    try:
+        start_date, end_date = _export_period()
+    except ValueError:
+        return jsonify({'error': 'صيغة التاريخ غير صحيحة'}), 400
+
+    output = ParquetExporter().export_dataset(dataset, start_date, end_date)
+    return send_file(output, mimetype='application/vnd.apache.parquet',
+                     as_attachment=True, download_name=_export_filename(dataset, 'parquet'))
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+مسارات المهام الخلفية: إضافة مهام التصدير والفواتير، متابعة الحالة، وتحميل الملف
+"""
+
+import os
+from datetime import datetime
+
+from flask import jsonify, request, send_file, url_for
+
+from jobs import JOB_DONE, job_queue
+from views import main_blueprint
+
+# أنواع التصدير المتاحة
+EXPORT_JOBS = {
+    'sales': 'sales_export',
+    'products': 'products_export',
+    'purchases': 'purchases_export',
+}
+
+def _job_response(job):
+    """تمثيل حالة المهمة للعميل"""
+    data = {
+        'id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'status_url': url_for('main.job_status', job_id=job['id']),
+    }
+    if job['status'] == JOB_DONE:
+        data['download_url'] = url_for('main.job_download', job_id=job['id'])
+        data['filename'] = job['filename']
+    if job.get('progress_total') is not None:
+        data['progress'] = {'done': job['progress_done'], 'total': job['progress_total']}
+    if job.get('error'):
+        data['error'] = job['error']
+    return data
+
+@main_blueprint.route('/jobs/exports/<kind>', methods=['POST'])
+def enqueue_export(kind):
+    """إضافة مهمة تصدير Excel إلى الطابور"""
+    if kind not in EXPORT_JOBS:
+        return jsonify({'error': 'نوع تصدير غير معروف'}), 404
+
+    data = request.get_json(silent=True) or request.form
+    params = {key: data.get(key) for key in ('start_date', 'end_date') if data.get(key)}
+    try:
+        # نفس التحويل الذي تجريه المهمة (_parse_date) حتى لا تفشل داخل عملية التنفيذ
+        for value in params.values():
+            datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return jsonify({'error': 'صيغة التاريخ غير صحيحة (YYYY-MM-DD)'}), 400
+    job_id = job_queue.enqueue(EXPORT_JOBS[kind], params)
+    return jsonify(_job_response(job_queue.get(job_id))), 202
+
+@main_blueprint.route('/jobs/invoices/sale/<int:sale_id>', methods=['POST'])
+def enqueue_sale_invoice(sale_id):
+    """إضافة مهمة إنشاء فاتورة بيع حرارية إلى الطابور"""
+    job_id = job_queue.enqueue('sale_invoice', {'sale_id': sale_id})
+    return jsonify(_job_response(job_queue.get(job_id))), 202
+
+@main_blueprint.route('/jobs/invoices/purchase/<int:purchase_id>', methods=['POST'])
+def enqueue_purchase_invoice(purchase_id):
+    """إضافة مهمة إنشاء فاتورة شراء حرارية إلى الطابور"""
+    job_id = job_queue.enqueue('purchase_invoice', {'purchase_id': purchase_id})
+    return jsonify(_job_response(job_queue.get(job_id))), 202
+
+@main_blueprint.route('/jobs/invoices/batch', methods=['POST'])
+def enqueue_invoice_batch():
+    """إضافة مهمة إنشاء عدة فواتير (PDF مدمج أو zip) إلى الطابور"""
+    data = request.get_json(silent=True) or {}
+    kind = data.get('kind')
+    output = data.get('output', 'pdf')
+    ids = data.get('ids') or []
+    if kind not in ('sale', 'purchase') or output not in ('pdf', 'zip') or not isinstance(ids, list) or not ids:
+        return jsonify({'error': 'بيانات غير صحيحة'}), 400
+    try:
+        ids = [int(i) for i in ids]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'معرفات الفواتير يجب أن تكون أرقامًا'}), 400
+    job_id = job_queue.enqueue('invoice_batch', {'kind': kind, 'output': output, 'ids': ids})
+    return jsonify(_job_response(job_queue.get(job_id))), 202
+
+@main_blueprint.route('/jobs/<job_id>')
+def job_status(job_id):
+    """حالة المهمة"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'المهمة غير موجودة'}), 404
+    return jsonify(_job_response(job))
+
+@main_blueprint.route('/jobs/<job_id>/download')
+def job_download(job_id):
+    """تحميل الملف الناتج عند جاهزيته"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'المهمة غير موجودة'}), 404
+    if job['status'] != JOB_DONE or not os.path.exists(job['result_path']):
+        return jsonify(_job_response(job)), 409
+    return send_file(job['result_path'], mimetype=job['mimetype'],
+                     as_attachment=True, download_name=job['filename'])
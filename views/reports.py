@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+مسارات تقارير المبيعات من جداول الملخص اليومي
+
+الإجماليات وأفضل المنتجات تُقرأ من DailySalesSummary وDailyProductSales (صف لكل
+يوم) بدل تجميع جميع عناصر المبيعات في كل طلب.
+"""
+
+from datetime import datetime, timedelta
+
+from flask import jsonify, request
+
+from database import get_sales_summary, get_top_products
+from views import main_blueprint
+
+# الفترة الافتراضية للتقرير بالأيام
+REPORT_DEFAULT_DAYS = 30
+
+def _report_period():
+    """قراءة الفترة من معاملات الطلب (YYYY-MM-DD)؛ الافتراضي آخر REPORT_DEFAULT_DAYS يومًا بتوقيت UTC"""
+    end_date = request.args.get('end_date')
+    start_date = request.args.get('start_date')
+    # الملخصات مقسمة حسب أيام UTC (انظر _rollup_date)
+    end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else datetime.utcnow().date()
+    start_date = (datetime.strptime(start_date, '%Y-%m-%d').date() if start_date
+                  else end_date - timedelta(days=REPORT_DEFAULT_DAYS - 1))
+    return start_date, end_date
+
+@main_blueprint.route('/api/reports/sales')
+def api_sales_report():
+    """إجماليات المبيعات والأرباح والمرتجعات وأفضل المنتجات لفترة"""
+    try:
+        start_date, end_date = _report_period()
+    except ValueError:
+        return jsonify({'error': 'صيغة التاريخ غير صحيحة (YYYY-MM-DD)'}), 400
+    if start_date > end_date:
+        return jsonify({'error': 'تاريخ البداية بعد تاريخ النهاية'}), 400
+
+    limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+    return jsonify({
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'summary': get_sales_summary(start_date, end_date),
+        'top_products': get_top_products(start_date, end_date, limit=limit)
+    })
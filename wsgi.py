@@ -5,8 +5,9 @@ WSGI entry point for production deployment
 """
 
 import os
-from app import app
+from app import app, start_background_tasks
 
 if __name__ == "__main__":
     port = int(os.environ.get('PORT', 5000))
+    start_background_tasks(app)
     app.run(host='0.0.0.0', port=port)
\ No newline at end of file